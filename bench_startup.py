@@ -0,0 +1,86 @@
+"""봇 시작 시 불러오는 모듈들의 import 시간을 `python -X importtime`으로 재는 벤치마크입니다.
+
+    python bench_startup.py                 # 결과 출력
+    python bench_startup.py --budget-ms 800 # 예산을 넘거나 무거운 모듈이 시작 시 불려오면 종료 코드 1
+
+setup_hook이 불러오는 코그 모듈을 새 인터프리터에서 import하고, 가장 빠른 실행의 총 시간과
+오래 걸린 최상위 모듈을 보여 줍니다. 차트/AI 라이브러리처럼 지연 로딩해야 하는 모듈이
+시작 경로에 다시 들어오면 실패로 처리해 콜드 스타트가 느려지는 것을 막습니다.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# main.py의 setup_hook이 불러오는 모듈
+STARTUP_MODULES = [
+    'database',
+    'cogs.cluster',
+    'cogs.general',
+    'cogs.admin',
+    'cogs.survey',
+    'cogs.events',
+    'cogs.master',
+    'cogs.botadmin',
+    'cogs.maintenance',
+]
+# 첫 사용 때 불러와야 하는 무거운 모듈 (시작 경로에 보이면 안 됨)
+LAZY_MODULES = ['matplotlib', 'squarify', 'google.generativeai']
+DEFAULT_BUDGET_MS = 1500
+
+
+def measure_once() -> list:
+    """새 인터프리터에서 STARTUP_MODULES를 불러오고 [(누적 us, 들여쓰기 깊이, 모듈 이름)]을 반환합니다."""
+    code = ';'.join(f'import {name}' for name in STARTUP_MODULES)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        entries.append((int(cumulative), depth, name.strip()))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="시작 모듈 import 시간 벤치마크")
+    parser.add_argument('--runs', type=int, default=3, help="반복 횟수 (가장 빠른 실행을 사용)")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help="총 import 시간 예산(ms)")
+    parser.add_argument('--top', type=int, default=15, help="출력할 최상위 모듈 수")
+    args = parser.parse_args()
+
+    best = None
+    for _ in range(max(args.runs, 1)):
+        entries = measure_once()
+        total = sum(us for us, depth, _ in entries if depth == 0)
+        if best is None or total < best[0]:
+            best = (total, entries)
+    total, entries = best
+
+    print(f"Startup imports: {total / 1000:.1f} ms (best of {max(args.runs, 1)}, budget {args.budget_ms:.0f} ms)")
+    top_level = sorted((e for e in entries if e[1] == 0), reverse=True)
+    for us, _, name in top_level[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    loaded = {name for _, _, name in entries}
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    failed = False
+    if eager:
+        print(f"FAIL: lazily loaded modules were imported at startup: {', '.join(eager)}")
+        failed = True
+    if total / 1000 > args.budget_ms:
+        print(f"FAIL: startup imports exceeded the budget by {total / 1000 - args.budget_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+
+import discord
+
+import database
+
+logger = logging.getLogger('discord')
+
+# 찾아 둔 채널 객체와 권한을 다시 확인하지 않고 재사용하는 시간(초)
+CHANNEL_CACHE_TTL = 600
+# 게이트웨이 캐시에 없는(클러스터 모드에서 다른 프로세스 샤드의) 채널은 REST로 조회하므로 더 오래 재사용합니다.
+# 그 사이 채널이 지워지거나 권한이 바뀌면 송출이 실패하고 report_failure가 캐시를 비우므로 다시 조회됩니다.
+REMOTE_CHANNEL_CACHE_TTL = 3 * 24 * 3600
+# 연속 실패 시 다음 시도까지 기다리는 시간. 실패할 때마다 두 배씩 늘어나며 최대값을 넘지 않습니다.
+FAILURE_BACKOFF_BASE = 60
+FAILURE_BACKOFF_MAX = 6 * 3600
+# 이 횟수만큼 연속으로 실패하면 해당 서버의 공지 송출을 끕니다.
+MAX_CHANNEL_FAILURES = 3
+# 한 번에 동시에 조회(fetch_channel)하는 채널 수
+RESOLVE_CONCURRENCY = 8
+# 송출 시 한 샤드 안에서 동시에 보내는 서버 수. 샤드끼리는 서로 기다리지 않습니다.
+SHARD_SEND_CONCURRENCY = 4
+
+
+def shard_id_for(guild_id: int, shard_count: int) -> int:
+    """디스코드 규칙((guild_id >> 22) % shard_count)으로 서버가 속한 샤드 번호를 계산합니다."""
+    return (guild_id >> 22) % max(shard_count or 1, 1)
+
+
+class _ChannelState:
+    __slots__ = ('channel', 'expires_at', 'failures', 'retry_at')
+
+    def __init__(self):
+        self.channel = None
+        self.expires_at = 0.0
+        self.failures = 0
+        self.retry_at = 0.0
+
+
+class ChannelRegistry:
+    """공지 채널 ID를 채널 객체로 바꿔 권한 확인 결과와 함께 보관하는 메모리 캐시입니다.
+
+    접근하지 못한 채널은 실패 횟수를 세어 지수적으로 늦게 다시 시도하고,
+    MAX_CHANNEL_FAILURES번 연속 실패하면 set_announcement_enabled로 송출을 끄고 서버 소유자에게 알립니다.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._states = {}
+
+    def _state(self, channel_id: int) -> _ChannelState:
+        state = self._states.get(channel_id)
+        if state is None:
+            state = self._states[channel_id] = _ChannelState()
+        return state
+
+    async def resolve(self, guild_id: int, channel_id: int):
+        """송출 가능한 채널 객체를 반환합니다. 재시도 대기 중이거나 접근할 수 없으면 None을 반환합니다."""
+        state = self._state(channel_id)
+        now = time.monotonic()
+        if state.retry_at > now:
+            return None
+        if state.channel is not None and state.expires_at > now:
+            return state.channel
+
+        channel = self.bot.get_channel(channel_id)
+        remote = channel is None
+        if remote:
+            try:
+                channel = await self.bot.fetch_channel(channel_id)
+                me = await self._fetch_me(channel)
+            except (discord.NotFound, discord.Forbidden) as e:
+                await self.report_failure(guild_id, channel_id, f"채널 조회 실패: {e}")
+                return None
+            except discord.HTTPException as e:
+                # 일시적인 API 오류는 채널 탓이 아니므로 실패로 세지 않고, 다음 송출까지 같은 채널을 다시 조회하지 않음
+                logger.warning(f"Could not fetch channel {channel_id}: {e}")
+                state.retry_at = now + FAILURE_BACKOFF_BASE
+                return None
+        else:
+            me = getattr(channel.guild, 'me', None)
+
+        if me is not None:
+            permissions = channel.permissions_for(me)
+            if not (permissions.view_channel and permissions.send_messages):
+                await self.report_failure(guild_id, channel_id, "메시지 보내기 권한 없음")
+                return None
+
+        state.channel = channel
+        state.expires_at = now + (REMOTE_CHANNEL_CACHE_TTL if remote else CHANNEL_CACHE_TTL)
+        return channel
+
+    async def _fetch_me(self, channel):
+        """fetch_channel로 받은 채널의 서버는 역할/멤버 정보가 없는 빈 객체이므로, REST로 서버와 봇 멤버를 받아
+        채널에 붙여 권한을 계산할 수 있게 합니다."""
+        guild = await self.bot.fetch_guild(channel.guild.id)
+        channel.guild = guild
+        return await guild.fetch_member(self.bot.user.id)
+
+    async def resolve_all(self, channels) -> list:
+        """get_all_active_announcement_channels 결과를 한 번에 풀어 [(guild_id, channel_id, channel)]로 반환합니다.
+        송출할 수 없는 채널은 결과에서 빠집니다."""
+        semaphore = asyncio.Semaphore(RESOLVE_CONCURRENCY)
+
+        async def resolve_one(guild_id, channel_id):
+            async with semaphore:
+                return await self.resolve(guild_id, channel_id)
+
+        resolved = await asyncio.gather(*(resolve_one(g, c) for g, c in channels))
+        return [(g, c, channel) for (g, c), channel in zip(channels, resolved) if channel is not None]
+
+    async def fan_out(self, targets, send) -> list:
+        """targets의 각 항목(guild_id가 첫 값인 튜플)마다 send(*항목)을 실행하고 결과(또는 예외)를 같은 순서로 반환합니다.
+        서버를 샤드별로 나눠 샤드마다 SHARD_SEND_CONCURRENCY개까지 동시에 보내므로, 한 샤드가 느려도 다른 샤드 송출은 기다리지 않습니다."""
+        shard_count = getattr(self.bot, 'shard_count', None) or 1
+        semaphores = {}
+
+        async def run(target):
+            shard_id = shard_id_for(target[0], shard_count)
+            semaphore = semaphores.get(shard_id)
+            if semaphore is None:
+                semaphore = semaphores[shard_id] = asyncio.Semaphore(SHARD_SEND_CONCURRENCY)
+            async with semaphore:
+                return await send(*target)
+
+        return await asyncio.gather(*(run(t) for t in targets), return_exceptions=True)
+
+    def report_success(self, channel_id: int):
+        state = self._states.get(channel_id)
+        if state is not None:
+            state.failures = 0
+            state.retry_at = 0.0
+
+    async def report_failure(self, guild_id: int, channel_id: int, reason: str = ""):
+        """채널에 접근/전송하지 못했음을 기록합니다. 연속 실패가 쌓이면 해당 서버의 송출을 끕니다."""
+        state = self._state(channel_id)
+        state.channel = None
+        state.failures += 1
+        if state.failures < MAX_CHANNEL_FAILURES:
+            backoff = min(FAILURE_BACKOFF_BASE * 2 ** (state.failures - 1), FAILURE_BACKOFF_MAX)
+            state.retry_at = time.monotonic() + backoff
+            logger.warning(f"Announcement channel {channel_id} (guild {guild_id}) failed {state.failures}x, retry in {backoff}s: {reason}")
+            return
+
+        # 다시 /공지채널설정 이나 /알림설정으로 켰을 때 처음부터 시도하도록 상태를 지움
+        self._states.pop(channel_id, None)
+        await database.set_announcement_enabled(guild_id, 0)
+        logger.warning(f"Disabled announcements for guild {guild_id} after {MAX_CHANNEL_FAILURES} failures on channel {channel_id}: {reason}")
+        try:
+            guild = self.bot.get_guild(guild_id)
+            # 멤버 캐시를 끈 저메모리 모드에서는 guild.owner가 없으므로 소유자 ID로 직접 조회
+            owner = guild and (guild.owner or await self.bot.fetch_user(guild.owner_id))
+            if owner:
+                await owner.send(f"⚠️ **[레전드 갈드컵]** 서버({guild.name})의 공지 채널에 여러 번 연속으로 접근하지 못해 갈드컵 알림 송출이 자동 비활성화되었습니다. 채널이 남아 있는지, 봇에게 메시지 보내기/고정 권한이 있는지 확인한 뒤 다시 `/공지채널설정`을 진행해주세요.")
+        except Exception:
+            pass
+
+    def forget(self, channel_id: int):
+        """공지 채널을 새로 설정했을 때처럼 이전 실패 기록과 캐시를 버립니다."""
+        self._states.pop(channel_id, None)
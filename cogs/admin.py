@@ -10,10 +10,17 @@ class Admin(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    def _forget_channel_failures(self, channel_id: int):
+        # 관리자가 채널을 다시 설정했으면 이전 실패 기록/권한 캐시 없이 바로 송출을 시도
+        master_cog = self.bot.get_cog("Master")
+        if master_cog and channel_id:
+            master_cog.channel_registry.forget(channel_id)
+
     @app_commands.command(name="공지채널설정", description="[관리자 전용] 주기적으로 설문조사 결과 및 새 주제가 공지될 채널을 지정합니다.")
     @app_commands.default_permissions(administrator=True)
     async def set_announce_channel(self, interaction: discord.Interaction, channel: discord.TextChannel):
         await set_announcement_channel(interaction.guild_id, channel.id)
+        self._forget_channel_failures(channel.id)
         logger.info(f"Guild {interaction.guild_id} set announcement channel to {channel.id}")
         
         await interaction.response.send_message(
@@ -43,14 +50,16 @@ class Admin(commands.Cog):
             master_cog = self.bot.get_cog("Master")
             if master_cog:
                 # 봇이 새로운 채널 배정을 받았을 때 현재 진행 중인 주제를 송출
-                await master_cog.announce_new_topic(interaction.guild_id, channel.id, survey, is_new_channel=True)
+                await master_cog.announce_new_topic(interaction.guild_id, channel.id, survey.to_topic_data(), is_new_channel=True)
 
     @app_commands.command(name="알림설정", description="[관리자 전용] 갈드컵 새 주제 및 결과 공지를 켜거나 끕니다.")
     @app_commands.describe(enable="알림 송출 여부 (True=켜기, False=끄기)")
     @app_commands.default_permissions(administrator=True)
     async def toggle_announcement(self, interaction: discord.Interaction, enable: bool):
-        from database import set_announcement_enabled
+        from database import set_announcement_enabled, get_announcement_channel
         await set_announcement_enabled(interaction.guild_id, 1 if enable else 0)
+        if enable:
+            self._forget_channel_failures(await get_announcement_channel(interaction.guild_id))
         status = "✅ 켜짐(ON)" if enable else "🔇 꺼짐(OFF)"
         await interaction.response.send_message(f"현재 서버의 갈드컵 공지 알림이 **{status}** 상태로 변경되었습니다.", ephemeral=True)
 
@@ -7,6 +7,8 @@ import os
 import json
 import shlex
 import asyncio
+import dataclasses
+import time
 
 logger = logging.getLogger('discord')
 
@@ -18,8 +20,49 @@ async def check_and_trigger_empty_survey(bot: commands.Bot):
         if master_cog:
             await master_cog.process_survey_rotation()
 
+def similar_topic_warning(topic: str, options, exclude: tuple = None) -> str:
+    """대기열에 넣을 주제와 거의 같은 주제가 이미 있으면 관리자에게 보여줄 경고 문구를 만듭니다."""
+    similar = database.find_similar_topics(topic, options, exclude=exclude)
+    if not similar:
+        return ""
+    match = similar[0]
+    label = database.SIMILAR_SOURCE_LABELS[match['source']]
+    return f"\n⚠️ 비슷한 주제가 이미 있습니다: **{match['topic']}** ({label} #{match['id']}, 유사도 {match['similarity']:.0%})"
+
 MASTER_ADMIN_ID = int(os.getenv("MASTER_ADMIN_ID", "0"))
 
+# 바뀌면 !업데이트가 코그 리로드 대신 프로세스를 재기동하는 파일 (종속성 설치가 필요)
+DEPENDENCY_FILES = {'requirements.txt'}
+# 코그가 __init__에서 읽어 두는 데이터 파일 -> 다시 불러올 확장
+DATA_FILE_EXTENSIONS = {'prompts.json': 'cogs.master'}
+# 재기동 후 새 프로세스가 !업데이트 결과를 이어서 알릴 때 쓰는 global_settings 키
+UPDATE_REPORT_KEY = 'pending_update_report'
+
+def plan_update(changed_files: list, loaded_extensions) -> tuple:
+    """!업데이트로 바뀐 파일 목록을 보고 (재기동 사유 또는 None, 다시 불러올 확장 목록)을 반환합니다.
+
+    종속성이 바뀌었거나 코그가 아닌 파이썬 모듈(main.py, database.py 등)이 바뀌었으면 재기동해야 합니다.
+    database 모듈은 캐시와 인덱스를 들고 있어 제자리에서 다시 불러오면 그 상태를 잃기 때문입니다.
+    """
+    dependencies = [f for f in changed_files if f in DEPENDENCY_FILES]
+    if dependencies:
+        return f"종속성 변경 ({', '.join(dependencies)})", []
+    core_modules = [f for f in changed_files if f.endswith('.py') and not f.startswith('cogs/')]
+    if core_modules:
+        return f"핵심 모듈 변경 ({', '.join(core_modules[:5])})", []
+
+    extensions = []
+    for f in changed_files:
+        if f.startswith('cogs/') and f.endswith('.py'):
+            name = f[:-3].replace('/', '.')
+        else:
+            name = DATA_FILE_EXTENSIONS.get(f)
+        if name in loaded_extensions and name not in extensions:
+            extensions.append(name)
+    # 명령을 실행 중인 이 코그는 마지막에 다시 불러옴
+    extensions.sort(key=lambda name: name == __name__)
+    return None, extensions
+
 class DirectTopicModal(discord.ui.Modal, title='갈드컵 강제 새 주제 지정'):
     topic = discord.ui.TextInput(
         label='1. 갈드컵 주제',
@@ -53,6 +96,14 @@ class DirectTopicModal(discord.ui.Modal, title='갈드컵 강제 새 주제 지
         max_length=4000
     )
 
+    allow_multiple = discord.ui.TextInput(
+        label='5. 복수 선택 허용여부 (O/X, 선택사항)',
+        style=discord.TextStyle.short,
+        placeholder='O 또는 X (비워두면 X)',
+        required=False,
+        max_length=1
+    )
+
     def __init__(self, master_cog):
         super().__init__()
         self.master_cog = master_cog
@@ -89,12 +140,14 @@ class DirectTopicModal(discord.ui.Modal, title='갈드컵 강제 새 주제 지
                 parsed_options.append({"name": opt.strip(), "desc": ""})
 
         is_short = self.allow_short.value.upper() == 'O'
+        is_multiple = (self.allow_multiple.value or '').upper() == 'O'
         img_val = self.image_url.value.strip() if self.image_url.value else None
 
         new_topic_data = {
             "topic": topic_text,
             "options": parsed_options,
             "allow_short_answer": is_short,
+            "allow_multiple": is_multiple,
             "image_url": img_val
         }
 
@@ -113,6 +166,7 @@ class AIGeneratedTopicView(discord.ui.View):
     @discord.ui.button(label="대기열 가록 (Queue) 추가", style=discord.ButtonStyle.success, emoji="✅")
     async def approve_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
         import database
+        warning = similar_topic_warning(self.generated_data['topic'], self.generated_data.get('options'))
         await database.add_to_queue({
             'topic': self.generated_data['topic'],
             'options': self.generated_data['options'],
@@ -124,7 +178,7 @@ class AIGeneratedTopicView(discord.ui.View):
         
         for item in self.children:
             item.disabled = True
-        await interaction.response.edit_message(content="✅ **AI 제안 주제가 대기열 리스트 끝에 신규로 장전되었습니다!**", view=self)
+        await interaction.response.edit_message(content="✅ **AI 제안 주제가 대기열 리스트 끝에 신규로 장전되었습니다!**" + warning, view=self)
 
     @discord.ui.button(label="거절", style=discord.ButtonStyle.danger, emoji="❌")
     async def reject_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -135,22 +189,39 @@ class AIGeneratedTopicView(discord.ui.View):
 
 
 class TopicPaginationView(discord.ui.View):
-    def __init__(self, topics: list, master_cog, active_topic_sessions: dict, user_id: int):
+    def __init__(self, topic: dict, total: int, master_cog, active_topic_sessions: dict, user_id: int):
         super().__init__(timeout=None)
-        self.topics = topics
+        # 전체 목록 대신 현재 보고 있는 주제 한 개와 전체 개수만 들고 있습니다.
+        self.topic = topic
         self.master_cog = master_cog
         self.active_topic_sessions = active_topic_sessions
         self.user_id = user_id
         self.current_page = 0
-        self.max_pages = len(topics)
+        self.max_pages = total
         self.update_buttons()
 
+    @classmethod
+    async def create(cls, master_cog, active_topic_sessions: dict, user_id: int):
+        topic = await database.get_suggested_topic_near()
+        total = await database.count_suggested_topics()
+        return cls(topic, total, master_cog, active_topic_sessions, user_id)
+
+    async def remove_current_topic(self):
+        """현재 주제가 목록에서 빠진 뒤 그 다음(없으면 이전) 주제 하나만 다시 불러옵니다."""
+        removed_id = self.topic.id
+        self.max_pages = await database.count_suggested_topics()
+        self.topic = await database.get_suggested_topic_near(after_id=removed_id)
+        if self.topic is None:
+            self.topic = await database.get_suggested_topic_near(before_id=removed_id)
+            self.current_page -= 1
+        self.current_page = max(0, min(self.current_page, self.max_pages - 1))
+
     def update_buttons(self):
         self.prev_btn.disabled = self.current_page == 0
-        self.next_btn.disabled = self.current_page == self.max_pages - 1
+        self.next_btn.disabled = self.current_page >= self.max_pages - 1
         
         # 주제가 없을 때
-        if self.max_pages == 0:
+        if self.topic is None:
             self.prev_btn.disabled = True
             self.next_btn.disabled = True
             self.queue_add_btn.disabled = True
@@ -168,121 +239,121 @@ class TopicPaginationView(discord.ui.View):
             self.ai_gen_btn.disabled = False
 
     def get_current_embed(self) -> discord.Embed:
-        if not self.topics:
+        if not self.topic:
             return discord.Embed(title="대기열 비어있음", description="아직 제안된/대기 중인 주제가 없습니다.", color=discord.Color.red())
             
-        topic = self.topics[self.current_page]
+        topic = self.topic
         embed = discord.Embed(
-            title=f"대기열 주제 [{self.current_page + 1}/{self.max_pages}] (ID: {topic['id']})",
-            description=f"**{topic['topic']}**",
+            title=f"대기열 주제 [{self.current_page + 1}/{self.max_pages}] (ID: {topic.id})",
+            description=f"**{topic.topic}**",
             color=discord.Color.blue()
         )
         
         desc = ""
-        for idx, opt in enumerate(topic['options']):
-            if isinstance(opt, dict):
-                desc += f"**{idx+1}. {opt.get('name', '옵션')}**\n- {opt.get('desc', '')}\n\n"
+        for idx, opt in enumerate(topic.options):
+            if opt.desc:
+                desc += f"**{idx+1}. {opt.name}**\n- {opt.desc}\n\n"
             else:
-                desc += f"**{idx+1}. {opt}**\n"
+                desc += f"**{idx+1}. {opt.name}**\n"
                 
         embed.add_field(name="옵션", value=desc.strip(), inline=False)
-        embed.add_field(name="단답허용", value="O" if topic['allow_short_answer'] else "X", inline=True)
+        embed.add_field(name="단답허용", value="O" if topic.allow_short_answer else "X", inline=True)
+        embed.add_field(name="복수선택", value="O" if topic.allow_multiple else "X", inline=True)
         
-        if topic.get('image_url'):
+        if topic.image_url:
             import urllib.parse
-            parsed = urllib.parse.urlparse(topic['image_url'])
-            is_image = parsed.path.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp')) or 'pollinations.ai' in topic['image_url']
+            parsed = urllib.parse.urlparse(topic.image_url)
+            is_image = parsed.path.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp')) or 'pollinations.ai' in topic.image_url
             
             if is_image:
-                embed.set_thumbnail(url=topic['image_url'])
+                embed.set_thumbnail(url=topic.image_url)
             else:
-                embed.add_field(name="🔗 참고 링크", value=topic['image_url'], inline=False)
+                embed.add_field(name="🔗 참고 링크", value=topic.image_url, inline=False)
             
-        embed.add_field(name="제안자", value=f"<@{topic['suggested_by']}>", inline=False)
+        embed.add_field(name="제안자", value=f"<@{topic.suggested_by}>", inline=False)
         return embed
 
     @discord.ui.button(label="이전", style=discord.ButtonStyle.secondary, emoji="⬅️")
     async def prev_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_page -= 1
+        topic = await database.get_suggested_topic_near(before_id=self.topic.id)
+        if topic:
+            self.topic = topic
+            self.current_page -= 1
         self.update_buttons()
         await interaction.response.edit_message(embed=self.get_current_embed(), view=self)
 
     @discord.ui.button(label="다음", style=discord.ButtonStyle.secondary, emoji="➡️")
     async def next_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_page += 1
+        topic = await database.get_suggested_topic_near(after_id=self.topic.id)
+        if topic:
+            self.topic = topic
+            self.current_page += 1
         self.update_buttons()
         await interaction.response.edit_message(embed=self.get_current_embed(), view=self)
         
     @discord.ui.button(label="추가하기", style=discord.ButtonStyle.success, emoji="✅")
     async def queue_add_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        topic = self.topics[self.current_page]
-        await database.delete_suggested_topic(topic['id'])
-        await database.add_to_queue(topic)
+        topic = self.topic
+        warning = similar_topic_warning(topic.topic, topic.options, exclude=('suggested', topic.id))
+        await database.delete_suggested_topic(topic.id)
+        await database.add_to_queue(topic.to_topic_data())
         await check_and_trigger_empty_survey(interaction.client)
         
         # UI에서 삭제 처리
-        self.topics.pop(self.current_page)
-        self.max_pages = len(self.topics)
-        if self.current_page >= self.max_pages and self.current_page > 0:
-            self.current_page -= 1
+        await self.remove_current_topic()
         self.update_buttons()
         
         await interaction.response.edit_message(
-            content=f"✅ **[{topic['topic']}]** 주제가 다음 송출을 위해 대기열 큐(Queue)에 배치되었습니다!", 
+            content=f"✅ **[{topic.topic}]** 주제가 다음 송출을 위해 대기열 큐(Queue)에 배치되었습니다!" + warning,
             embed=self.get_current_embed(), 
             view=self
         )
         
     @discord.ui.button(label="즉시 강제시작", style=discord.ButtonStyle.danger, emoji="⚠️", row=1)
     async def force_pick_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        topic = self.topics[self.current_page]
-        await database.delete_suggested_topic(topic['id'])
+        topic = self.topic
+        await database.delete_suggested_topic(topic.id)
         master_cog = interaction.client.get_cog('Master')
         if master_cog:
-            await master_cog.force_new_topic(topic, interaction.user)
+            await master_cog.force_new_topic(topic.to_topic_data(), interaction.user)
         else:
             await interaction.response.send_message("❌ Master 모듈을 찾을 수 없습니다. 봇을 재구동하거나 모듈을 리로드하세요.", ephemeral=True)
             return
         
         # UI에서 삭제 처리
-        self.topics.pop(self.current_page)
-        self.max_pages = len(self.topics)
-        if self.current_page >= self.max_pages and self.current_page > 0:
-            self.current_page -= 1
+        await self.remove_current_topic()
         self.update_buttons()
         
         await interaction.response.edit_message(
-            content=f"🚨 **[{topic['topic']}]** 주제가 즉시 채택되어 전체 서버 방출되었습니다!", 
+            content=f"🚨 **[{topic.topic}]** 주제가 즉시 채택되어 전체 서버 방출되었습니다!", 
             embed=self.get_current_embed(), 
             view=self
         )
         
     @discord.ui.button(label="이 주제 수정하기", style=discord.ButtonStyle.primary, emoji="🛠️", row=1)
     async def edit_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        topic = self.topics[self.current_page]
+        topic = self.topic
         from cogs.survey import SuggestionBuilderView
         view = SuggestionBuilderView(
-            topic=topic['topic'],
+            topic=topic.topic,
             master_cog=self.master_cog,
-            user_id=topic['suggested_by'],
-            edit_target_id=topic['id'],
-            existing_options=topic['options'],
-            allow_short=topic['allow_short_answer'],
-            image_url=topic.get('image_url')
+            user_id=topic.suggested_by,
+            edit_target_id=topic.id,
+            existing_options=database.option_dicts(topic.options),
+            allow_short=topic.allow_short_answer,
+            image_url=topic.image_url,
+            allow_multiple=topic.allow_multiple
         )
         embed = view.get_embed()
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
     @discord.ui.button(label="이 주제 거절(삭제)", style=discord.ButtonStyle.danger, emoji="🗑️")
     async def delete_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        topic_id = self.topics[self.current_page]['id']
+        topic_id = self.topic.id
         await database.delete_suggested_topic(topic_id)
 
         
-        self.topics.pop(self.current_page)
-        self.max_pages = len(self.topics)
-        if self.current_page >= self.max_pages and self.current_page > 0:
-            self.current_page -= 1
+        await self.remove_current_topic()
             
         self.update_buttons()
         await interaction.response.edit_message(embed=self.get_current_embed(), view=self)
@@ -290,34 +361,24 @@ class TopicPaginationView(discord.ui.View):
     @discord.ui.button(label="AI로 가공 후 추가", style=discord.ButtonStyle.primary, emoji="🤖")
     async def ai_pick_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer(thinking=True, ephemeral=True)
-        topic = self.topics[self.current_page]
+        topic = self.topic
         
-        is_valid = await self.master_cog.evaluate_topic(topic['topic'], topic['options'])
+        is_valid = await self.master_cog.evaluate_topic(topic.topic, database.option_dicts(topic.options))
         if is_valid:
             # AI 승인되었다고 간주, 추가 텍스트(image_prompt 등) 부여를 위해 생성 요청
             # 하지만 단순 승인일 경우 evaluate_topic은 True만 리턴하므로,
             # 여기서는 제안자의 구성을 유지하면서 이미지만 생성해본다고 가정
-            image_url = topic.get('image_url')
-
-            await database.delete_suggested_topic(topic['id'])
-            await database.add_to_queue({
-                'topic': topic['topic'],
-                'options': topic['options'],
-                'allow_short_answer': topic['allow_short_answer'],
-                'suggested_by': topic['suggested_by'],
-                'image_url': image_url
-            })
+            warning = similar_topic_warning(topic.topic, topic.options, exclude=('suggested', topic.id))
+            await database.delete_suggested_topic(topic.id)
+            await database.add_to_queue(topic.to_topic_data())
             await check_and_trigger_empty_survey(interaction.client)
             
-            self.topics.pop(self.current_page)
-            self.max_pages = len(self.topics)
-            if self.current_page >= self.max_pages and self.current_page > 0:
-                self.current_page -= 1
+            await self.remove_current_topic()
             self.update_buttons()
 
             await interaction.followup.edit_message(
                 message_id=interaction.message.id,
-                content="✅ AI가 주제 구성을 가공 및 승인하여 큐(Queue)에 배치했습니다.", 
+                content="✅ AI가 주제 구성을 가공 및 승인하여 큐(Queue)에 배치했습니다." + warning,
                 embed=self.get_current_embed(), 
                 view=self
             )
@@ -332,11 +393,11 @@ class TopicPaginationView(discord.ui.View):
         if generated_data:
             # options format handling (either list of strings or list of dicts)
             desc = ""
-            for idx, opt in enumerate(generated_data['options']):
-                if isinstance(opt, dict):
-                    desc += f"**{idx+1}. {opt.get('name', '옵션')}**\n- {opt.get('desc', '')}\n\n"
+            for idx, opt in enumerate(database.parse_options(generated_data['options'])):
+                if opt.desc:
+                    desc += f"**{idx+1}. {opt.name}**\n- {opt.desc}\n\n"
                 else:
-                    desc += f"**{idx+1}. {opt}**\n"
+                    desc += f"**{idx+1}. {opt.name}**\n"
                     
             embed = discord.Embed(
                 title="✨ AI 생성 주제 결과",
@@ -352,13 +413,15 @@ class TopicPaginationView(discord.ui.View):
 
     @discord.ui.button(label="🔄 새로고침", style=discord.ButtonStyle.secondary, row=2)
     async def refresh_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        import database
-        self.topics = await database.get_all_suggested_topics()
-        self.max_pages = len(self.topics)
-        if self.current_page >= self.max_pages and self.current_page > 0:
-            self.current_page = self.max_pages - 1
-        elif self.max_pages == 0:
-            self.current_page = 0
+        self.max_pages = await database.count_suggested_topics()
+        topic = None
+        if self.topic:
+            # 보고 있던 주제부터(삭제되었다면 그 다음 주제부터) 다시 표시
+            topic = await database.get_suggested_topic_near(after_id=self.topic.id - 1)
+            if topic is None:
+                topic = await database.get_suggested_topic_near(before_id=self.topic.id)
+        self.topic = topic or await database.get_suggested_topic_near()
+        self.current_page = max(0, min(self.current_page, self.max_pages - 1))
             
         self.update_buttons()
         await interaction.response.edit_message(embed=self.get_current_embed(), view=self)
@@ -369,184 +432,197 @@ class TopicPaginationView(discord.ui.View):
 
 
 class QueuePaginationView(discord.ui.View):
-    def __init__(self, topics: list, master_cog, active_queue_sessions: dict, user_id: int):
+    def __init__(self, topic: dict, total: int, master_cog, active_queue_sessions: dict, user_id: int):
         super().__init__(timeout=None)
-        self.topics = topics
+        # 전체 대기열 대신 현재 보고 있는 주제 한 개와 전체 개수만 들고 있습니다.
+        self.topic = topic
         self.master_cog = master_cog
         self.active_queue_sessions = active_queue_sessions
         self.user_id = user_id
         self.current_page = 0
-        self.max_pages = len(topics)
+        self.max_pages = total
         self.update_buttons()
 
+    @classmethod
+    async def create(cls, master_cog, active_queue_sessions: dict, user_id: int):
+        topic = await database.get_queued_topic_near()
+        total = await database.count_queued_topics()
+        return cls(topic, total, master_cog, active_queue_sessions, user_id)
+
+    async def remove_current_topic(self):
+        """현재 주제가 대기열에서 빠진 뒤 그 다음(없으면 이전) 주제 하나만 다시 불러옵니다."""
+        removed_key = (self.topic.position, self.topic.id)
+        self.max_pages = await database.count_queued_topics()
+        self.topic = await database.get_queued_topic_near(after=removed_key)
+        if self.topic is None:
+            self.topic = await database.get_queued_topic_near(before=removed_key)
+            self.current_page -= 1
+        self.current_page = max(0, min(self.current_page, self.max_pages - 1))
+
     def update_buttons(self):
         self.prev_btn.disabled = self.current_page == 0
-        self.next_btn.disabled = self.current_page == self.max_pages - 1
+        self.next_btn.disabled = self.current_page >= self.max_pages - 1
         
-        if self.max_pages == 0:
+        if self.topic is None:
             self.prev_btn.disabled = True
             self.next_btn.disabled = True
             self.force_pick_btn.disabled = True
             self.delete_btn.disabled = True
             self.move_up_btn.disabled = True
             self.move_down_btn.disabled = True
+            self.move_top_btn.disabled = True
             self.return_btn.disabled = True
         else:
             self.force_pick_btn.disabled = False
             self.delete_btn.disabled = False
             self.return_btn.disabled = False
             self.move_up_btn.disabled = (self.current_page == 0)
+            self.move_top_btn.disabled = (self.current_page == 0)
             self.move_down_btn.disabled = (self.current_page == self.max_pages - 1)
 
     def get_current_embed(self) -> discord.Embed:
-        if not self.topics:
+        if not self.topic:
             return discord.Embed(title="진행 대기열(Queue) 비어있음", description="아직 큐에 예약된 주제가 없습니다.", color=discord.Color.red())
             
-        topic = self.topics[self.current_page]
+        topic = self.topic
         embed = discord.Embed(
-            title=f"진행 대기열(Queue) 주제 [{self.current_page + 1}/{self.max_pages}] (ID: {topic['id']})",
-            description=f"**{topic['topic']}**",
+            title=f"진행 대기열(Queue) 주제 [{self.current_page + 1}/{self.max_pages}] (ID: {topic.id})",
+            description=f"**{topic.topic}**",
             color=discord.Color.green()
         )
         
         desc = ""
-        for idx, opt in enumerate(topic['options']):
-            if isinstance(opt, dict):
-                desc += f"**{idx+1}. {opt.get('name', '옵션')}**\n- {opt.get('desc', '')}\n\n"
+        for idx, opt in enumerate(topic.options):
+            if opt.desc:
+                desc += f"**{idx+1}. {opt.name}**\n- {opt.desc}\n\n"
             else:
-                desc += f"**{idx+1}. {opt}**\n"
+                desc += f"**{idx+1}. {opt.name}**\n"
                 
         embed.add_field(name="옵션", value=desc.strip(), inline=False)
-        embed.add_field(name="단답허용", value="O" if topic['allow_short_answer'] else "X", inline=True)
+        embed.add_field(name="단답허용", value="O" if topic.allow_short_answer else "X", inline=True)
+        embed.add_field(name="복수선택", value="O" if topic.allow_multiple else "X", inline=True)
         
-        if topic.get('image_url'):
+        if topic.image_url:
             import urllib.parse
-            parsed = urllib.parse.urlparse(topic['image_url'])
-            is_image = parsed.path.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp')) or 'pollinations.ai' in topic['image_url']
+            parsed = urllib.parse.urlparse(topic.image_url)
+            is_image = parsed.path.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp')) or 'pollinations.ai' in topic.image_url
             
             if is_image:
-                embed.set_thumbnail(url=topic['image_url'])
+                embed.set_thumbnail(url=topic.image_url)
             else:
-                embed.add_field(name="🔗 참고 링크", value=topic['image_url'], inline=False)
+                embed.add_field(name="🔗 참고 링크", value=topic.image_url, inline=False)
             
-        embed.add_field(name="제안자", value=f"<@{topic['suggested_by']}>", inline=False)
+        embed.add_field(name="제안자", value=f"<@{topic.suggested_by}>", inline=False)
         return embed
 
     @discord.ui.button(label="이전", style=discord.ButtonStyle.secondary, emoji="⬅️")
     async def prev_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_page -= 1
+        topic = await database.get_queued_topic_near(before=(self.topic.position, self.topic.id))
+        if topic:
+            self.topic = topic
+            self.current_page -= 1
         self.update_buttons()
         await interaction.response.edit_message(embed=self.get_current_embed(), view=self)
 
     @discord.ui.button(label="다음", style=discord.ButtonStyle.secondary, emoji="➡️", row=0)
     async def next_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_page += 1
+        topic = await database.get_queued_topic_near(after=(self.topic.position, self.topic.id))
+        if topic:
+            self.topic = topic
+            self.current_page += 1
         self.update_buttons()
         await interaction.response.edit_message(embed=self.get_current_embed(), view=self)
         
+    async def move_current_topic(self, interaction: discord.Interaction, new_index: int):
+        new_index = max(0, min(new_index, self.max_pages - 1))
+        # 옮긴 주제의 새 position만 반영하면 이전/다음 이동도 그대로 이어집니다.
+        position = await database.move_queue_item(self.topic.id, new_index)
+        if position is None:
+            # 다른 관리자가 먼저 제거하거나 채택한 주제
+            await self.remove_current_topic()
+            self.update_buttons()
+            await interaction.response.edit_message(content="⚠️ 이미 대기열에서 빠진 주제입니다.", embed=self.get_current_embed(), view=self)
+            return
+        self.topic = dataclasses.replace(self.topic, position=position)
+        self.current_page = new_index
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.get_current_embed(), view=self)
+
     @discord.ui.button(label="순서 위로", style=discord.ButtonStyle.secondary, emoji="🔼", row=0)
     async def move_up_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
         if self.current_page > 0:
-            import database
-            id1 = self.topics[self.current_page]['id']
-            id2 = self.topics[self.current_page - 1]['id']
-            await database.swap_queue_items(id1, id2)
-            
-            # ID swap in UI list directly to mirror DB change
-            temp = self.topics[self.current_page]['id']
-            self.topics[self.current_page]['id'] = self.topics[self.current_page - 1]['id']
-            self.topics[self.current_page - 1]['id'] = temp
-            
-            self.topics[self.current_page], self.topics[self.current_page - 1] = self.topics[self.current_page - 1], self.topics[self.current_page]
-            self.current_page -= 1
-            self.update_buttons()
-            await interaction.response.edit_message(embed=self.get_current_embed(), view=self)
+            await self.move_current_topic(interaction, self.current_page - 1)
 
     @discord.ui.button(label="순서 아래로", style=discord.ButtonStyle.secondary, emoji="🔽", row=0)
     async def move_down_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
         if self.current_page < self.max_pages - 1:
-            import database
-            id1 = self.topics[self.current_page]['id']
-            id2 = self.topics[self.current_page + 1]['id']
-            await database.swap_queue_items(id1, id2)
-            
-            # ID swap in UI list directly to mirror DB change
-            temp = self.topics[self.current_page]['id']
-            self.topics[self.current_page]['id'] = self.topics[self.current_page + 1]['id']
-            self.topics[self.current_page + 1]['id'] = temp
-            
-            self.topics[self.current_page], self.topics[self.current_page + 1] = self.topics[self.current_page + 1], self.topics[self.current_page]
-            self.current_page += 1
-            self.update_buttons()
-            await interaction.response.edit_message(embed=self.get_current_embed(), view=self)
+            await self.move_current_topic(interaction, self.current_page + 1)
+
+    @discord.ui.button(label="맨 앞으로", style=discord.ButtonStyle.secondary, emoji="⏫", row=0)
+    async def move_top_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.current_page > 0:
+            await self.move_current_topic(interaction, 0)
         
     # 대기열(Queue)에서는 수정하기 버튼을 사용하지 않습니다.
 
     @discord.ui.button(label="주제제시로 반환", style=discord.ButtonStyle.primary, emoji="🔙", row=1)
     async def return_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        topic = self.topics[self.current_page]
+        topic = self.topic
         import database
-        await database.return_queue_to_suggested(topic['id'])
+        await database.return_queue_to_suggested(topic.id)
         
-        self.topics.pop(self.current_page)
-        self.max_pages = len(self.topics)
-        if self.current_page >= self.max_pages and self.current_page > 0:
-            self.current_page -= 1
+        await self.remove_current_topic()
             
         self.update_buttons()
         await interaction.response.edit_message(
-            content=f"✅ **[{topic['topic']}]** 대기열 주제를 다시 유저 건의 목록(`!주제관리`)으로 되돌렸습니다.",
+            content=f"✅ **[{topic.topic}]** 대기열 주제를 다시 유저 건의 목록(`!주제관리`)으로 되돌렸습니다.",
             embed=self.get_current_embed(), 
             view=self
         )
 
     @discord.ui.button(label="이 대기열 제거", style=discord.ButtonStyle.danger, emoji="🗑️", row=1)
     async def delete_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        topic = self.topics[self.current_page]
+        topic = self.topic
         import database
-        await database.delete_queued_topic(topic['id'])
+        await database.delete_queued_topic(topic.id)
         
-        self.topics.pop(self.current_page)
-        self.max_pages = len(self.topics)
-        if self.current_page >= self.max_pages and self.current_page > 0:
-            self.current_page -= 1
+        await self.remove_current_topic()
             
         self.update_buttons()
         await interaction.response.edit_message(embed=self.get_current_embed(), view=self)
 
     @discord.ui.button(label="즉시 강제시작", style=discord.ButtonStyle.danger, emoji="⚠️", row=2)
     async def force_pick_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        topic = self.topics[self.current_page]
+        topic = self.topic
         import database
-        await database.delete_queued_topic(topic['id'])
+        await database.delete_queued_topic(topic.id)
         master_cog = interaction.client.get_cog('Master')
         if master_cog:
-            await master_cog.force_new_topic(topic, interaction.user)
+            await master_cog.force_new_topic(topic.to_topic_data(), interaction.user)
         else:
             await interaction.response.send_message("❌ Master 모듈을 찾을 수 없습니다. 봇을 재구동하거나 모듈을 리로드하세요.", ephemeral=True)
             return
         
-        self.topics.pop(self.current_page)
-        self.max_pages = len(self.topics)
-        if self.current_page >= self.max_pages and self.current_page > 0:
-            self.current_page -= 1
+        await self.remove_current_topic()
         self.update_buttons()
         
         await interaction.response.edit_message(
-            content=f"🚨 **[{topic['topic']}]** 대기열 주제가 즉시 채택되어 전체 서버 방출되었습니다!", 
+            content=f"🚨 **[{topic.topic}]** 대기열 주제가 즉시 채택되어 전체 서버 방출되었습니다!", 
             embed=self.get_current_embed(), 
             view=self
         )
 
     @discord.ui.button(label="🔄 새로고침", style=discord.ButtonStyle.secondary, row=2)
     async def refresh_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        import database
-        self.topics = await database.get_all_queued_topics()
-        self.max_pages = len(self.topics)
-        if self.current_page >= self.max_pages and self.current_page > 0:
-            self.current_page = self.max_pages - 1
-        elif self.max_pages == 0:
-            self.current_page = 0
+        self.max_pages = await database.count_queued_topics()
+        topic = None
+        if self.topic:
+            # 보고 있던 주제부터(삭제되었다면 그 다음 주제부터) 다시 표시
+            topic = await database.get_queued_topic_near(after=(self.topic.position, self.topic.id - 1))
+            if topic is None:
+                topic = await database.get_queued_topic_near(before=(self.topic.position, self.topic.id))
+        self.topic = topic or await database.get_queued_topic_near()
+        self.current_page = max(0, min(self.current_page, self.max_pages - 1))
             
         self.update_buttons()
         await interaction.response.edit_message(embed=self.get_current_embed(), view=self)
@@ -617,6 +693,35 @@ class BotAdmin(commands.Cog):
             
         await ctx.send(embed=embed)
 
+    @commands.command(name="샤드상태", description="[관리자 전용] 게이트웨이 샤드별 연결 상태, 지연 시간, 담당 서버 수를 확인합니다.")
+    async def shard_status(self, ctx: commands.Context):
+        if not await self.check_is_bot_admin(ctx):
+            return
+
+        guild_counts = {}
+        for guild in self.bot.guilds:
+            guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+
+        shards = getattr(self.bot, 'shards', None) or {}
+        lines = []
+        for shard_id in sorted(shards):
+            shard = shards[shard_id]
+            state = "🔴 끊김" if shard.is_closed() else ("🟡 제한 중" if shard.is_ws_ratelimited() else "🟢 정상")
+            latency = f"{shard.latency * 1000:.0f}ms" if shard.latency == shard.latency else "측정 전"
+            lines.append(f"`#{shard_id}` {state} · {latency} · 서버 {guild_counts.get(shard_id, 0)}개")
+        if not lines:
+            lines.append(f"`#0` 🟢 정상 · {self.bot.latency * 1000:.0f}ms · 서버 {len(self.bot.guilds)}개")
+
+        embed = discord.Embed(
+            title=f"🛰️ 샤드 상태 ({len(lines)}개, 준비 {'완료' if self.bot.is_ready() else '중'})",
+            description="\n".join(lines)[:4000],
+            color=discord.Color.blue()
+        )
+        cluster_cog = self.bot.get_cog('Cluster')
+        if cluster_cog:
+            embed.set_footer(text=await cluster_cog.leader_status())
+        await ctx.send(embed=embed)
+
     @commands.command(name="오늘의의견_강제송출", description="[관리자 전용] 즉시 오늘의 의견을 탐색하여 전체 서버에 송출합니다.")
     async def force_daily_opinion(self, ctx: commands.Context):
         if not await self.check_is_bot_admin(ctx):
@@ -649,9 +754,15 @@ class BotAdmin(commands.Cog):
         
         master_cog = self.bot.get_cog('Master')
         success_count = 0
+        skipped_topics = []
         for _ in range(count):
             generated_data = await master_cog.generate_topic()
             if generated_data:
+                # 이미 다뤘거나 대기 중인 주제와 거의 같으면 대기열에 넣지 않음
+                if database.find_similar_topics(generated_data['topic'], generated_data.get('options')):
+                    skipped_topics.append(generated_data['topic'])
+                    continue
+
                 import urllib.parse
                 image_url = None
                 if 'image_prompt' in generated_data:
@@ -668,7 +779,10 @@ class BotAdmin(commands.Cog):
                 success_count += 1
                 
         await check_and_trigger_empty_survey(self.bot) # Added call here
-        await ctx.send(f"✅ 대기열 큐(Queue)에 **{success_count}개**의 AI 주제 충전이 완료되었습니다! (`!주제관리` 인터페이스로 확인 및 수정 가능)")
+        msg = f"✅ 대기열 큐(Queue)에 **{success_count}개**의 AI 주제 충전이 완료되었습니다! (`!주제관리` 인터페이스로 확인 및 수정 가능)"
+        if skipped_topics:
+            msg += f"\n⚠️ 기존 주제와 중복되어 제외된 AI 주제 {len(skipped_topics)}개: " + ", ".join(f"`{t}`" for t in skipped_topics)
+        await ctx.send(msg)
 
     @commands.command(name="관리자가이드", aliases=["관리자설명서"], description="[관리자 전용] 레전드 갈드컵 봇의 관리 시스템 및 흐름을 안내합니다.")
     async def admin_guide(self, ctx: commands.Context):
@@ -734,59 +848,135 @@ class BotAdmin(commands.Cog):
             return
             
         await ctx.send("⏳ Github에서 최신 코드를 가져오는 중입니다...")
+        started = time.perf_counter()
         
         import subprocess
+
+        def git(*args):
+            return subprocess.run(['git', *args], capture_output=True, text=True, check=True).stdout.strip()
+
         try:
+            old_head = await asyncio.to_thread(git, 'rev-parse', 'HEAD')
             # 1. git fetch --all
-            await asyncio.to_thread(
-                subprocess.run,
-                ['git', 'fetch', '--all'],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
+            await asyncio.to_thread(git, 'fetch', '--all')
             # 2. git reset --hard origin/main
-            result = await asyncio.to_thread(
-                subprocess.run,
-                ['git', 'reset', '--hard', 'origin/main'],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            output = result.stdout.strip()
-            # Note: "HEAD is now at" is the typical output of git reset --hard
-            if not output:
-                await ctx.send("✅ 이미 최신 상태이거나 출력이 없습니다.")
+            output = await asyncio.to_thread(git, 'reset', '--hard', 'origin/main')
+            new_head = await asyncio.to_thread(git, 'rev-parse', 'HEAD')
+            if new_head == old_head:
+                await ctx.send("✅ 이미 최신 상태입니다.")
                 return
-                
-            await ctx.send(f"📦 업데이트 내역이 감지되었습니다:\n```\n{output[:1800]}\n```\n🔄 새 종속성 설치 및 완전한 패치 적용을 위해 봇 프로세스를 **강제 재기동**합니다. 잠시 후 다시 시작됩니다...")
-            
-            # Ensure all .sh files remain executable after git operations
-            if os.name != 'nt':  # Only needed on Linux/macOS
-                try:
-                    subprocess.run(['chmod', '+x', 'start_bot.sh', 'stop_bot.sh', 'restart_bot.sh'], check=False)
-                except Exception as chmod_err:
-                    logger.warning(f"Failed to set executable permissions: {chmod_err}")
-
-            # Use platform-independent way to restart if possible, or trigger the shell script
-            import sys
-            if os.path.exists('restart_bot.sh') and os.name != 'nt':
-                # Linux/macOS environment
-                subprocess.Popen(['bash', 'restart_bot.sh'], start_new_session=True)
-            else:
-                # Fallback to python restart
-                subprocess.Popen([sys.executable, 'main.py'], start_new_session=True)
-            
-            # Kill current process gracefully
-            await self.bot.close()
-            os._exit(0)
-            
+            changed_files = (await asyncio.to_thread(git, 'diff', '--name-only', old_head, new_head)).splitlines()
         except subprocess.CalledProcessError as e:
             await ctx.send(f"🚨 Github에서 코드를 가져오는 중 오류가 발생했습니다.\n```\n{e.stderr[:1800]}\n```")
+            return
         except Exception as e:
             await ctx.send(f"🚨 기타 오류 발생: {e}")
+            return
+
+        # Ensure all .sh files remain executable after git operations
+        if os.name != 'nt':  # Only needed on Linux/macOS
+            try:
+                subprocess.run(['chmod', '+x', 'start_bot.sh', 'stop_bot.sh', 'restart_bot.sh'], check=False)
+            except Exception as chmod_err:
+                logger.warning(f"Failed to set executable permissions: {chmod_err}")
+
+        restart_reason, extensions = plan_update(changed_files, self.bot.extensions)
+        await ctx.send(f"📦 업데이트 내역이 감지되었습니다 ({len(changed_files)}개 파일 변경):\n```\n{output[:1800]}\n```")
+
+        # 클러스터 모드에서는 나머지 프로세스가 cache_sync_loop에서 이 기록을 읽고 같은 방법으로 적용함
+        from cogs.cluster import CACHE_SYNC_INTERVAL
+        cluster = self.bot.get_cog('Cluster')
+        cluster_note = (
+            f"\n다른 클러스터 프로세스도 {CACHE_SYNC_INTERVAL}초 안에 같은 방법으로 적용합니다."
+            if cluster and cluster.enabled else ""
+        )
+
+        if restart_reason is None:
+            reloaded = []
+            try:
+                synced = await self._reload_extensions(extensions, reloaded)
+            except Exception as e:
+                # reload_extension은 실패하면 기존 코그를 그대로 두므로, 완전히 새로 띄우는 쪽으로 넘어감
+                logger.error(f"Hot reload failed after {reloaded}: {e}")
+                restart_reason = f"리로드 실패 ({e})"
+            else:
+                elapsed = time.perf_counter() - started
+                logger.info(f"Hot reloaded {reloaded or 'nothing'} in {elapsed:.2f}s.")
+                # 리로드로 Cluster 코그가 바뀌었을 수 있으므로 다시 찾음
+                cluster = self.bot.get_cog('Cluster')
+                if cluster:
+                    await cluster.broadcast_update(new_head, extensions)
+                await ctx.send(
+                    f"♻️ **핫 리로드**로 적용했습니다. ({elapsed:.1f}초, 게이트웨이 연결과 캐시 유지)\n"
+                    f"다시 불러온 코그: {', '.join(f'`{n}`' for n in reloaded) or '없음 (코드 외 변경)'}"
+                    + ("\n슬래시 명령어 구성이 바뀌어 다시 동기화했습니다." if synced else "")
+                    + cluster_note
+                )
+                return
+
+        await ctx.send(f"🔄 {restart_reason} — 새 종속성 설치 및 완전한 패치 적용을 위해 봇 프로세스를 **재기동**합니다. 다시 시작되면 이 채널에 소요 시간을 알려드립니다.{cluster_note}")
+        # 새 프로세스의 BotAdmin.on_ready가 이 기록을 보고 완료 메시지를 보냄 (time.time이라 프로세스가 달라도 비교 가능)
+        await database.set_global_setting(UPDATE_REPORT_KEY, json.dumps({
+            'channel_id': ctx.channel.id,
+            'started_at': time.time() - (time.perf_counter() - started),
+            'reason': restart_reason,
+        }))
+        if cluster:
+            await cluster.broadcast_update(new_head, extensions, restart_reason)
+        await self._restart_process("!업데이트 재기동")
+
+    async def _reload_extensions(self, extensions, reloaded: list) -> bool:
+        """확장을 차례로 다시 불러오고 슬래시 명령어 구성이 바뀌었으면 동기화합니다. 불러온 이름은 reloaded에 쌓입니다."""
+        for name in extensions:
+            await self.bot.reload_extension(name)
+            reloaded.append(name)
+        return await self.bot.sync_commands_if_changed()
+
+    async def _restart_process(self, reason: str):
+        # restart_bot.sh는 이 프로세스의 환경 변수(CLUSTER_ID, SHARD_IDS)를 물려받아 이 클러스터만 다시 띄움
+        import subprocess
+        import sys
+        if os.path.exists('restart_bot.sh') and os.name != 'nt':
+            # Linux/macOS environment
+            subprocess.Popen(['bash', 'restart_bot.sh'], start_new_session=True)
+        else:
+            # Fallback to python restart
+            subprocess.Popen([sys.executable, 'main.py'], start_new_session=True)
+
+        # 진행 중인 송출/쓰기를 마무리한 뒤 종료 (restart_bot.sh가 보내는 SIGTERM과 겹쳐도 같은 종료 작업을 기다림)
+        await self.bot.request_shutdown(reason)
+        os._exit(0)
+
+    async def apply_cluster_update(self, update: dict):
+        """다른 클러스터 프로세스가 !업데이트로 적용한 코드를 이 프로세스에도 적용합니다. (Cluster.cache_sync_loop에서 호출)"""
+        restart_reason = update.get('restart')
+        if restart_reason is None:
+            extensions = [name for name in update.get('extensions', []) if name in self.bot.extensions]
+            reloaded = []
+            try:
+                await self._reload_extensions(extensions, reloaded)
+            except Exception as e:
+                logger.error(f"Cluster hot reload to {update.get('head')} failed after {reloaded}: {e}")
+                restart_reason = f"리로드 실패 ({e})"
+            else:
+                logger.info(f"Followed cluster update to {update.get('head')}: reloaded {reloaded or 'nothing'}.")
+                return
+        logger.info(f"Restarting to follow cluster update to {update.get('head')}: {restart_reason}")
+        await self._restart_process("클러스터 !업데이트 재기동")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # !업데이트가 재기동 경로를 탔다면 새 프로세스에서 완료와 소요 시간을 알림
+        raw = await database.get_global_setting(UPDATE_REPORT_KEY)
+        if not raw:
+            return
+        await database.set_global_setting(UPDATE_REPORT_KEY, '')
+        try:
+            report = json.loads(raw)
+            channel = self.bot.get_channel(report['channel_id']) or await self.bot.fetch_channel(report['channel_id'])
+            await channel.send(f"✅ 재기동을 마쳤습니다. ({report.get('reason', '업데이트')}, 총 {time.time() - report['started_at']:.1f}초)")
+        except Exception as e:
+            logger.warning(f"Failed to send update report: {e}")
 
     @commands.command(name="주제관리", description="[관리자 전용] DM으로 제안된 아이디어들을 열람하고 대기열로 넘깁니다.")
     async def manage_topics(self, ctx: commands.Context):
@@ -801,10 +991,9 @@ class BotAdmin(commands.Cog):
         # DM 전송 시도
         try:
             self.active_topic_sessions[ctx.author.id] = True
-            topics = await database.get_all_suggested_topics()
             master_cog = self.bot.get_cog('Master')
-            
-            view = TopicPaginationView(topics, master_cog, self.active_topic_sessions, ctx.author.id)
+
+            view = await TopicPaginationView.create(master_cog, self.active_topic_sessions, ctx.author.id)
             embed = view.get_current_embed()
             
             await ctx.author.send(embed=embed, view=view)
@@ -829,10 +1018,9 @@ class BotAdmin(commands.Cog):
             
         try:
             self.active_queue_sessions[ctx.author.id] = True
-            topics = await database.get_all_queued_topics()
             master_cog = self.bot.get_cog('Master')
-            
-            view = QueuePaginationView(topics, master_cog, self.active_queue_sessions, ctx.author.id)
+
+            view = await QueuePaginationView.create(master_cog, self.active_queue_sessions, ctx.author.id)
             embed = view.get_current_embed()
             
             await ctx.author.send(embed=embed, view=view)
@@ -867,71 +1055,59 @@ class BotAdmin(commands.Cog):
             await ctx.send("❌ 현재 진행 중인 갈드컵 주제가 없어 테스트할 수 없습니다.")
             return
 
-        survey_id = active_survey['id']
-        votes = await database.get_votes_for_survey(survey_id)
-        if not votes:
+        survey_id = active_survey.id
+        master_cog = self.bot.get_cog('Master')
+        if not master_cog:
+            await ctx.send("❌ 마스터 모듈을 찾을 수 없습니다.")
+            return
+        total_votes_users, all_opinions = await master_cog.collect_vote_summary(survey_id)
+        if not total_votes_users:
             await ctx.send("❌ 등록된 표가 없기 때문에 차트 및 여론 분석 테스트를 진행할 수 없습니다.")
             return
 
+        archive_name = f"survey_{survey_id}"
         if save_flag == '1':
-            new_id = await database.create_survey_snapshot(survey_id)
-            if new_id:
-                survey_id = new_id
-                await ctx.send("💾 **스냅샷 복사 완료!**\n현재 진행 중인 투표를 닫지 않고, 지금 이 순간의 결과를 과거 통계 기록(`/조회`)으로 박제합니다.")
+            snapshot_id = await database.create_survey_snapshot(survey_id)
+            if snapshot_id:
+                archive_name = f"snapshot_{snapshot_id}"
+                await ctx.send(f"💾 **스냅샷 저장 완료! (ID: {snapshot_id})**\n현재 진행 중인 투표를 닫지 않고, 지금 이 순간의 집계 결과를 박제합니다. `!스냅샷 {snapshot_id}` 로 다시 볼 수 있습니다.")
 
         await ctx.send("📊 현재까지의 투표 데이터를 바탕으로 차트와 AI 분류 텍스트를 생성 중입니다. (약 5~10초 소요)...")
-        master_cog = self.bot.get_cog('Master')
 
-        total_votes_users = len(votes)
-        options_counts = {}
-        for opt in active_survey['options']:
-            opt_name = opt.get('name', opt) if isinstance(opt, dict) else opt
-            options_counts[opt_name] = 0
-            
-        for v in votes:
-            chosen = [c.strip() for c in v['selected_option'].split(',')]
-            for c in chosen:
-                if c in options_counts:
-                    options_counts[c] += 1
-                else:
-                    options_counts[c] = 1
+        options_counts = database.tallies_to_counts(active_survey.options, await database.get_vote_tallies(survey_id))
 
         stats_str = f"테스트 투표 참여인원: {total_votes_users}명\n"
         for opt, cnt in sorted(options_counts.items(), key=lambda item: item[1], reverse=True):
             ratio = (cnt / total_votes_users * 100) if total_votes_users > 0 else 0
             stats_str += f"- **{opt}**: {ratio:.1f}% ({cnt}표)\n"
 
-        server_opinions = {}
-        for v in votes:
-            if v['opinion']:
-                if v['server_id'] not in server_opinions:
-                    server_opinions[v['server_id']] = []
-                server_opinions[v['server_id']].append(f"[{v['selected_option']}] {v['opinion']}")
-
-        all_opinions = [v['opinion'] for v in votes if v['opinion']]
         import asyncio
-        chart_bytes = await asyncio.to_thread(master_cog.generate_option_chart_blocking, options_counts, survey_id)
+        chart_bytes = await asyncio.to_thread(master_cog.generate_option_chart_blocking, options_counts, survey_id, archive_name)
         
         clustered_data = []
         if all_opinions:
-            clustered_data = await master_cog.cluster_opinions(active_survey['topic'], all_opinions)
+            clustered_data = await master_cog.cluster_opinions(active_survey.topic, all_opinions)
 
         import os
         import json
         os.makedirs(os.path.join("data", "charts"), exist_ok=True)
         result_data = {
             "survey_id": survey_id,
-            "topic": active_survey['topic'],
+            "topic": active_survey.topic,
             "total_votes": total_votes_users,
             "options_counts": options_counts,
             "stats_str": stats_str,
             "clustered_data": clustered_data
         }
-        with open(os.path.join("data", "charts", f"survey_{survey_id}.json"), 'w', encoding='utf-8') as f:
-            json.dump(result_data, f, ensure_ascii=False, indent=4)
+        from cogs.master import write_file_atomic
+        write_file_atomic(
+            os.path.join("data", "charts", f"{archive_name}.json"),
+            lambda f: json.dump(result_data, f, ensure_ascii=False, indent=4),
+            encoding='utf-8'
+        )
 
         embed = discord.Embed(
-            title=f"🛠️ [테스트] 갈드컵 중간 결과: {active_survey['topic']}",
+            title=f"🛠️ [테스트] 갈드컵 중간 결과: {active_survey.topic}",
             description=stats_str,
             color=discord.Color.blue()
         )
@@ -954,47 +1130,180 @@ class BotAdmin(commands.Cog):
             files.append(image_file)
 
         from cogs.survey import OpinionPaginationView
-        all_ops_formatted = [f"[{v['selected_option']}] \"{v['opinion']}\"" for v in votes if v['opinion']]
         
         # 먼저 통계 및 차트 전송
         await ctx.send(embed=embed, files=files)
         
         # 의견이 있으면 별도의 메세지로 페이지네이션 뷰를 전송
-        if all_ops_formatted:
-            view = OpinionPaginationView(active_survey['topic'], all_ops_formatted)
+        view = await OpinionPaginationView.create(survey_id)
+        if view.opinions:
             await ctx.send(embed=view.get_embed(), view=view)
 
+    @commands.command(name="스냅샷", description="[관리자 전용] 저장된 중간 집계 스냅샷 목록을 보거나, ID를 지정해 해당 시점의 차트를 확인합니다.")
+    async def view_snapshot(self, ctx: commands.Context, snapshot_id: int = None):
+        if not await self.check_is_bot_admin(ctx):
+            return
+
+        if snapshot_id is None:
+            snapshots = await database.get_survey_snapshots(limit=10)
+            if not snapshots:
+                await ctx.send("❌ 저장된 스냅샷이 없습니다. `!차트테스트 1` 로 현재 집계를 박제할 수 있습니다.")
+                return
+            desc = ""
+            for snap in snapshots:
+                desc += f"**[ID: {snap['id']}]** {snap.get('topic') or '삭제된 주제'} - {snap['total_votes']}표 / 의견 {snap['opinion_count']}개 ({snap['taken_at']})\n"
+            embed = discord.Embed(title="💾 최근 집계 스냅샷", description=desc, color=discord.Color.blue())
+            embed.set_footer(text="!스냅샷 <ID> 로 해당 시점의 차트를 확인할 수 있습니다.")
+            await ctx.send(embed=embed)
+            return
+
+        snap = await database.get_survey_snapshot(snapshot_id)
+        if not snap:
+            await ctx.send(f"❌ ID {snapshot_id}인 스냅샷을 찾을 수 없습니다.")
+            return
+
+        survey = await database.get_survey(snap['survey_id'])
+        topic = survey.topic if survey else f"{snap['survey_id']}회차"
+        options_counts = database.tallies_to_counts(survey.options if survey else [], snap['tallies'])
+        total_votes_users = snap['total_votes']
+
+        stats_str = f"스냅샷 시점 참여인원: {total_votes_users}명 (의견 {snap['opinion_count']}개)\n"
+        for opt, cnt in sorted(options_counts.items(), key=lambda item: item[1], reverse=True):
+            ratio = (cnt / total_votes_users * 100) if total_votes_users > 0 else 0
+            stats_str += f"- **{opt}**: {ratio:.1f}% ({cnt}표)\n"
+
+        embed = discord.Embed(
+            title=f"💾 [스냅샷 {snapshot_id}] {topic}",
+            description=stats_str,
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text=f"저장 시각: {snap['taken_at']} (UTC)")
+
+        import io
+        png_path = os.path.join("data", "charts", f"snapshot_{snapshot_id}.png")
+        files = []
+        if os.path.exists(png_path):
+            files.append(discord.File(png_path, filename="snapshot.png"))
+        else:
+            master_cog = self.bot.get_cog('Master')
+            chart_bytes = await asyncio.to_thread(master_cog.generate_option_chart_blocking, options_counts, snap['survey_id'], f"snapshot_{snapshot_id}") if master_cog else None
+            if chart_bytes:
+                files.append(discord.File(io.BytesIO(chart_bytes), filename="snapshot.png"))
+        if files:
+            embed.set_image(url="attachment://snapshot.png")
+
+        await ctx.send(embed=embed, files=files)
+
     @commands.command(name="통계청소", description="[관리자 전용] 투표수가 0인 과거 기록과 스냅샷 데이터를 일괄 삭제합니다.")
-    async def clean_empty_statistics(self, ctx: commands.Context):
+    async def clean_empty_statistics(self, ctx: commands.Context, mode: str = None):
         if not await self.check_is_bot_admin(ctx):
             return
             
+        if mode in ('미리보기', 'dry'):
+            survey_ids, snapshot_ids = await database.purge_empty_surveys(dry_run=True)
+            preview = ", ".join(str(i) for i in survey_ids[:50])
+            if len(survey_ids) > 50:
+                preview += f" 외 {len(survey_ids) - 50}개"
+            await ctx.send(
+                f"🔍 **[미리보기]** 삭제 대상인 빈 과거 통계는 **{len(survey_ids)}개** (연결된 스냅샷 {len(snapshot_ids)}개) 입니다.\n"
+                + (f"대상 ID: {preview}\n" if preview else "")
+                + "실제로 삭제하려면 `!통계청소` 를 입력하세요."
+            )
+            return
+            
         await ctx.send("🧹 **0표 이하의 빈 과거 통계 데이터** 청소를 시작합니다...")
         
-        past_surveys = await database.get_past_surveys(limit=1000)
-        deleted_count = 0
-        import os
+        survey_ids, snapshot_ids = await database.purge_empty_surveys()
+        archive_names = [f"survey_{i}" for i in survey_ids] + [f"snapshot_{i}" for i in snapshot_ids]
         
-        for s in past_surveys:
-            votes = await database.get_votes_for_survey(s['id'])
-            if len(votes) == 0:
-                await database.delete_survey(s['id'])
-                # remove files
-                json_path = os.path.join("data", "charts", f"survey_{s['id']}.json")
-                png_path = os.path.join("data", "charts", f"survey_{s['id']}.png")
-                if os.path.exists(json_path):
-                    try:
-                        os.remove(json_path)
-                    except:
-                        pass
-                if os.path.exists(png_path):
-                    try:
-                        os.remove(png_path)
-                    except:
-                        pass
-                deleted_count += 1
+        # 차트/분석 아카이브 파일은 백그라운드 작업자가 정리
+        maintenance_cog = self.bot.get_cog('Maintenance')
+        if maintenance_cog:
+            maintenance_cog.enqueue_archive_removal(archive_names)
+        else:
+            from cogs.maintenance import remove_archive_files
+            await asyncio.to_thread(remove_archive_files, archive_names)
                 
-        await ctx.send(f"✅ 총 **{deleted_count}개**의 빈 통계 데이터를 깔끔하게 삭제했습니다.")
+        await ctx.send(f"✅ 총 **{len(survey_ids)}개**의 빈 통계 데이터를 깔끔하게 삭제했습니다.")
+
+    @commands.command(name="검색색인", description="[관리자 전용] /검색에 쓰이는 전문 검색 색인을 최적화하거나 재구축합니다.")
+    async def maintain_search_index(self, ctx: commands.Context, mode: str = None):
+        if not await self.check_is_bot_admin(ctx):
+            return
+
+        command = 'rebuild' if mode in ('재구축', 'rebuild') else 'optimize'
+        label = "재구축" if command == 'rebuild' else "최적화"
+        await ctx.send(f"⚙️ 검색 색인 {label}를 시작합니다...")
+
+        started = time.perf_counter()
+        try:
+            await database.maintain_search_index(command)
+        except Exception as e:
+            logger.error(f"Error maintaining search index: {e}")
+            await ctx.send(f"❌ 검색 색인 {label} 중 오류가 발생했습니다: {e}")
+            return
+        elapsed = time.perf_counter() - started
+        await ctx.send(f"✅ 검색 색인 {label}를 완료했습니다. ({elapsed:.2f}초)")
+
+    @commands.command(name="백업", description="[관리자 전용] 봇을 멈추지 않고 DB를 백업합니다. '!백업 목록'으로 보관 중인 백업을 확인합니다.")
+    async def backup_database(self, ctx: commands.Context, mode: str = None):
+        if not await self.check_is_bot_admin(ctx):
+            return
+
+        from cogs.maintenance import list_backup_generations, BACKUP_GENERATIONS
+        if mode in ('목록', 'list'):
+            generations = list_backup_generations()
+            if not generations:
+                await ctx.send("📭 보관 중인 백업이 없습니다.")
+                return
+            lines = "\n".join(f"{idx + 1}. `{name}`" for idx, name in enumerate(generations))
+            await ctx.send(f"🗂️ **보관 중인 백업 (최신순, 최대 {BACKUP_GENERATIONS}개)**\n{lines}\n복원하려면 `!복원 [번호 또는 이름]` 을 입력하세요.")
+            return
+
+        maintenance_cog = self.bot.get_cog('Maintenance')
+        if not maintenance_cog:
+            await ctx.send("❌ 유지보수 기능이 로드되어 있지 않아 백업할 수 없습니다.")
+            return
+
+        await ctx.send("💾 DB 백업을 시작합니다... (투표는 계속 받을 수 있습니다)")
+        started = time.perf_counter()
+        try:
+            name, size = await maintenance_cog.create_backup()
+        except Exception as e:
+            logger.error(f"Error creating backup: {e}")
+            await ctx.send(f"❌ 백업 중 오류가 발생했습니다: {e}")
+            return
+        elapsed = time.perf_counter() - started
+        await ctx.send(f"✅ 백업 `{name}` 을(를) 만들었습니다. ({size / 1024:.0f} KiB, {elapsed:.2f}초)")
+
+    @commands.command(name="복원", description="[총관리자 전용] DB를 지정한 백업 시점으로 되돌립니다.")
+    async def restore_database(self, ctx: commands.Context, target: str = None):
+        if not await self.check_is_master(ctx):
+            return
+
+        from cogs.maintenance import list_backup_generations
+        generations = list_backup_generations()
+        if not target:
+            await ctx.send("❌ 복원할 백업을 지정해주세요. `!백업 목록` 으로 번호와 이름을 확인할 수 있습니다.")
+            return
+        name = generations[int(target) - 1] if target.isdigit() and 0 < int(target) <= len(generations) else target
+
+        maintenance_cog = self.bot.get_cog('Maintenance')
+        if not maintenance_cog:
+            await ctx.send("❌ 유지보수 기능이 로드되어 있지 않아 복원할 수 없습니다.")
+            return
+
+        await ctx.send(f"⏪ 백업 `{name}` 시점으로 DB를 되돌립니다...")
+        try:
+            safety_name = await maintenance_cog.restore_backup(name)
+        except ValueError as e:
+            await ctx.send(f"❌ {e}")
+            return
+        except Exception as e:
+            logger.error(f"Error restoring backup {name}: {e}")
+            await ctx.send(f"❌ 복원 중 오류가 발생했습니다: {e}")
+            return
+        await ctx.send(f"✅ `{name}` 시점으로 복원했습니다. 복원 직전 상태는 `{safety_name}` 백업으로 남겨 두었습니다.")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(BotAdmin(bot))
@@ -0,0 +1,158 @@
+from discord.ext import commands, tasks
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import database
+
+logger = logging.getLogger('discord')
+
+# 설문 순환/일일 송출/DB 유지보수를 맡을 프로세스를 정하는 임대 이름
+SCHEDULER_LEASE = 'scheduler'
+# 임대 유효 시간(초). 리더가 멈추면 늦어도 이 시간 + LEASE_CHECK_INTERVAL 안에 다른 프로세스가 넘겨받습니다.
+LEASE_TTL = 30
+# 리더는 이 간격으로 임대를 연장하고, 나머지 프로세스는 같은 간격으로 인수를 시도합니다.
+LEASE_CHECK_INTERVAL = 5
+# 연장이 늦어질 때 다른 프로세스와 겹치지 않도록, 만료 이 시간 전부터는 스스로 리더가 아닌 것으로 봅니다.
+LEASE_SAFETY_MARGIN = 3
+# 다른 프로세스가 바꾼 설정/주제를 메모리 캐시에 다시 읽어 오는 간격(초)
+CACHE_SYNC_INTERVAL = 30
+# !업데이트를 받은 프로세스가 적용 방법을 적어 두면, 나머지 프로세스가 cache_sync_loop에서 읽고 똑같이 적용하는 설정 키
+UPDATE_BROADCAST_KEY = 'cluster_update'
+
+class Cluster(commands.Cog):
+    """여러 프로세스가 샤드를 나눠 맡고 같은 SQLite DB를 쓰는 클러스터 모드의 리더 선출을 담당합니다.
+
+    CLUSTER_ID가 없으면 단일 프로세스 모드로 보고 항상 리더입니다.
+    클러스터 모드에서는 leases 테이블의 임대를 쥔 프로세스 하나만 스케줄러 작업을 돌리고,
+    나머지는 자기 샤드의 상호작용만 처리합니다.
+    """
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.cluster_id = getattr(bot, 'cluster_id', None)
+        # 같은 CLUSTER_ID로 재시작한 프로세스가 이전 프로세스의 임대를 이어받지 않도록 PID까지 붙임
+        self.holder = f"{self.cluster_id}@{socket.gethostname()}:{os.getpid()}"
+        self.lease_expires_at = 0.0
+        self._index_fingerprint = None
+        self._update_seen = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.cluster_id is not None
+
+    @property
+    def is_leader(self) -> bool:
+        if not self.enabled:
+            return True
+        return time.time() < self.lease_expires_at - LEASE_SAFETY_MARGIN
+
+    async def cog_load(self):
+        if not self.enabled:
+            return
+        logger.info(f"Cluster mode: {self.holder} (shards {getattr(self.bot, 'shard_ids', None)})")
+        # 첫 survey_loop보다 먼저 리더 여부가 정해지도록 한 번 바로 시도
+        await self._renew_lease()
+        self.lease_loop.start()
+        self.cache_sync_loop.start()
+
+    async def cog_unload(self):
+        if not self.enabled:
+            return
+        self.lease_loop.cancel()
+        self.cache_sync_loop.cancel()
+        if self.lease_expires_at:
+            try:
+                # 종료할 때 임대를 놓아 다른 프로세스가 만료를 기다리지 않고 바로 넘겨받게 함
+                await database.release_lease(SCHEDULER_LEASE, self.holder)
+                logger.info("Released scheduler lease.")
+            except Exception as e:
+                logger.warning(f"Failed to release scheduler lease: {e}")
+            self.lease_expires_at = 0.0
+
+    async def _renew_lease(self):
+        was_leader = self.is_leader
+        try:
+            expires_at = await database.acquire_lease(SCHEDULER_LEASE, self.holder, LEASE_TTL)
+        except Exception as e:
+            # DB가 잠시 잠겨 있으면 기존 만료 시각을 유지하고, 만료가 가까워지면 is_leader가 알아서 False가 됨
+            logger.warning(f"Failed to renew scheduler lease: {e}")
+            return
+        self.lease_expires_at = expires_at or 0.0
+
+        if self.is_leader and not was_leader:
+            logger.info(f"{self.holder} became the scheduler leader.")
+            # 팔로워였던 동안 다른 프로세스가 바꾼 내용을 스케줄러 작업 전에 반영
+            try:
+                await self._sync_caches()
+            except Exception as e:
+                logger.warning(f"Failed to sync caches after taking over the lease: {e}")
+        elif was_leader and not self.is_leader:
+            logger.warning(f"{self.holder} lost the scheduler lease.")
+
+    @tasks.loop(seconds=LEASE_CHECK_INTERVAL)
+    async def lease_loop(self):
+        await self._renew_lease()
+
+    async def _sync_caches(self):
+        await database.load_settings_cache()
+        await self._follow_update()
+        fingerprint = await database.get_topic_index_fingerprint()
+        if fingerprint != self._index_fingerprint:
+            if self._index_fingerprint is not None:
+                await database.rebuild_topic_index()
+            self._index_fingerprint = fingerprint
+
+    async def broadcast_update(self, head: str, extensions: list, restart_reason: str = None):
+        """!업데이트로 받은 코드를 다른 프로세스도 적용하도록 알립니다.
+        git reset은 같은 폴더를 쓰는 모든 프로세스에 이미 반영되었으므로, 코그 리로드나 재기동만 따라 하면 됩니다."""
+        if not self.enabled:
+            return
+        raw = json.dumps({'head': head, 'origin': self.holder, 'extensions': extensions, 'restart': restart_reason})
+        self._update_seen = raw
+        await database.set_global_setting(UPDATE_BROADCAST_KEY, raw)
+
+    async def _follow_update(self):
+        # 아직 기록이 없으면 ''로 읽어 '처음 읽음'(None)과 구분
+        raw = await database.get_global_setting(UPDATE_BROADCAST_KEY, '')
+        if raw == self._update_seen:
+            return
+        first_read = self._update_seen is None
+        self._update_seen = raw
+        # 시작(또는 이 코그를 다시 불러온) 직후 보이는 기록은 이미 반영된 코드이므로 따라 하지 않음
+        if first_read or not raw:
+            return
+        update = json.loads(raw)
+        if update.get('origin') == self.holder:
+            return
+        botadmin = self.bot.get_cog('BotAdmin')
+        if botadmin is None:
+            logger.warning(f"Cannot follow cluster update to {update.get('head')}: BotAdmin is not loaded.")
+            return
+        logger.info(f"Following cluster update to {update.get('head')} from {update.get('origin')}.")
+        # 리로드 대상에 이 코그도 있을 수 있으므로, 언로드 때 취소되는 이 루프 밖의 작업에서 적용
+        asyncio.create_task(botadmin.apply_cluster_update(update))
+
+    @tasks.loop(seconds=CACHE_SYNC_INTERVAL)
+    async def cache_sync_loop(self):
+        # 설정/관리자/주제 캐시는 프로세스마다 따로 있으므로 다른 프로세스의 쓰기를 주기적으로 반영
+        try:
+            await self._sync_caches()
+        except Exception as e:
+            logger.warning(f"Failed to sync caches from the shared database: {e}")
+
+    async def leader_status(self) -> str:
+        """!샤드상태에 붙일 한 줄 요약을 반환합니다."""
+        if not self.enabled:
+            return "단일 프로세스 모드"
+        lease = await database.get_lease(SCHEDULER_LEASE)
+        if lease is None or lease[1] <= time.time():
+            leader = "없음 (인수 대기)"
+        else:
+            leader = f"{lease[0]} ({lease[1] - time.time():.0f}초 남음)"
+        role = "리더" if self.is_leader else "팔로워"
+        return f"클러스터 {self.cluster_id} · 이 프로세스: {role} · 현재 리더: {leader}"
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Cluster(bot))
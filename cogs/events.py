@@ -13,12 +13,16 @@ class Events(commands.Cog):
     async def on_guild_join(self, guild: discord.Guild):
         logger.info(f"Joined new guild: {guild.name} (ID: {guild.id})")
         
+        # 저메모리 모드에서는 멤버 캐시가 없어 guild.owner가 비어 있으므로 API로 직접 조회
         owner = guild.owner
         if not owner:
             try:
                 owner = await guild.fetch_member(guild.owner_id)
             except Exception:
-                pass
+                try:
+                    owner = await self.bot.fetch_user(guild.owner_id)
+                except Exception:
+                    pass
 
         message_content = (
             f"안녕하세요! '{guild.name}' 서버에 '레전드 갈드컵' 봇을 초대해주셔서 감사합니다.\n\n"
@@ -45,7 +49,7 @@ class Events(commands.Cog):
             for channel in guild.text_channels:
                 if channel.permissions_for(guild.me).send_messages:
                     try:
-                        mention = owner.mention if owner else "서버 관리자"
+                        mention = owner.mention if owner else (f"<@{guild.owner_id}>" if guild.owner_id else "서버 관리자")
                         await channel.send(f"{mention}님! DM 전송이 막혀있어 이 채널에 메시지를 남깁니다.\n{message_content}")
                         logger.info(f"Sent ping message in channel {channel.name} of {guild.name}")
                         break
@@ -44,7 +44,8 @@ class General(commands.Cog):
                 "`/현재상황`: 현재 진행 중인 주제와 다른 사람들의 익명 의견을 열람합니다.\n"
                 "`/주제제시`: 다음 3일 간 진행할 재미있는 갈드컵 주제와 옵션들을 모집합니다.\n"
                 "`/통계`: 과거 종료된 모든 갈드컵 결과들을 페이지네이션으로 모아보고 상세 내역을 조회합니다.\n"
-                "`/조회 <ID>`: 특정 갈드컵의 아카이빙된 결과(AI 분석 및 전용 차트 이미지)를 원본 그대로 다시 송출합니다."
+                "`/조회 <ID>`: 특정 갈드컵의 아카이빙된 결과(AI 분석 및 전용 차트 이미지)를 원본 그대로 다시 송출합니다.\n"
+                "`/검색 <키워드>`: 지난 갈드컵의 주제와 익명 의견에서 키워드를 찾아 관련도 순으로 보여줍니다."
             ),
             inline=False
         )
@@ -71,9 +72,13 @@ class General(commands.Cog):
                     "`!AI주제충전 <개수>`: AI 자체 생성 주제를 대기열 버퍼에 다이렉트 예약\n"
                     "`!주제강제종료`: 현재 진행 중인 투표를 즉시 마감하고 다음 주제 송출\n"
                     "`!오늘의의견_강제송출`: 대기 시간 없이 즉시 오늘의 최고 의견 하나를 선정하여 모든 채널에 알림\n"
-                    "`!차트테스트 [1]`: 차트를 미리 확인합니다. 뒤에 `1`을 붙이면 본선 투표 종료 없이 스냅샷만 미리 저장합니다.\n"
-                    "`!통계청소`: 투표수가 0표라 보존 가치가 없는 과거 통계들을 일괄 삭제합니다.\n"
+                    "`!차트테스트 [1]`: 차트를 미리 확인합니다. 뒤에 `1`을 붙이면 본선 투표 종료 없이 현재 집계 스냅샷만 저장합니다.\n"
+                    "`!스냅샷 [ID]`: 저장된 집계 스냅샷 목록을 보거나, 특정 스냅샷 시점의 차트를 다시 확인합니다.\n"
+                    "`!통계청소 [미리보기]`: 투표수가 0표라 보존 가치가 없는 과거 통계들을 일괄 삭제합니다. `미리보기`를 붙이면 대상만 확인합니다.\n"
+                    "`!검색색인 [재구축]`: `/검색` 색인을 최적화합니다. `재구축`을 붙이면 원본 기록에서 색인을 다시 만듭니다.\n"
+                    "`!백업 [목록]`: 봇을 멈추지 않고 DB를 즉시 백업합니다. `목록`을 붙이면 보관 중인 백업 세대를 확인합니다.\n"
                     "`!관리자목록`: 권한을 부여받은 총/부관리자 현황 열람\n"
+                    "`!샤드상태`: 게이트웨이 샤드별 연결 상태와 지연 시간, 담당 서버 수 확인\n"
                     "`!관리자설명서`: 봇의 주제 큐(Queue) 송출 작동 원리 안내"
                 ),
                 inline=False
@@ -84,7 +89,8 @@ class General(commands.Cog):
                     name="👑 최고 관리자 전용 명령어",
                     value=(
                         "`!부관리자추가 [@유저] / !부관리자제거 [@유저]`: 봇 제어 권한 부여 및 박탈\n"
-                        "`!업데이트`: Github 최신 코드 호출 및 **단절 없는 백그라운드 재부팅 적용 (종속성 자동 설치)**\n"
+                        "`!복원 <번호|이름>`: DB를 지정한 백업 시점으로 되돌립니다. (복원 직전 상태는 자동 백업)\n"
+                        "`!업데이트`: Github 최신 코드 호출 후 **코그 핫 리로드** (종속성/핵심 모듈 변경 시에만 재기동)\n"
                         "*(봇에 심각한 오류 발생 시 해당 명령어를 서버 내에 전송하면 자가 복구합니다.)*"
                     ),
                     inline=False
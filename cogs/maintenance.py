@@ -0,0 +1,185 @@
+import discord
+from discord.ext import commands, tasks
+import logging
+import asyncio
+import os
+import shutil
+import time
+from datetime import datetime
+import database
+
+logger = logging.getLogger('discord')
+
+CHART_DIR = os.path.join("data", "charts")
+# 보관 DB로 옮기는 배치 사이의 대기 시간(초). 그 사이 투표 쓰기가 잠금을 얻을 수 있습니다.
+ARCHIVE_BATCH_PAUSE = 0.5
+
+# backups/<YYYYmmdd-HHMMSS>/ 폴더 하나가 한 세대의 백업 (현재 DB + 보관 DB)
+BACKUP_DIR = "backups"
+# 남겨 둘 백업 세대 수 (DB_MAINTENANCE_HOURS 간격이면 약 이틀치)
+BACKUP_GENERATIONS = 8
+DB_MAINTENANCE_HOURS = 6
+
+def list_backup_generations() -> list:
+    """백업 세대 이름을 최신순으로 반환합니다."""
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    names = [n for n in os.listdir(BACKUP_DIR) if os.path.isdir(os.path.join(BACKUP_DIR, n))]
+    return sorted(names, reverse=True)
+
+def prune_backup_generations(keep: int) -> list:
+    """최신 keep개를 제외한 오래된 백업 세대를 지우고, 지운 세대 이름을 반환합니다."""
+    removed = []
+    for name in list_backup_generations()[keep:]:
+        try:
+            shutil.rmtree(os.path.join(BACKUP_DIR, name))
+            removed.append(name)
+        except OSError as e:
+            logger.warning(f"Failed to remove backup generation {name}: {e}")
+    return removed
+
+def remove_archive_files(archive_names: list) -> int:
+    """data/charts 아래의 {이름}.json / {이름}.png 아카이브 파일들을 지웁니다. 지운 파일 수를 반환합니다."""
+    removed = 0
+    for name in archive_names:
+        for ext in ('json', 'png'):
+            path = os.path.join(CHART_DIR, f"{name}.{ext}")
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to remove archive file {path}: {e}")
+    return removed
+
+class Maintenance(commands.Cog):
+    """DB 정리 이후의 파일 삭제처럼 응답을 붙잡을 필요가 없는 작업을 백그라운드에서 처리합니다."""
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.artifact_queue = asyncio.Queue()
+        self.artifact_worker = None
+        self.archive_task = None
+        # 백업/복원이 서로 겹치지 않도록 직렬화
+        self.backup_lock = asyncio.Lock()
+
+    async def cog_load(self):
+        self.artifact_worker = asyncio.create_task(self._artifact_worker())
+        self.archive_loop.start()
+        self.db_maintenance_loop.start()
+
+    async def cog_unload(self):
+        if self.artifact_worker:
+            self.artifact_worker.cancel()
+        self.archive_loop.cancel()
+        self.db_maintenance_loop.cancel()
+        if self.archive_task:
+            self.archive_task.cancel()
+
+    async def drain(self):
+        """종료 전에 진행 중인 백업/복원과 대기 중인 아카이브 파일 삭제를 마칩니다.
+        보관 DB 이동은 배치마다 커밋되므로 멈춰 두고 다음 실행의 archive_loop에서 이어서 처리합니다."""
+        if self.archive_task and not self.archive_task.done():
+            self.archive_task.cancel()
+            await asyncio.gather(self.archive_task, return_exceptions=True)
+        async with self.backup_lock:
+            pass
+        if self.artifact_worker and not self.artifact_worker.done():
+            await self.artifact_queue.join()
+
+    def request_archive(self):
+        """종료된 설문의 투표를 보관 DB로 옮기는 작업을 시작합니다. 이미 진행 중이면 그 작업이 이어서 처리합니다."""
+        if self.archive_task is None or self.archive_task.done():
+            self.archive_task = asyncio.create_task(self._archive_closed_surveys())
+
+    async def _archive_closed_surveys(self):
+        moved = 0
+        survey_ids = set()
+        try:
+            while True:
+                result = await database.archive_closed_survey_batch()
+                if result is None:
+                    break
+                survey_id, count, _ = result
+                moved += count
+                survey_ids.add(survey_id)
+                await asyncio.sleep(ARCHIVE_BATCH_PAUSE)
+        except Exception as e:
+            logger.error(f"Error while archiving closed surveys: {e}")
+        if moved:
+            logger.info(f"Archived {moved} votes from {len(survey_ids)} closed surveys.")
+
+    def is_scheduler(self) -> bool:
+        master_cog = self.bot.get_cog('Master')
+        return master_cog is None or master_cog.is_scheduler()
+
+    @tasks.loop(hours=1)
+    async def archive_loop(self):
+        if not self.is_scheduler():
+            return
+        # 순환 직후 요청을 놓쳤거나 재시작으로 중단된 이동을 이어서 처리
+        self.request_archive()
+
+    async def _create_backup(self, suffix: str = None):
+        name = datetime.now().strftime('%Y%m%d-%H%M%S') + (f"-{suffix}" if suffix else "")
+        size = await database.backup_database(os.path.join(BACKUP_DIR, name))
+        await asyncio.to_thread(prune_backup_generations, BACKUP_GENERATIONS)
+        return name, size
+
+    async def create_backup(self, suffix: str = None):
+        """새 백업 세대를 만들고 오래된 세대를 정리합니다. (세대 이름, 백업 크기)를 반환합니다."""
+        async with self.backup_lock:
+            return await self._create_backup(suffix)
+
+    async def restore_backup(self, name: str) -> str:
+        """지정한 백업 세대로 DB를 되돌립니다. 되돌리기 직전 상태는 새 세대로 먼저 백업하고 그 이름을 반환합니다."""
+        path = os.path.join(BACKUP_DIR, name)
+        if not name or os.path.basename(name) != name or not os.path.isdir(path):
+            raise ValueError(f"백업 세대 '{name}'을(를) 찾을 수 없습니다.")
+        async with self.backup_lock:
+            # 보관 DB로 옮기는 작업이 복원 도중 끼어들지 않게 멈춤 (다음 archive_loop에서 다시 시작)
+            if self.archive_task and not self.archive_task.done():
+                self.archive_task.cancel()
+            safety_name, _ = await self._create_backup("before-restore")
+            await database.restore_database(path)
+        return safety_name
+
+    @tasks.loop(hours=DB_MAINTENANCE_HOURS)
+    async def db_maintenance_loop(self):
+        # 여러 프로세스가 같은 DB를 쓰는 클러스터 모드에서는 리더만 VACUUM/백업을 실행
+        if not self.is_scheduler():
+            return
+        started = time.perf_counter()
+        try:
+            report = await database.run_db_maintenance()
+            name, size = await self.create_backup()
+        except Exception as e:
+            logger.error(f"Error in scheduled DB maintenance: {e}")
+            return
+        vacuumed = [db_name for db_name, r in report.items() if r['vacuumed']]
+        logger.info(
+            f"DB maintenance done in {time.perf_counter() - started:.1f}s: backup {name} ({size / 1024:.0f} KiB)"
+            + (f", vacuumed {', '.join(vacuumed)}" if vacuumed else "")
+        )
+
+    def enqueue_archive_removal(self, archive_names: list):
+        for name in archive_names:
+            self.artifact_queue.put_nowait(name)
+
+    async def _artifact_worker(self):
+        while True:
+            batch = [await self.artifact_queue.get()]
+            # 쌓여 있는 항목을 한 번에 모아 스레드 전환 횟수를 줄임
+            while not self.artifact_queue.empty() and len(batch) < 200:
+                batch.append(self.artifact_queue.get_nowait())
+            try:
+                removed = await asyncio.to_thread(remove_archive_files, batch)
+                logger.info(f"Removed {removed} archive files for {len(batch)} deleted records.")
+            except Exception as e:
+                logger.error(f"Error in archive cleanup worker: {e}")
+            finally:
+                for _ in batch:
+                    self.artifact_queue.task_done()
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Maintenance(bot))
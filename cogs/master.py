@@ -3,33 +3,87 @@ from discord import app_commands
 from discord.ext import commands, tasks
 import logging
 import database
+from channel_registry import ChannelRegistry
 import json
 import os
 import random
-import google.generativeai as genai
+import functools
+import importlib
+import threading
 from datetime import datetime, timezone, timedelta
 import io
 import asyncio
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import squarify
 
 logger = logging.getLogger('discord')
 
+# matplotlib은 불러오는 데만 수백 ms가 걸려 시작 시간을 늘리므로, 첫 차트를 그릴 때(또는 준비 완료 후 백그라운드 예열 때) 불러옵니다.
+_pyplot = None
+_pyplot_lock = threading.Lock()
+
+def load_chart_engine():
+    """Agg 백엔드로 matplotlib.pyplot을 한 번만 불러와 반환합니다. 차트 스레드와 예열 스레드가 동시에 불러도 안전합니다."""
+    global _pyplot
+    if _pyplot is None:
+        with _pyplot_lock:
+            if _pyplot is None:
+                import matplotlib
+                matplotlib.use('Agg')
+                import matplotlib.pyplot as plt
+                _pyplot = plt
+    return _pyplot
+
+# 여론 분석(클러스터링) 프롬프트에 넣는 최대 의견 수. 넘치면 전체 의견에서 고르게 표본을 뽑습니다.
+CLUSTER_OPINION_LIMIT = 500
+
+def scheduler_job(func):
+    """설문 순환/송출 작업을 감싸 진행 중인 작업 수를 셉니다. 종료 중(draining)에는 새 작업을 시작하지 않습니다."""
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        if self.draining:
+            logger.info(f"Skipped {func.__name__}: shutting down.")
+            return None
+        self._active_jobs += 1
+        self._jobs_idle.clear()
+        try:
+            return await func(self, *args, **kwargs)
+        finally:
+            self._active_jobs -= 1
+            if not self._active_jobs:
+                self._jobs_idle.set()
+    return wrapper
+
+def write_file_atomic(path: str, data, mode: str = 'w', **kwargs):
+    """임시 파일에 다 쓴 뒤 이름을 바꿔, 도중에 프로세스가 끝나도 반쯤 쓰인 파일이 남지 않게 합니다.
+    data가 호출 가능한 객체면 열린 파일을 넘겨 직접 쓰게 합니다."""
+    partial = path + '.partial'
+    with open(partial, mode, **kwargs) as f:
+        if callable(data):
+            data(f)
+        else:
+            f.write(data)
+    os.replace(partial, path)
+
 class Master(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # 종료 시 진행 중인 순환/송출이 끝날 때까지 기다리기 위한 상태 (scheduler_job 참고)
+        self.draining = False
+        self._active_jobs = 0
+        self._jobs_idle = asyncio.Event()
+        self._jobs_idle.set()
+        # 공지 채널 조회 결과/권한 캐시와 실패 채널 자동 비활성화
+        self.channel_registry = ChannelRegistry(bot)
         
-        # Load API Key
+        # Load API Key (google.generativeai 자체는 첫 AI 호출 때 get_model에서 불러옴)
         api_key = os.getenv("GEMINI_API_KEY")
-        model_name = os.getenv("GEMINI_MODEL", "gemini-flash-latest")
+        self.model_name = os.getenv("GEMINI_MODEL", "gemini-flash-latest")
+        self._model = None
+        self._model_lock = asyncio.Lock()
         
         if api_key and api_key != "your_gemini_api_key_here":
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel(model_name)
+            self.api_key = api_key
         else:
-            self.model = None
+            self.api_key = None
             logger.error("GEMINI_API_KEY is not set or invalid. AI Master features will not work.")
 
         # Load Prompts
@@ -45,8 +99,42 @@ class Master(commands.Cog):
     def cog_unload(self):
         self.survey_loop.cancel()
 
+    async def drain(self):
+        """새 순환/송출을 받지 않고, 이미 진행 중인 작업(송출 포함)이 끝날 때까지 기다립니다."""
+        self.draining = True
+        if self._active_jobs:
+            logger.info(f"Waiting for {self._active_jobs} scheduler job(s) to finish...")
+        await self._jobs_idle.wait()
+
+    async def get_model(self):
+        """Gemini 모델을 반환합니다. 처음 호출될 때 google.generativeai를 별도 스레드에서 불러와 만들고, API 키가 없으면 None을 반환합니다."""
+        if self._model is None and self.api_key:
+            async with self._model_lock:
+                if self._model is None and self.api_key:
+                    try:
+                        genai = await asyncio.to_thread(importlib.import_module, 'google.generativeai')
+                    except ImportError as e:
+                        self.api_key = None
+                        logger.error(f"Failed to import google.generativeai, AI Master features will not work: {e}")
+                        return None
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+                    logger.info(f"Gemini client loaded ({self.model_name}).")
+        return self._model
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # 첫 설문 순환 때 차트가 늦지 않도록 준비 완료 후 한가할 때 미리 불러 둠 (재연결로 on_ready가 다시 와도 한 번만)
+        if _pyplot is None:
+            try:
+                await asyncio.to_thread(load_chart_engine)
+                logger.info("Chart engine warmed up.")
+            except Exception as e:
+                logger.warning(f"Failed to warm up chart engine: {e}")
+
     async def evaluate_topic(self, topic: str, options: list) -> bool:
-        if not self.model or not self.prompts:
+        model = await self.get_model()
+        if not model or not self.prompts:
             return False
             
         system = self.prompts.get("system", "")
@@ -54,7 +142,7 @@ class Master(commands.Cog):
         prompt = f"{system}\n\n{prompt_template.format(topic=topic, options=options)}"
         
         try:
-            response = await self.model.generate_content_async(prompt)
+            response = await model.generate_content_async(prompt)
             text = response.text.upper()
             if "APPROVE" in text:
                 return True
@@ -64,7 +152,8 @@ class Master(commands.Cog):
             return False
 
     async def generate_topic(self) -> dict:
-        if not self.model or not self.prompts:
+        model = await self.get_model()
+        if not model or not self.prompts:
             return None
             
         system = self.prompts.get("system", "")
@@ -72,7 +161,7 @@ class Master(commands.Cog):
         prompt = f"{system}\n\n{prompt_template}"
         
         try:
-            response = await self.model.generate_content_async(prompt)
+            response = await model.generate_content_async(prompt)
             # Remove markdown code formatting if present
             text = response.text.strip()
             if text.startswith("```json"):
@@ -95,7 +184,8 @@ class Master(commands.Cog):
             return None
 
     async def refine_topic(self, topic: str, options: list) -> dict:
-        if not self.model or not self.prompts:
+        model = await self.get_model()
+        if not model or not self.prompts:
             return None
             
         system = self.prompts.get("system", "")
@@ -110,7 +200,7 @@ class Master(commands.Cog):
         )
         
         try:
-            response = await self.model.generate_content_async(prompt)
+            response = await model.generate_content_async(prompt)
             text = response.text.strip()
             if text.startswith("```json"):
                 text = text[7:]
@@ -126,7 +216,8 @@ class Master(commands.Cog):
             return None
 
     async def cluster_opinions(self, topic: str, opinions: list) -> list:
-        if not self.model or not self.prompts or not opinions:
+        model = await self.get_model()
+        if not model or not self.prompts or not opinions:
             return []
             
         system = self.prompts.get("system", "")
@@ -138,7 +229,7 @@ class Master(commands.Cog):
         prompt = f"{system}\n\n{prompt_template.replace('{topic}', topic).replace('{opinions}', opinions_text)}"
         
         try:
-            response = await self.model.generate_content_async(prompt)
+            response = await model.generate_content_async(prompt)
             text = response.text.strip()
             if text.startswith("```json"):
                 text = text[7:]
@@ -153,11 +244,32 @@ class Master(commands.Cog):
             logger.error(f"Error clustering opinions with Gemini: {e}")
             return []
 
-    def generate_option_chart_blocking(self, options_counts: dict, survey_id: int) -> bytes:
+    async def collect_vote_summary(self, survey_id: int) -> tuple:
+        """투표를 묶음 단위로 한 번만 훑어 (참여 인원, 여론 분석에 넣을 의견 목록)을 반환합니다.
+        의견은 저수지 표본 추출로 최대 CLUSTER_OPINION_LIMIT개만 들고 있어 참여 인원이 많아도 메모리가 일정합니다."""
+        total_votes = 0
+        seen_opinions = 0
+        opinions = []
+        async for chunk in database.iter_votes_for_survey(survey_id):
+            total_votes += len(chunk)
+            for v in chunk:
+                if not v.opinion:
+                    continue
+                seen_opinions += 1
+                if len(opinions) < CLUSTER_OPINION_LIMIT:
+                    opinions.append(v.opinion)
+                else:
+                    j = random.randrange(seen_opinions)
+                    if j < CLUSTER_OPINION_LIMIT:
+                        opinions[j] = v.opinion
+        return total_votes, opinions
+
+    def generate_option_chart_blocking(self, options_counts: dict, survey_id: int, archive_name: str = None) -> bytes:
         if not options_counts or sum(options_counts.values()) == 0:
             return None
             
         import os
+        plt = load_chart_engine()
         from matplotlib import font_manager
         
         # Load explicit font
@@ -208,8 +320,12 @@ class Master(commands.Cog):
         
         # Save to Local Disk Archive
         os.makedirs(os.path.join("data", "charts"), exist_ok=True)
-        archive_path = os.path.join("data", "charts", f"survey_{survey_id}.png")
-        plt.savefig(archive_path, format='png', dpi=150, bbox_inches='tight', transparent=False, facecolor='#f8f9fa')
+        archive_path = os.path.join("data", "charts", f"{archive_name or f'survey_{survey_id}'}.png")
+        write_file_atomic(
+            archive_path,
+            lambda f: plt.savefig(f, format='png', dpi=150, bbox_inches='tight', transparent=False, facecolor='#f8f9fa'),
+            mode='wb'
+        )
         
         # Also return bytes for immediate upload
         buf = io.BytesIO()
@@ -217,8 +333,18 @@ class Master(commands.Cog):
         plt.close()
         return buf.getvalue()
 
+    def is_scheduler(self) -> bool:
+        """클러스터 모드에서 스케줄러 임대를 쥔 프로세스인지 확인합니다. Cluster 코그가 없으면 단일 프로세스로 봅니다."""
+        if self.draining:
+            return False
+        cluster_cog = self.bot.get_cog('Cluster')
+        return cluster_cog is None or cluster_cog.is_leader
+
     @tasks.loop(minutes=1)
     async def survey_loop(self):
+        # 순환/일일 송출은 리더 프로세스 하나만 실행 (다른 프로세스는 상호작용만 처리)
+        if not self.is_scheduler():
+            return
         # Prevent initial instant execution bug
         active_survey = await database.get_active_survey()
         if not active_survey:
@@ -226,7 +352,7 @@ class Master(commands.Cog):
             await self.process_survey_rotation()
             return
             
-        start_time_str = active_survey['start_time']
+        start_time_str = active_survey.start_time
         try:
             start_time = datetime.strptime(start_time_str, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
             now = datetime.now(timezone.utc)
@@ -243,6 +369,7 @@ class Master(commands.Cog):
         except Exception as e:
             logger.error(f"Error in survey_loop time check: {e}")
 
+    @scheduler_job
     async def check_daily_opinion(self, active_survey, force=False):
         from datetime import datetime, timezone, timedelta
         import database
@@ -268,12 +395,12 @@ class Master(commands.Cog):
             await database.set_global_setting("last_daily_opinion_date", current_date_str)
             
         # Fetch recent votes
-        recent_votes = await database.get_recent_votes_for_opinion(active_survey['id'], hours=24 if not force else 9999)
+        recent_votes = await database.get_recent_votes_for_opinion(active_survey.id, hours=24 if not force else 9999)
         if not recent_votes:
             logger.info("Not enough opinions for daily broadcast.")
             return
             
-        opinions_text = "\n".join([f"[{v['selected_option']}] {v['opinion']}" for v in recent_votes if v['opinion']])
+        opinions_text = "\n".join([f"[{v.selected_option}] {v.opinion}" for v in recent_votes if v.opinion])
         
         system_prompt = self.prompts.get("system", "")
         pick_prompt = self.prompts.get("pick_daily_opinion", "")
@@ -281,10 +408,11 @@ class Master(commands.Cog):
         if not pick_prompt:
             return
             
-        prompt = f"{system_prompt}\n\n{pick_prompt.replace('{topic}', active_survey['topic']).replace('{opinions}', opinions_text)}"
+        prompt = f"{system_prompt}\n\n{pick_prompt.replace('{topic}', active_survey.topic).replace('{opinions}', opinions_text)}"
             
         try:
-            response = await self.model.generate_content_async(prompt)
+            model = await self.get_model()
+            response = await model.generate_content_async(prompt)
             text = response.text.strip()
             if text.startswith("```json"): text = text[7:]
             if text.startswith("```"): text = text[3:]
@@ -300,46 +428,48 @@ class Master(commands.Cog):
                 # 마킹 처리: 중복 선정 방지
                 matched_vote_id = None
                 for v in recent_votes:
-                    if v['opinion'] == selected_opinion:
-                        matched_vote_id = v['id']
+                    if v.opinion == selected_opinion:
+                        matched_vote_id = v.id
                         break
                         
                 if matched_vote_id:
                     await database.mark_opinion_as_picked(matched_vote_id)
                     
-                await database.record_daily_broadcast(current_date_str, active_survey['id'], matched_vote_id if matched_vote_id else 0)
+                await database.record_daily_broadcast(current_date_str, active_survey.id, matched_vote_id if matched_vote_id else 0)
                 
                 from cogs.survey import DailyOpinionView
                 view = DailyOpinionView()
                 
-                channels = await database.get_all_active_announcement_channels()
-                for guild_id, channel_id in channels:
-                    channel = self.bot.get_channel(channel_id)
-                    if channel:
-                        embed = discord.Embed(
-                            title="🌟 레전드 갈드컵 오늘의 의견",
-                            description="지난 24시간 동안 가장 뜨거웠던 의견을 AI가 직접 선정했습니다!",
-                            color=discord.Color.gold()
-                        )
-                        embed.add_field(name=f"🗣️ [{selected_option}]", value=f"> \"{selected_opinion}\"", inline=False)
-                        embed.add_field(name="💡 AI 선정 이유", value=reason, inline=False)
-                        
-                        survey_msg_id = await database.get_current_survey_msg_id(guild_id)
-                        if survey_msg_id:
-                            jump_url = f"https://discord.com/channels/{guild_id}/{channel_id}/{survey_msg_id}"
-                            embed.add_field(name="🔗 설문 확인하기", value=f"[📝 본 투표소로 이동하기]({jump_url})", inline=False)
-                            
-                        embed.set_footer(text=f"ID: {current_date_str}")
+                async def send_daily(guild_id, channel_id, channel):
+                    embed = discord.Embed(
+                        title="🌟 레전드 갈드컵 오늘의 의견",
+                        description="지난 24시간 동안 가장 뜨거웠던 의견을 AI가 직접 선정했습니다!",
+                        color=discord.Color.gold()
+                    )
+                    embed.add_field(name=f"🗣️ [{selected_option}]", value=f"> \"{selected_opinion}\"", inline=False)
+                    embed.add_field(name="💡 AI 선정 이유", value=reason, inline=False)
+                    
+                    survey_msg_id = await database.get_current_survey_msg_id(guild_id)
+                    if survey_msg_id:
+                        jump_url = f"https://discord.com/channels/{guild_id}/{channel_id}/{survey_msg_id}"
+                        embed.add_field(name="🔗 설문 확인하기", value=f"[📝 본 투표소로 이동하기]({jump_url})", inline=False)
                         
-                        try:
-                            msg = await channel.send(embed=embed, view=view)
-                            await database.record_daily_broadcast_message(current_date_str, guild_id, channel_id, msg.id)
-                        except discord.Forbidden:
-                            pass
+                    embed.set_footer(text=f"ID: {current_date_str}")
+                    
+                    try:
+                        msg = await channel.send(embed=embed, view=view)
+                        self.channel_registry.report_success(channel_id)
+                        await database.record_daily_broadcast_message(current_date_str, guild_id, channel_id, msg.id)
+                    except (discord.Forbidden, discord.NotFound) as e:
+                        await self.channel_registry.report_failure(guild_id, channel_id, str(e))
+
+                channels = await self.channel_registry.resolve_all(await database.get_all_active_announcement_channels())
+                await self.channel_registry.fan_out(channels, send_daily)
         except Exception as e:
             logger.error(f"Error generating daily opinion: {e}")
             await database.set_global_setting("last_daily_opinion_date", last_daily_date if last_daily_date else "")
 
+    @scheduler_job
     async def check_pending_daily_broadcasts(self):
         import database
         midpoint_broadcasts = await database.get_pending_midpoint_broadcasts()
@@ -376,15 +506,11 @@ class Master(commands.Cog):
         embed.add_field(name="👍 좋아요", value=f"**{likes}**표", inline=True)
         embed.add_field(name="👎 싫어요", value=f"**{dislikes}**표", inline=True)
         
-        channels = await database.get_all_active_announcement_channels()
+        channels = await self.channel_registry.resolve_all(await database.get_all_active_announcement_channels())
         broadcast_msgs = await database.get_daily_broadcast_messages(date_str)
         bm_dict = {m['guild_id']: m['message_id'] for m in broadcast_msgs}
         
-        for guild_id, channel_id in channels:
-            channel = self.bot.get_channel(channel_id)
-            if not channel:
-                continue
-                
+        async def send_followup(guild_id, channel_id, channel):
             local_embed = embed.copy()
             
             # Jump URLs
@@ -404,14 +530,22 @@ class Master(commands.Cog):
                 
             try:
                 await channel.send(embed=local_embed)
+                self.channel_registry.report_success(channel_id)
+            except (discord.Forbidden, discord.NotFound) as e:
+                await self.channel_registry.report_failure(guild_id, channel_id, str(e))
             except Exception:
                 pass
 
+        await self.channel_registry.fan_out(channels, send_followup)
+
     @survey_loop.before_loop
     async def before_survey_loop(self):
         logger.info("Waiting for bot to be ready before starting survey loop...")
+        # AutoShardedBot은 모든 샤드가 READY를 받은 뒤에야 준비 완료로 표시되므로, 일부 샤드만 연결된 상태로 송출하지 않음
         await self.bot.wait_until_ready()
+        logger.info(f"All {self.bot.shard_count or 1} shard(s) ready, starting survey loop.")
 
+    @scheduler_job
     async def process_survey_rotation(self, forced_next_topic: dict = None, admin_user: discord.User = None):
         active_survey = await database.get_active_survey()
         channels = await database.get_all_active_announcement_channels()
@@ -419,22 +553,11 @@ class Master(commands.Cog):
         guild_ids = [c[0] for c in channels]
         
         if active_survey:
-            survey_id = active_survey['id']
+            survey_id = active_survey.id
             await database.deactivate_survey(survey_id)
-            votes = await database.get_votes_for_survey(survey_id)
-            
-            total_votes_users = len(votes)
-            options_counts = {}
-            for opt in active_survey['options']:
-                opt_name = opt.get('name', opt) if isinstance(opt, dict) else opt
-                options_counts[opt_name] = 0
-                
-            for v in votes:
-                c = v['selected_option'].strip()
-                if c in options_counts:
-                    options_counts[c] += 1
-                else:
-                    options_counts[c] = 1
+            # 득표 집계는 DB에서 GROUP BY로, 참여 인원과 여론 분석용 의견은 투표를 한 번 훑으며 함께 모음
+            total_votes_users, all_opinions = await self.collect_vote_summary(survey_id)
+            options_counts = database.tallies_to_counts(active_survey.options, await database.get_vote_tallies(survey_id))
 
             # Prepare stats string
             stats_str = f"총 참여인원: {total_votes_users}명\n"
@@ -442,19 +565,11 @@ class Master(commands.Cog):
                 ratio = (cnt / total_votes_users * 100) if total_votes_users > 0 else 0
                 stats_str += f"- **{opt}**: {ratio:.1f}% ({cnt}표)\n"
 
-            # Prepare Cross-Server Opinion Exchange
-            server_opinions = {}
-            for v in votes:
-                if v['opinion']:
-                    if v['server_id'] not in server_opinions:
-                        server_opinions[v['server_id']] = []
-                    server_opinions[v['server_id']].append(f"[{v['selected_option']}] {v['opinion']}")
-
             chart_bytes = await asyncio.to_thread(self.generate_option_chart_blocking, options_counts, survey_id)
             
             clustered_data = []
             if all_opinions:
-                clustered_data = await self.cluster_opinions(active_survey['topic'], all_opinions)
+                clustered_data = await self.cluster_opinions(active_survey.topic, all_opinions)
 
             # Save results text to JSON archive for lookup feature
             import os
@@ -462,27 +577,25 @@ class Master(commands.Cog):
             os.makedirs(os.path.join("data", "charts"), exist_ok=True)
             result_data = {
                 "survey_id": survey_id,
-                "topic": active_survey['topic'],
+                "topic": active_survey.topic,
                 "total_votes": total_votes_users,
                 "options_counts": options_counts,
                 "stats_str": stats_str,
                 "clustered_data": clustered_data
             }
-            with open(os.path.join("data", "charts", f"survey_{survey_id}.json"), 'w', encoding='utf-8') as f:
-                json.dump(result_data, f, ensure_ascii=False, indent=4)
+            write_file_atomic(
+                os.path.join("data", "charts", f"survey_{survey_id}.json"),
+                lambda f: json.dump(result_data, f, ensure_ascii=False, indent=4),
+                encoding='utf-8'
+            )
 
-            for guild_id, channel_id in channels:
-                try:
-                    channel = self.bot.get_channel(channel_id)
-                    if not channel:
-                        # Fallback try fetching if not in cache
-                        channel = await self.bot.fetch_channel(channel_id)
-                except Exception as e:
-                    logger.warning(f"Could not fetch channel {channel_id}: {e}")
-                    continue
+            # 의견 페이지네이션 뷰는 상태가 없으므로 한 번만 만들어 모든 서버에 재사용
+            from cogs.survey import OpinionPaginationView
+            opinion_view = await OpinionPaginationView.create(survey_id)
 
+            async def send_result(guild_id, channel_id, channel):
                 embed = discord.Embed(
-                    title=f"🏁 갈드컵 종료: {active_survey['topic']}",
+                    title=f"🏁 갈드컵 종료: {active_survey.topic}",
                     description=stats_str,
                     color=discord.Color.red()
                 )
@@ -507,27 +620,33 @@ class Master(commands.Cog):
                     files.append(image_file)
 
                 try:
-                    from cogs.survey import OpinionPaginationView
-                    from cogs.survey import OpinionPaginationView
-                    all_ops_formatted = [f"[{v['selected_option']}] \"{v['opinion']}\"" for v in votes if v['opinion']]
-                    
                     # 먼저 통계 및 차트를 전송
                     await channel.send(embed=embed, files=files)
                     
                     # 의견이 있으면 별도의 메세지로 페이지네이션 뷰를 전송
-                    if all_ops_formatted:
-                        view = OpinionPaginationView(active_survey['topic'], all_ops_formatted)
-                        await channel.send(embed=view.get_embed(), view=view)
+                    if opinion_view.opinions:
+                        await channel.send(embed=opinion_view.get_embed(), view=opinion_view)
+                    self.channel_registry.report_success(channel_id)
+                except (discord.Forbidden, discord.NotFound) as e:
+                    await self.channel_registry.report_failure(guild_id, channel_id, str(e))
                 except Exception as e:
                     logger.error(f"Failed to send result to channel {channel_id}: {e}")
 
+            await self.channel_registry.fan_out(await self.channel_registry.resolve_all(channels), send_result)
+
+            # 결과 송출이 끝난 설문의 투표는 보관 DB로 옮겨 현재 DB를 작게 유지
+            maintenance_cog = self.bot.get_cog('Maintenance')
+            if maintenance_cog:
+                maintenance_cog.request_archive()
+
         # Pick new survey topic
         new_topic_data = forced_next_topic
         is_master = False
         
         if not new_topic_data:
             # 1순위: 대기열(Queue)에서 가장 첫 번째 주제 꺼내기
-            new_topic_data = await database.get_next_queued_topic()
+            queued_topic = await database.get_next_queued_topic()
+            new_topic_data = queued_topic.to_topic_data() if queued_topic else None
 
             if not new_topic_data:
                 # 2순위: 큐가 비어있다면 AI 자동 생성(Gemini)
@@ -568,31 +687,49 @@ class Master(commands.Cog):
             topic=new_topic_data['topic'], 
             options=new_topic_data['options'], 
             allow_short_answer=new_topic_data.get('allow_short_answer', False),
-            image_url=image_url
+            image_url=image_url,
+            allow_multiple=new_topic_data.get('allow_multiple', False)
         )
         
         new_topic_data['id'] = new_survey_id
         
-        # Announce new survey
-        for guild_id, channel_id in channels:
+        # Announce new survey (샤드별로 나눠 동시에 송출)
+        async def announce(guild_id, channel_id):
             await self.announce_new_topic(guild_id, channel_id, new_topic_data, is_master, admin_force_user)
-            
-    async def announce_new_topic(self, guild_id, channel_id, new_topic_data, is_master:bool = False, admin_force_user: discord.User = None, is_new_channel:bool = False):
+
+        results = await self.channel_registry.fan_out(channels, announce)
+        for (guild_id, channel_id), result in zip(channels, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to announce new topic to channel {channel_id} (guild {guild_id}): {result}")
+
+    async def release_previous_announcement(self, guild_id: int, channel):
+        """이전 주제 공지의 고정을 풀고 투표 버튼을 떼어 냅니다.
+        저장해 둔 current_survey_msg_id로 메시지를 불러오지 않고 바로 처리하며, 그 메시지가 없어졌을 때만 고정 목록을 훑습니다."""
+        previous_msg_id = await database.get_current_survey_msg_id(guild_id)
+        if previous_msg_id:
+            previous = channel.get_partial_message(previous_msg_id)
+            results = await asyncio.gather(previous.unpin(), previous.edit(view=None), return_exceptions=True)
+            if not any(isinstance(r, discord.NotFound) for r in results):
+                return
+
+        # 저장된 ID가 없거나 다른 채널의 메시지(공지 채널 변경)/삭제된 메시지인 경우
         try:
-            channel = self.bot.get_channel(channel_id)
-            if not channel:
-                channel = await self.bot.fetch_channel(channel_id)
-        except discord.NotFound:
-            # Channel deleted! Disable it and DM server owner
-            await database.set_announcement_enabled(guild_id, 0)
-            try:
-                guild = self.bot.get_guild(guild_id)
-                if guild and guild.owner:
-                    await guild.owner.send(f"⚠️ **[레전드 갈드컵]** 서버({guild.name})의 공지 채널이 삭제되었거나 봇이 접근할 수 없어 갈드컵 알림 송출이 자동 비활성화되었습니다. 서버 설정에서 다시 `/공지채널설정`을 진행해주세요.")
-            except Exception:
-                pass
-            return
+            pins = await channel.pins()
+            for p_msg in pins:
+                if p_msg.author == self.bot.user and p_msg.embeds and ("📣 새로운 주제" in str(p_msg.embeds[0].title) or "📢 현재 진행 중인" in str(p_msg.embeds[0].title)):
+                    await p_msg.unpin()
+                    try:
+                        await p_msg.edit(view=None)
+                    except Exception:
+                        pass
+                    break
         except Exception:
+            pass
+            
+    async def announce_new_topic(self, guild_id, channel_id, new_topic_data, is_master:bool = False, admin_force_user: discord.User = None, is_new_channel:bool = False):
+        # 삭제되었거나 권한이 없는 채널은 레지스트리가 실패 횟수를 세고, 반복되면 송출을 끔
+        channel = await self.channel_registry.resolve(guild_id, channel_id)
+        if not channel:
             return
 
         manager_text = ""
@@ -616,20 +753,17 @@ class Master(commands.Cog):
             color=(discord.Color.green() if not is_new_channel else discord.Color.yellow()) if not admin_force_user else discord.Color.brand_red()
         )
         
-        options = new_topic_data['options']
-        if isinstance(options, str):
-            import json
-            options = json.loads(options)
-            
         desc_text = ""
-        for idx, opt in enumerate(options):
-            if isinstance(opt, dict):
-                desc_text += f"**{idx+1}. {opt.get('name', '옵션')}**\n- {opt.get('desc', '')}\n\n"
+        for idx, opt in enumerate(database.parse_options(new_topic_data['options'])):
+            if opt.desc:
+                desc_text += f"**{idx+1}. {opt.name}**\n- {opt.desc}\n\n"
             else:
-                desc_text += f"**{idx+1}. {opt}**\n"
+                desc_text += f"**{idx+1}. {opt.name}**\n"
                 
         if desc_text:
             embed.add_field(name="선택지", value=desc_text.strip(), inline=False)
+        if new_topic_data.get('allow_multiple'):
+            embed.add_field(name="☑️ 복수 선택", value="이번 주제는 여러 선택지를 함께 고를 수 있습니다!", inline=False)
             
         image_url = new_topic_data.get('image_url')
         if image_url:
@@ -646,26 +780,17 @@ class Master(commands.Cog):
         survey_id = new_topic_data.get('id', 0)
         view = VoteSelectView(
             survey_id, 
-            options, 
-            bool(new_topic_data.get('allow_short_answer', False))
+            new_topic_data['options'], 
+            bool(new_topic_data.get('allow_short_answer', False)),
+            bool(new_topic_data.get('allow_multiple', False))
         )
         
-        # 이전 메시지 고정 해제 및 버튼 제거 (bot 메시지만 추출)
-        try:
-            pins = await channel.pins()
-            for p_msg in pins:
-                if p_msg.author == self.bot.user and p_msg.embeds and ("📣 새로운 주제" in str(p_msg.embeds[0].title) or "📢 현재 진행 중인" in str(p_msg.embeds[0].title)):
-                    await p_msg.unpin()
-                    try:
-                        await p_msg.edit(view=None)
-                    except Exception:
-                        pass
-                    break
-        except Exception:
-            pass
+        # 이전 메시지 고정 해제 및 버튼 제거
+        await self.release_previous_announcement(guild_id, channel)
             
         try:
             msg = await channel.send(embed=embed, view=view)
+            self.channel_registry.report_success(channel_id)
             
             # 새 주제의 메시지 ID를 데이터베이스에 저장
             await database.set_current_survey_msg_id(guild_id, msg.id)
@@ -676,15 +801,9 @@ class Master(commands.Cog):
                 # 핀 고정 권한이 없는 경우 조용히 무시하되, 메시지 하단에 경고 문구 추가
                 embed.description += "\n\n⚠️ *(봇에게 **'메시지 관리'** 권한이 없어 이 메시지를 상단 고정할 수 없습니다. 채널 권한 설정을 확인해주세요!)*"
                 await msg.edit(embed=embed)
-        except discord.Forbidden:
-            # 메시지 채널 전송 권한 자체가 없는 경우
-            await database.set_announcement_enabled(guild_id, 0)
-            try:
-                guild = self.bot.get_guild(guild_id)
-                if guild and guild.owner:
-                    await guild.owner.send(f"⚠️ **[레전드 갈드컵]** 서버({guild.name})의 공지 채널에 메시지 전송 권한이 없어 송출에 실패했습니다. 알림이 자동 비활성화되었으니 봇에게 권한을 주고 다시 `/공지채널설정`을 올려주세요.")
-            except Exception:
-                pass
+        except (discord.Forbidden, discord.NotFound) as e:
+            # 메시지 채널 전송 권한 자체가 없거나 채널이 사라진 경우 (반복되면 레지스트리가 송출을 끔)
+            await self.channel_registry.report_failure(guild_id, channel_id, str(e))
         except Exception as e:
             pass
 
@@ -6,6 +6,7 @@ import database
 import csv
 import io
 import asyncio
+import time
 
 logger = logging.getLogger('discord')
 
@@ -118,7 +119,7 @@ class EditTopicTitleModal(discord.ui.Modal, title='주제 제목 수정'):
         await interaction.response.edit_message(embed=self.view.get_embed(), view=self.view)
 
 class SuggestionBuilderView(discord.ui.View):
-    def __init__(self, topic: str, master_cog, user_id: int, edit_target_id: int = None, existing_options=None, allow_short=False, image_url=None):
+    def __init__(self, topic: str, master_cog, user_id: int, edit_target_id: int = None, existing_options=None, allow_short=False, image_url=None, allow_multiple=False):
         super().__init__(timeout=900) # 15분 타임아웃
         self.topic = topic
         self.master_cog = master_cog
@@ -127,6 +128,7 @@ class SuggestionBuilderView(discord.ui.View):
         
         self.options = existing_options if existing_options else []
         self.allow_short = allow_short
+        self.allow_multiple = allow_multiple
         self.image_url = image_url
 
     def get_embed(self) -> discord.Embed:
@@ -148,6 +150,7 @@ class SuggestionBuilderView(discord.ui.View):
             embed.add_field(name="현재 추가된 선택지", value="아직 선택지가 없습니다. `➕ 옵션 추가` 버튼을 눌러주세요.", inline=False)
 
         embed.add_field(name="📝 단답형 허용", value="[O] 허용" if self.allow_short else "[X] 불가", inline=True)
+        embed.add_field(name="☑️ 복수 선택", value="[O] 허용" if self.allow_multiple else "[X] 불가", inline=True)
         
         if self.image_url:
             import urllib.parse
@@ -191,6 +194,11 @@ class SuggestionBuilderView(discord.ui.View):
         self.allow_short = not self.allow_short
         await interaction.response.edit_message(embed=self.get_embed(), view=self)
 
+    @discord.ui.button(label="복수 선택 허용", style=discord.ButtonStyle.primary, emoji="☑️", row=1)
+    async def toggle_multiple_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.allow_multiple = not self.allow_multiple
+        await interaction.response.edit_message(embed=self.get_embed(), view=self)
+
     @discord.ui.button(label="AI 가공 (다듬기)", style=discord.ButtonStyle.blurple, emoji="🤖", row=1)
     async def ai_refine_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
         if len(self.options) < 2:
@@ -234,6 +242,19 @@ class SuggestionBuilderView(discord.ui.View):
             await interaction.response.send_message("❌ 서버에 제출하려면 옵션을 최소 2개 이상 입력해야 합니다.", ephemeral=True)
             return
 
+        # 건의 목록/대기열/지난 설문에 거의 같은 주제가 있으면 새 제안은 받지 않음
+        if not self.edit_target_id:
+            similar = database.find_similar_topics(self.topic, self.options)
+            if similar:
+                match = similar[0]
+                await interaction.response.send_message(
+                    f"❌ 이미 비슷한 주제가 있어 제출할 수 없습니다.\n"
+                    f"> **{match['topic']}** ({database.SIMILAR_SOURCE_LABELS[match['source']]}, 유사도 {match['similarity']:.0%})\n"
+                    f"주제나 선택지를 조금 더 다르게 바꿔서 다시 제출해주세요.",
+                    ephemeral=True
+                )
+                return
+
         # Disable all buttons
         for child in self.children:
             child.disabled = True
@@ -246,7 +267,8 @@ class SuggestionBuilderView(discord.ui.View):
                 self.topic,
                 self.options,
                 self.allow_short,
-                self.image_url
+                self.image_url,
+                self.allow_multiple
             )
             await interaction.edit_original_response(
                 content="✅ **기존 주제가 성공적으로 수정 및 저장되었습니다!**\n(심사 메뉴에서 [새로고침]을 눌러 반영된 데이터를 확인하세요.)",
@@ -259,7 +281,8 @@ class SuggestionBuilderView(discord.ui.View):
                 self.options, 
                 self.allow_short, 
                 self.user_id,
-                self.image_url
+                self.image_url,
+                self.allow_multiple
             )
             await interaction.edit_original_response(
                 content="✅ **성공적으로 제안이 서버로 전송되었습니다!**\n(관리자 심사를 거쳐 채택 시 실제 투표에 올라갑니다.)", 
@@ -300,14 +323,25 @@ class RefinedTopicView(discord.ui.View):
     async def reject_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.edit_message(content="✖️ **AI 가공 제안을 거절했습니다.** (빌더의 내용은 그대로 유지됩니다)", embed=None, view=None)
 
+VOTE_CLOSED_MESSAGE = "⏹️ **이미 종료된 갈드컵입니다.** 진행 중인 주제에 투표하려면 `/투표`를 입력하세요."
+
+async def ensure_survey_open(interaction: discord.Interaction, survey_id: int) -> bool:
+    """투표 버튼은 설문이 끝난 뒤에도 메시지에 남아 눌리므로, 진행 중인 설문이 아니면 안내하고 False를 반환합니다."""
+    survey = await database.get_survey(survey_id)
+    if survey is None or not survey.is_active:
+        await interaction.response.send_message(VOTE_CLOSED_MESSAGE, ephemeral=True)
+        return False
+    return True
+
 class VoteOpinionModal(discord.ui.Modal):
-    def __init__(self, survey_id: int, selected_option: str):
+    def __init__(self, survey_id: int, selected_option: str, option_indices: list):
         super().__init__(title="투표에 대한 의견 작성")
         self.survey_id = survey_id
         self.selected_option = selected_option
+        self.option_indices = option_indices
 
         self.opinion = discord.ui.TextInput(
-            label=f'[{selected_option}] 선택에 대한 의견 (익명)',
+            label=f'[{selected_option}] 선택에 대한 의견 (익명)'[:45],
             style=discord.TextStyle.long,
             placeholder='300자 이내로 왜 이 옵션을 선택했는지 남겨주세요.',
             required=False,
@@ -321,7 +355,11 @@ class VoteOpinionModal(discord.ui.Modal):
         opinion_text = self.opinion.value.strip()
 
         # Save or update vote in database
-        await database.save_vote(self.survey_id, user_id, server_id, self.selected_option, opinion_text)
+        choices = [(idx, None) for idx in self.option_indices]
+        # 팝업을 띄운 사이 설문이 교체되었다면 기록하지 않음
+        if not await database.save_vote(self.survey_id, user_id, server_id, self.selected_option, opinion_text, choices):
+            await interaction.response.send_message(VOTE_CLOSED_MESSAGE, ephemeral=True)
+            return
 
         await interaction.response.send_message(
             f"✅ **[{self.selected_option}]** (으)로 투표와 익명 의견이 기록되었습니다!\n(현재상황을 보려면 `/현재상황`을 입력하세요.)",
@@ -330,10 +368,11 @@ class VoteOpinionModal(discord.ui.Modal):
 
 
 class VoteShortAnswerModal(discord.ui.Modal):
-    def __init__(self, survey_id: int, other_choices: list):
+    def __init__(self, survey_id: int, other_choices: list, other_indices: list = None):
         super().__init__(title="기타 옵션 직접 입력 및 의견")
         self.survey_id = survey_id
         self.other_choices = other_choices
+        self.other_indices = other_indices or []
 
         self.custom_option = discord.ui.TextInput(
             label='새로 추가할 선택지 (단답형)',
@@ -363,8 +402,12 @@ class VoteShortAnswerModal(discord.ui.Modal):
         final_choices = self.other_choices + [custom_opt]
         joined_selections = ", ".join(final_choices)
 
-        # Save or update vote in database
-        await database.save_vote(self.survey_id, user_id, server_id, joined_selections, opinion_text)
+        choices = [(idx, None) for idx in self.other_indices] + [(database.CUSTOM_OPTION_IDX, custom_opt)]
+
+        # Save or update vote in database (팝업을 띄운 사이 설문이 교체되었다면 기록하지 않음)
+        if not await database.save_vote(self.survey_id, user_id, server_id, joined_selections, opinion_text, choices):
+            await interaction.response.send_message(VOTE_CLOSED_MESSAGE, ephemeral=True)
+            return
 
         await interaction.response.send_message(
             f"✅ **[{joined_selections}]** (으)로 투표와 익명 의견이 기록되었습니다!\n(현재상황을 보려면 `/현재상황`을 입력하세요.)",
@@ -372,21 +415,83 @@ class VoteShortAnswerModal(discord.ui.Modal):
         )
 
 
-class VoteOptionButton(discord.ui.Button):
+# 단답형(기타 직접입력) 버튼/선택지의 custom_id·값에 쓰는 번호
+VOTE_SHORT_ANSWER_INDEX = 99
+
+class VoteOptionButton(discord.ui.DynamicItem[discord.ui.Button], template=r'vote_btn_(?P<survey_id>\d+)_(?P<index>\d+)'):
+    """투표 버튼. 설문 ID와 선택지 번호를 custom_id에서 읽으므로, 다른 프로세스가 새 설문을 띄워도 등록 없이 동작합니다."""
     def __init__(self, label: str, value: str, is_short: bool, survey_id: int, index: int):
         style = discord.ButtonStyle.secondary if is_short else discord.ButtonStyle.primary
-        super().__init__(style=style, label=label[:80], custom_id=f"vote_btn_{survey_id}_{index}")
+        super().__init__(discord.ui.Button(style=style, label=label[:80], custom_id=f"vote_btn_{survey_id}_{index}"))
         self.value_choice = value
         self.is_short = is_short
         self.survey_id = survey_id
+        self.index = index
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        # 버튼 라벨이 곧 선택지 이름 (VoteSelectView에서 같은 값으로 만듦)
+        index = int(match['index'])
+        is_short = index == VOTE_SHORT_ANSWER_INDEX
+        value = "##SHORT_ANSWER##" if is_short else item.label
+        return cls(item.label, value, is_short, int(match['survey_id']), index)
 
     async def callback(self, interaction: discord.Interaction):
+        if not await ensure_survey_open(interaction, self.survey_id):
+            return
         existing_vote = await database.get_user_vote(self.survey_id, interaction.user.id)
         
         if self.is_short:
             await interaction.response.send_modal(VoteShortAnswerModal(self.survey_id, []))
         else:
-            await interaction.response.send_modal(VoteOpinionModal(self.survey_id, self.value_choice))
+            await interaction.response.send_modal(VoteOpinionModal(self.survey_id, self.value_choice, [self.index]))
+            
+        if existing_vote:
+            await interaction.followup.send(
+                "⚠️ **이미 현 갈드컵에 투표하셨습니다!** 방금 띄워드린 팝업창을 통해 새로운 의견을 제출하시면 기존 투표 내역이 수정 반영됩니다.",
+                ephemeral=True
+            )
+
+class VoteMultiSelect(discord.ui.DynamicItem[discord.ui.Select], template=r'vote_multi_(?P<survey_id>\d+)'):
+    """복수 선택이 허용된 주제용 선택 메뉴. 고른 선택지들을 한 번의 투표로 기록합니다."""
+    def __init__(self, survey_id: int, option_names: list, allow_short: bool):
+        select_options = [
+            discord.SelectOption(label=name[:100], value=str(idx))
+            for idx, name in enumerate(option_names[:24])
+        ]
+        if allow_short:
+            select_options.append(discord.SelectOption(label="기타 (직접입력)", value=str(VOTE_SHORT_ANSWER_INDEX), emoji="📝"))
+        super().__init__(discord.ui.Select(
+            placeholder="마음에 드는 선택지를 모두 골라주세요 (복수 선택 가능)",
+            min_values=1,
+            max_values=len(select_options),
+            options=select_options,
+            custom_id=f"vote_multi_{survey_id}"
+        ))
+        self.survey_id = survey_id
+        self.option_names = option_names
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        # 선택지 값은 0부터 차례로 매긴 인덱스이므로 라벨 순서가 곧 option_names
+        short_value = str(VOTE_SHORT_ANSWER_INDEX)
+        option_names = [opt.label for opt in item.options if opt.value != short_value]
+        allow_short = any(opt.value == short_value for opt in item.options)
+        return cls(int(match['survey_id']), option_names, allow_short)
+
+    async def callback(self, interaction: discord.Interaction):
+        if not await ensure_survey_open(interaction, self.survey_id):
+            return
+        existing_vote = await database.get_user_vote(self.survey_id, interaction.user.id)
+
+        short_value = str(VOTE_SHORT_ANSWER_INDEX)
+        indices = [int(v) for v in self.item.values if v != short_value]
+        names = [self.option_names[idx] for idx in indices]
+        
+        if short_value in self.item.values:
+            await interaction.response.send_modal(VoteShortAnswerModal(self.survey_id, names, indices))
+        else:
+            await interaction.response.send_modal(VoteOpinionModal(self.survey_id, ", ".join(names), indices))
             
         if existing_vote:
             await interaction.followup.send(
@@ -394,11 +499,15 @@ class VoteOptionButton(discord.ui.Button):
                 ephemeral=True
             )
 
-class ViewStatsButton(discord.ui.Button):
+class ViewStatsButton(discord.ui.DynamicItem[discord.ui.Button], template=r'view_stats_(?P<survey_id>\d+)'):
     def __init__(self, survey_id: int):
-        super().__init__(style=discord.ButtonStyle.success, label="👀 다른 의견 보기", custom_id=f"view_stats_{survey_id}")
+        super().__init__(discord.ui.Button(style=discord.ButtonStyle.success, label="👀 다른 의견 보기", custom_id=f"view_stats_{survey_id}"))
         self.survey_id = survey_id
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match['survey_id']))
+
     async def callback(self, interaction: discord.Interaction):
         survey_cog = interaction.client.get_cog("Survey")
         if survey_cog:
@@ -407,38 +516,92 @@ class ViewStatsButton(discord.ui.Button):
             await interaction.response.send_message("❌ 시스템 오류: 통계를 불러올 수 없습니다.", ephemeral=True)
 
 class VoteSelectView(discord.ui.View):
-    def __init__(self, survey_id: int, options: list, allow_short: bool):
+    def __init__(self, survey_id: int, options: list, allow_short: bool, allow_multiple: bool = False):
         super().__init__(timeout=None)
         self.survey_id = survey_id
         
+        if allow_multiple:
+            # 복수 선택 주제는 버튼 대신 다중 선택 메뉴 하나로 투표
+            option_names = [opt.name[:80] for opt in database.parse_options(options)]
+            self.add_item(VoteMultiSelect(survey_id, option_names, allow_short))
+            self.add_item(ViewStatsButton(survey_id))
+            return
+        
         # Add dynamic buttons for options (Limit to 24 to save 1 slot for stats button)
-        for idx, opt in enumerate(options[:24]):
-            if isinstance(opt, dict):
-                label = opt.get('name', '옵션')[:80]
-            else:
-                label = str(opt)[:80]
+        for idx, opt in enumerate(database.parse_options(options)[:24]):
+            label = (opt.name or '옵션')[:80]
                 
             self.add_item(VoteOptionButton(label, label, False, survey_id, idx))
             
         if allow_short:
-            self.add_item(VoteOptionButton("기타 (직접입력)", "##SHORT_ANSWER##", True, survey_id, 99))
+            self.add_item(VoteOptionButton("기타 (직접입력)", "##SHORT_ANSWER##", True, survey_id, VOTE_SHORT_ANSWER_INDEX))
             
         self.add_item(ViewStatsButton(survey_id))
 
 
+class OpinionPageButton(discord.ui.DynamicItem[discord.ui.Button], template=r'opinions:(?P<survey_id>\d+):(?P<server_id>\d+):(?P<direction>[pn]):(?P<anchor>\d+):(?P<page>\d+)'):
+    """의견 페이지 이동 버튼. 설문 ID, 서버 필터, 커서를 custom_id에 담아 봇 재시작 후에도 동작합니다."""
+    def __init__(self, survey_id: int, server_id: int, direction: str, anchor: int, page: int, disabled: bool = False):
+        self.survey_id = survey_id
+        self.server_id = server_id
+        self.direction = direction
+        self.anchor = anchor
+        self.page = page
+        label, emoji = ("이전", "⬅️") if direction == 'p' else ("다음", "➡️")
+        super().__init__(discord.ui.Button(
+            label=label,
+            emoji=emoji,
+            style=discord.ButtonStyle.secondary,
+            disabled=disabled,
+            custom_id=f"opinions:{survey_id}:{server_id}:{direction}:{anchor}:{page}"
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match['survey_id']), int(match['server_id']), match['direction'], int(match['anchor']), int(match['page']))
+
+    async def callback(self, interaction: discord.Interaction):
+        view = await OpinionPaginationView.create(self.survey_id, self.server_id, self.direction, self.anchor, self.page)
+        await interaction.response.edit_message(embed=view.get_embed(), view=view)
+
+
 class OpinionPaginationView(discord.ui.View):
-    def __init__(self, topic_name: str, opinions: list):
-        super().__init__(timeout=600)
+    per_page = 5
+
+    def __init__(self, survey_id: int, topic_name: str, opinions: list, total: int, page: int = 0, server_id: int = 0):
+        super().__init__(timeout=None)
         self.topic_name = topic_name
         self.opinions = opinions
-        self.current_page = 0
-        self.per_page = 5
-        self.max_pages = max(1, (len(opinions) + self.per_page - 1) // self.per_page)
-        self.update_buttons()
+        self.total = total
+        self.current_page = page
+        self.max_pages = max(1, (total + self.per_page - 1) // self.per_page)
+
+        first_id = opinions[0]['id'] if opinions else 0
+        last_id = opinions[-1]['id'] if opinions else 0
+        self.add_item(OpinionPageButton(
+            survey_id, server_id, 'p', first_id, max(0, page - 1),
+            disabled=(page == 0)
+        ))
+        self.add_item(OpinionPageButton(
+            survey_id, server_id, 'n', last_id, page + 1,
+            disabled=(page >= self.max_pages - 1 or len(opinions) < self.per_page)
+        ))
+
+    @classmethod
+    async def create(cls, survey_id: int, server_id: int = 0, direction: str = 'n', anchor: int = 0, page: int = 0):
+        """DB에서 요청된 한 페이지만 읽어 뷰를 만듭니다. 첫 페이지는 항상 최신 의견부터 보여줍니다."""
+        survey = await database.get_survey(survey_id)
+        topic_name = survey.topic if survey else f"{survey_id}회차"
+
+        if page == 0:
+            opinions = await database.get_opinions_page(survey_id, server_id, limit=cls.per_page)
+        elif direction == 'p':
+            opinions = await database.get_opinions_page(survey_id, server_id, after_id=anchor, limit=cls.per_page)
+        else:
+            opinions = await database.get_opinions_page(survey_id, server_id, before_id=anchor, limit=cls.per_page)
 
-    def update_buttons(self):
-        self.prev_btn.disabled = (self.current_page == 0)
-        self.next_btn.disabled = (self.current_page >= self.max_pages - 1)
+        total = await database.count_opinions(survey_id, server_id)
+        return cls(survey_id, topic_name, opinions, total, page, server_id)
 
     def get_embed(self) -> discord.Embed:
         embed = discord.Embed(
@@ -446,53 +609,37 @@ class OpinionPaginationView(discord.ui.View):
             color=discord.Color.light_embed()
         )
         
-        start_idx = self.current_page * self.per_page
-        end_idx = start_idx + self.per_page
-        page_ops = self.opinions[start_idx:end_idx]
-        
-        if not page_ops:
+        if not self.opinions:
             embed.description = "아직 작성된 의견이 없습니다."
         else:
-            opinions_text = "\n\n".join([f"- {opt}" for opt in page_ops])
+            opinions_text = "\n\n".join([f"- [{v['selected_option']}] \"{v['opinion']}\"" for v in self.opinions])
             page_text = f" (페이지 {self.current_page + 1}/{self.max_pages})" if self.max_pages > 1 else ""
             embed.description = f"**👀 익명 유저들의 반응{page_text}**\n\n{opinions_text[:3500]}"
             
-        embed.set_footer(text=f"총 {len(self.opinions)}개의 의견이 등록됨 | 좌우 화살표를 눌러 넘겨보세요")
+        embed.set_footer(text=f"총 {self.total}개의 의견이 등록됨 | 좌우 화살표를 눌러 넘겨보세요")
         return embed
 
-    @discord.ui.button(label="이전", style=discord.ButtonStyle.secondary, emoji="⬅️")
-    async def prev_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_page -= 1
-        self.update_buttons()
-        await interaction.response.edit_message(embed=self.get_embed(), view=self)
-
-    @discord.ui.button(label="다음", style=discord.ButtonStyle.secondary, emoji="➡️")
-    async def next_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_page += 1
-        self.update_buttons()
-        await interaction.response.edit_message(embed=self.get_embed(), view=self)
-
 class Survey(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_load(self):
+        # !업데이트로 코그만 다시 불러온 경우 on_ready가 다시 오지 않으므로 여기서 새 클래스로 다시 등록
+        if self.bot.is_ready():
+            await self.register_persistent_views()
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(*PERSISTENT_DYNAMIC_ITEMS)
+
+    async def register_persistent_views(self):
+        # 봇 재시작 후에도 버튼들이 정상 작동하도록 등록. 투표 버튼은 custom_id에 설문 ID를 담은 DynamicItem이라
+        # 클러스터의 다른 프로세스가 설문을 바꿔도 다시 등록할 필요가 없음
+        self.bot.add_view(DailyOpinionView())
+        self.bot.add_dynamic_items(*PERSISTENT_DYNAMIC_ITEMS)
+
     @commands.Cog.listener()
     async def on_ready(self):
-        # 봇 재시작 후에도 버튼들이 정상 작동하도록, 현재 진행 중인 옵션의 Persistent View를 등록
-        survey_dict = await database.get_active_survey()
-        if survey_dict:
-            import json
-            options = survey_dict['options']
-            if isinstance(options, str):
-                options = json.loads(options)
-            view = VoteSelectView(
-                survey_dict['id'], 
-                options, 
-                bool(survey_dict.get('allow_short_answer', False))
-            )
-            self.bot.add_view(view)
-            
-        self.bot.add_view(DailyOpinionView())
+        await self.register_persistent_views()
 
     @app_commands.command(name="주제제시", description="재미있는 갈드컵 다음 주제를 제시합니다.")
     async def suggest_topic(self, interaction: discord.Interaction):
@@ -505,11 +652,11 @@ class Survey(commands.Cog):
             await interaction.response.send_message("❌ 현재 진행 중인 갈드컵 주제가 없습니다.", ephemeral=True)
             return
 
-        view = VoteSelectView(survey['id'], survey['options'], survey['allow_short_answer'])
+        view = VoteSelectView(survey.id, survey.options, survey.allow_short_answer, survey.allow_multiple)
         
         embed = discord.Embed(
             title="🤔 [투표 진행 중]",
-            description=f"**{survey['topic']}**\n\n아래 선택바를 눌러 원하는 옵션을 고르고 의견을 작성해주세요.",
+            description=f"**{survey.topic}**\n\n아래 선택바를 눌러 원하는 옵션을 고르고 의견을 작성해주세요.",
             color=discord.Color.blue()
         )
         
@@ -517,91 +664,129 @@ class Survey(commands.Cog):
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
     @app_commands.command(name="현재상황", description="현재 진행 중인 갈드컵의 내용과 타 유저들의 익명 반응을 열람합니다.")
-    async def current_status(self, interaction: discord.Interaction):
+    @app_commands.describe(server_only="True로 설정하면 이 서버에서 작성된 의견만 모아봅니다.")
+    async def current_status(self, interaction: discord.Interaction, server_only: bool = False):
         survey = await database.get_active_survey()
         if not survey:
             await interaction.response.send_message("❌ 현재 진행 중인 갈드컵 주제가 없습니다.", ephemeral=True)
             return
 
-        votes = await database.get_votes_for_survey(survey['id'])
-        
-        total_votes = len(votes)
+        server_id = (interaction.guild_id or 0) if server_only else 0
+        status = await database.get_survey_status(survey.id, server_id)
+        total_votes = status['total_votes']
         
         embed = discord.Embed(
-            title=f"📊 갈드컵 현황: {survey['topic']}",
+            title=f"📊 갈드컵 현황: {survey.topic}",
             description=f"현재 총 {total_votes}명이 투표에 참여했습니다.",
             color=discord.Color.gold()
         )
         
         try:
             from datetime import datetime, timezone, timedelta
-            start_time = datetime.strptime(survey['start_time'], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+            start_time = datetime.strptime(survey.start_time, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
             end_time = int((start_time + timedelta(hours=72)).timestamp())
             embed.description += f"\n⏳ **투표 마감 예정:** <t:{end_time}:R>"
         except Exception:
             pass
         
         # 옵션별 통계 표시 (다중선택의 경우 각각을 카운트)
-        option_names = [opt.get('name', str(opt)) if isinstance(opt, dict) else str(opt) for opt in survey['options']]
-        option_counts = {name: 0 for name in option_names}
-        for v in votes:
-            c = v['selected_option'].strip()
-            if c in option_counts:
-                option_counts[c] += 1
-            else:
-                option_counts[c] = 1 # unexpected option fallback
+        option_counts = database.tallies_to_counts(survey.options, status['tallies'])
 
         # 통계 렌더링
         stat_text = "\n".join([f"**{opt}**: {cnt}표" for opt, cnt in sorted(option_counts.items(), key=lambda item: item[1], reverse=True)])
         embed.add_field(name="투표 분포", value=stat_text if stat_text else "아직 투표가 없습니다.", inline=False)
         
-        # 의견 나열 (pagenation 적용)
-        all_opinions = [f"[{v['selected_option']}] \"{v['opinion']}\"" for v in votes if v['opinion']]
-        
         # 먼저 통계 엠베드를 전송
         await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        # 의견이 있으면 별도의 메세지로 페이지네이션 뷰를 전송 (followup)
-        if all_opinions:
-            view = OpinionPaginationView(survey['topic'], all_opinions)
+        # 의견이 있으면 별도의 메세지로 페이지네이션 뷰를 전송 (followup, 첫 페이지는 스냅샷 재사용)
+        if status['opinions']:
+            view = OpinionPaginationView(survey.id, survey.topic, status['opinions'], status['opinion_total'], 0, server_id)
             await interaction.followup.send(embed=view.get_embed(), view=view, ephemeral=True)
 
     @app_commands.command(name="통계", description="과거에 종료된 모든 갈드컵 주제 목록과 결과를 열람합니다.")
     async def statistics(self, interaction: discord.Interaction):
-        past_surveys = await database.get_past_surveys(100) # Get up to 100 recent
-        if not past_surveys:
+        view = await SurveyHistoryPaginationView.create()
+        if not view.surveys:
             await interaction.response.send_message("❌ 아직 종료된 갈드컵이 없습니다.", ephemeral=True)
             return
 
-        view = SurveyHistoryPaginationView(past_surveys)
         await interaction.response.send_message(embed=view.get_embed(), view=view, ephemeral=True)
 
     @app_commands.command(name="조회", description="특정 갈드컵 ID를 입력하여 과거 결과를 상세 조회합니다.")
-    @app_commands.describe(survey_id="조회할 갈드컵의 고유 ID 번호")
+    @app_commands.describe(survey_id="조회할 갈드컵의 고유 ID 번호 (주제 일부를 입력하면 자동완성)")
     async def lookup_survey(self, interaction: discord.Interaction, survey_id: int):
         await send_archived_survey_result(interaction, survey_id)
 
+    @lookup_survey.autocomplete('survey_id')
+    async def lookup_survey_autocomplete(self, interaction: discord.Interaction, current: str):
+        # 디스코드 자동완성 응답 제한 시간이 짧아 DB 대신 메모리 인덱스에서만 찾음
+        choices = []
+        for survey_id, topic in database.search_past_survey_titles(current):
+            name = f"[{survey_id}회차] {topic}"
+            choices.append(app_commands.Choice(name=name[:97] + "..." if len(name) > 100 else name, value=survey_id))
+        return choices
+
+    @app_commands.command(name="검색", description="종료된 갈드컵의 주제와 익명 의견을 키워드로 검색합니다.")
+    @app_commands.describe(keyword="찾을 단어 (여러 단어를 입력하면 모두 포함된 결과만 표시)")
+    async def search_surveys(self, interaction: discord.Interaction, keyword: str):
+        started = time.perf_counter()
+        try:
+            results = await database.search_surveys(keyword)
+        except Exception as e:
+            logger.error(f"Error searching surveys: {e}")
+            await interaction.response.send_message("❌ 검색 색인을 사용할 수 없습니다. 관리자에게 `!검색색인 재구축`을 요청해주세요.", ephemeral=True)
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if not results:
+            await interaction.response.send_message(f"🔍 **{keyword}**에 대한 검색 결과가 없습니다.", ephemeral=True)
+            return
+
+        desc = ""
+        options = []
+        for r in results:
+            time_str = r['end_time'][:10] if r['end_time'] else "알 수 없음"
+            entry = f"**[ID: {r['id']}]** {r['topic']} ({time_str})\n"
+            if r['snippet']:
+                entry += f"> 💬 {r['snippet']} (일치 의견 {r['opinion_hits']}개)\n"
+            if len(desc) + len(entry) > 4000:
+                break
+            desc += entry + "\n"
+
+            plain_topic = r['topic'].replace('**', '')
+            options.append(discord.SelectOption(
+                label=f"ID: {r['id']}회차",
+                description=plain_topic[:90] + "..." if len(plain_topic) > 90 else plain_topic,
+                value=str(r['id']),
+                emoji="📊"
+            ))
+
+        embed = discord.Embed(title=f"🔍 '{keyword}' 검색 결과", description=desc.strip(), color=discord.Color.purple())
+        embed.set_footer(text=f"{len(options)}건 · {elapsed_ms:.1f}ms · 아래 메뉴에서 상세 결과를 열람하세요")
+
+        # 선택 메뉴는 /통계와 같은 영구 컴포넌트를 재사용 (선택 값 = 설문 ID)
+        view = discord.ui.View(timeout=None)
+        view.add_item(SurveyHistorySelect(0, options))
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
 import os
 import json
 import io
-import aiosqlite
 
 async def send_archived_survey_result(interaction: discord.Interaction, survey_id: int):
     # Retrieve past survey basic metadata from DB to check existence
-    async with aiosqlite.connect(database.DB_FILE) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)) as cursor:
-            survey_row = await cursor.fetchone()
-            
-    if not survey_row:
+    # (투표 개수/집계는 database 헬퍼가 현재 DB와 보관 DB 중 맞는 쪽에서 읽음)
+    survey_data = await database.get_survey(survey_id)
+
+    if not survey_data:
         if not interaction.response.is_done():
             await interaction.response.send_message(f"❌ ID {survey_id}인 설문을 찾을 수 없습니다.", ephemeral=True)
         else:
             await interaction.followup.send(f"❌ ID {survey_id}인 설문을 찾을 수 없습니다.", ephemeral=True)
         return
 
-    survey_data = dict(survey_row)
-    topic = survey_data['topic']
+    topic = survey_data.topic
 
     json_path = os.path.join("data", "charts", f"survey_{survey_id}.json")
     png_path = os.path.join("data", "charts", f"survey_{survey_id}.png")
@@ -630,15 +815,8 @@ async def send_archived_survey_result(interaction: discord.Interaction, survey_i
                 embed.add_field(name="🤖 AI 여론 분석 (당시 기록)", value=cluster_text[:1024], inline=False)
     else:
         # Fallback for old surveys before JSON archiving was added
-        votes = await database.get_votes_for_survey(survey_id)
-        total_votes = len(votes)
-        raw_options = json.loads(survey_data['options'])
-        option_names = [opt.get('name', str(opt)) if isinstance(opt, dict) else str(opt) for opt in raw_options]
-        counts = {name: 0 for name in option_names}
-        for v in votes:
-            c = v['selected_option'].strip()
-            if c in counts: counts[c] += 1
-            else: counts[c] = 1
+        total_votes = await database.count_votes(survey_id)
+        counts = database.tallies_to_counts(survey_data.options, await database.get_vote_tallies(survey_id))
                 
         stats_str = f"총 참여인원: {total_votes}명\n"
         for opt, cnt in sorted(counts.items(), key=lambda item: item[1], reverse=True):
@@ -667,67 +845,91 @@ async def send_archived_survey_result(interaction: discord.Interaction, survey_i
         else:
             await interaction.followup.send(embed=embed, ephemeral=True)
 
+class SurveyHistorySelect(discord.ui.DynamicItem[discord.ui.Select], template=r'history_select:(?P<page>\d+)'):
+    def __init__(self, page: int, options: list = None):
+        self.page = page
+        super().__init__(discord.ui.Select(
+            placeholder="상세 결과를 조회할 주제를 선택하세요...",
+            min_values=1, max_values=1,
+            options=options or [discord.SelectOption(label="-", value="0")],
+            custom_id=f"history_select:{page}"
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls(int(match['page']), item.options)
+
+    async def callback(self, interaction: discord.Interaction):
+        selected_id = int(self.item.values[0])
+        await send_archived_survey_result(interaction, selected_id)
+
+
+class SurveyHistoryPageButton(discord.ui.DynamicItem[discord.ui.Button], template=r'history:(?P<direction>[pn]):(?P<anchor>\d+):(?P<page>\d+)'):
+    def __init__(self, direction: str, anchor: int, page: int, disabled: bool = False):
+        self.direction = direction
+        self.anchor = anchor
+        self.page = page
+        label = "⬅️ 이전" if direction == 'p' else "➡️ 다음"
+        super().__init__(discord.ui.Button(
+            label=label,
+            style=discord.ButtonStyle.secondary,
+            disabled=disabled,
+            custom_id=f"history:{direction}:{anchor}:{page}"
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match['direction'], int(match['anchor']), int(match['page']))
+
+    async def callback(self, interaction: discord.Interaction):
+        view = await SurveyHistoryPaginationView.create(self.direction, self.anchor, self.page)
+        await interaction.response.edit_message(embed=view.get_embed(), view=view)
+
+
 class SurveyHistoryPaginationView(discord.ui.View):
-    def __init__(self, past_surveys: list):
-        super().__init__(timeout=600)
-        self.surveys = past_surveys
-        self.current_page = 0
-        self.per_page = 5
-        self.max_pages = max(1, (len(past_surveys) + self.per_page - 1) // self.per_page)
-        self.update_components()
+    per_page = 5
+
+    def __init__(self, surveys: list, total: int, page: int = 0):
+        super().__init__(timeout=None)
+        self.surveys = surveys
+        self.total = total
+        self.current_page = page
+        self.max_pages = max(1, (total + self.per_page - 1) // self.per_page)
 
-    def update_components(self):
-        self.clear_items()
-        
         # Add Select Menu for the current page items
-        start_idx = self.current_page * self.per_page
-        end_idx = start_idx + self.per_page
-        page_surveys = self.surveys[start_idx:end_idx]
-        
-        if page_surveys:
+        if surveys:
             options = []
-            for s in page_surveys:
-                topic = s['topic']
+            for s in surveys:
+                topic = s.topic
                 title = topic[:90] + "..." if len(topic) > 90 else topic
                 options.append(discord.SelectOption(
-                    label=f"ID: {s['id']}회차",
+                    label=f"ID: {s.id}회차",
                     description=title,
-                    value=str(s['id']),
+                    value=str(s.id),
                     emoji="📊"
                 ))
-                
-            select = discord.ui.Select(
-                placeholder="상세 결과를 조회할 주제를 선택하세요...",
-                min_values=1, max_values=1,
-                options=options
-            )
-            
-            async def select_callback(interaction: discord.Interaction):
-                selected_id = int(select.values[0])
-                await send_archived_survey_result(interaction, selected_id)
-                
-            select.callback = select_callback
-            self.add_item(select)
-            
+            self.add_item(SurveyHistorySelect(page, options))
+
         # Add Pagination Buttons
-        prev_btn = discord.ui.Button(label="⬅️ 이전", style=discord.ButtonStyle.secondary, disabled=(self.current_page == 0))
-        next_btn = discord.ui.Button(label="➡️ 다음", style=discord.ButtonStyle.secondary, disabled=(self.current_page == self.max_pages - 1))
-        
-        async def prev_callback(interaction: discord.Interaction):
-            self.current_page -= 1
-            self.update_components()
-            await interaction.response.edit_message(embed=self.get_embed(), view=self)
-            
-        async def next_callback(interaction: discord.Interaction):
-            self.current_page += 1
-            self.update_components()
-            await interaction.response.edit_message(embed=self.get_embed(), view=self)
-            
-        prev_btn.callback = prev_callback
-        next_btn.callback = next_callback
-        
-        self.add_item(prev_btn)
-        self.add_item(next_btn)
+        first_id = surveys[0].id if surveys else 0
+        last_id = surveys[-1].id if surveys else 0
+        self.add_item(SurveyHistoryPageButton('p', first_id, max(0, page - 1), disabled=(page == 0)))
+        self.add_item(SurveyHistoryPageButton(
+            'n', last_id, page + 1,
+            disabled=(page >= self.max_pages - 1 or len(surveys) < self.per_page)
+        ))
+
+    @classmethod
+    async def create(cls, direction: str = 'n', anchor: int = 0, page: int = 0):
+        if page == 0:
+            surveys = await database.get_past_surveys_page(limit=cls.per_page)
+        elif direction == 'p':
+            surveys = await database.get_past_surveys_page(after_id=anchor, limit=cls.per_page)
+        else:
+            surveys = await database.get_past_surveys_page(before_id=anchor, limit=cls.per_page)
+
+        total = await database.count_past_surveys()
+        return cls(surveys, total, page)
 
     def get_embed(self) -> discord.Embed:
         embed = discord.Embed(
@@ -735,14 +937,10 @@ class SurveyHistoryPaginationView(discord.ui.View):
             color=discord.Color.purple()
         )
         
-        start_idx = self.current_page * self.per_page
-        end_idx = start_idx + self.per_page
-        page_surveys = self.surveys[start_idx:end_idx]
-        
-        desc = f"총 {len(self.surveys)}개의 종료된 갈드컵 기록이 있습니다.\n아래 드롭다운 메뉴를 클릭하여 상세 결과(이미지 및 분석)를 조회해 보세요!\n\n"
-        for s in page_surveys:
-            time_str = s['end_time'][:10] if s['end_time'] else "알 수 없음"
-            desc += f"**[ID: {s['id']}]** {s['topic']} ({time_str})\n"
+        desc = f"총 {self.total}개의 종료된 갈드컵 기록이 있습니다.\n아래 드롭다운 메뉴를 클릭하여 상세 결과(이미지 및 분석)를 조회해 보세요!\n\n"
+        for s in self.surveys:
+            time_str = s.end_time[:10] if s.end_time else "알 수 없음"
+            desc += f"**[ID: {s.id}]** {s.topic} ({time_str})\n"
             
         embed.description = desc
         embed.set_footer(text=f"페이지 {self.current_page + 1} / {self.max_pages}")
@@ -778,7 +976,7 @@ class DailyOpinionView(discord.ui.View):
         # 선행 조건 2: 현재 진행 중인 주제에 투표했는지 확인
         active_survey = await get_active_survey()
         if active_survey:
-            voted = await has_user_voted(active_survey['id'], interaction.user.id)
+            voted = await has_user_voted(active_survey.id, interaction.user.id)
             if not voted:
                 await interaction.response.send_message("🤔 **일일 의견을 평가하시려면, 먼저 현재 진행 중인 갈드컵에 투표(의견 작성)하셔야 합니다!**\n채널에 고정된 원본 주제 메시지로 이동해 투표해주세요.", ephemeral=True)
                 return
@@ -798,5 +996,10 @@ class DailyOpinionView(discord.ui.View):
         else:
             await interaction.response.send_message("❌ 이미 해당 코멘트에 같은 평가를 남기셨습니다.", ephemeral=True)
 
+PERSISTENT_DYNAMIC_ITEMS = (
+    VoteOptionButton, VoteMultiSelect, ViewStatsButton,
+    OpinionPageButton, SurveyHistorySelect, SurveyHistoryPageButton,
+)
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(Survey(bot))
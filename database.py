@@ -1,12 +1,103 @@
 import aiosqlite
+import asyncio
 import json
 import logging
+import os
+import random
+import re
+import time
+import zlib
+
+from models import Option, QueuedTopic, Survey, Vote, option_dicts, parse_options, row_factory
+from topic_index import SurveyTitleIndex, TopicIndex
 
 DB_FILE = "legend_galdcup.db"
+# 종료된 설문의 투표/의견을 옮겨 두는 보관용 DB. 보관된 설문을 조회할 때만 ATTACH 합니다.
+ARCHIVE_DB_FILE = "archive.db"
 logger = logging.getLogger("discord")
 
+# vote_choices.option_idx 값 중 '기타(직접입력)' 단답형 선택을 의미하는 값
+CUSTOM_OPTION_IDX = -1
+
+# 대기열 순서(position) 값 사이의 기본 간격. 순서 변경 시 두 값의 중간값을 사용합니다.
+QUEUE_POSITION_GAP = 1024
+
+# 무작위 주제 뽑기 시 id 범위에서 빈 번호(삭제된 id)를 다시 뽑는 최대 횟수
+RANDOM_POP_ATTEMPTS = 8
+
+# 보관 DB로 한 번에 옮기는 투표 수 (현재 DB의 쓰기 잠금을 짧게 유지)
+ARCHIVE_BATCH_SIZE = 500
+
+# iter_votes_for_survey가 한 번에 읽어 내보내는 투표 수
+VOTE_CHUNK_SIZE = 1000
+
+# 현재 DB의 스키마 버전 (PRAGMA user_version). 이 버전 이상이면 구버전 투표 변환을 이미 마친 DB입니다.
+# 1: 모든 투표에 vote_choices 행이 있음
+SCHEMA_VERSION = 1
+
+# 온라인 백업 시 backup API가 이만큼의 페이지를 복사할 때마다 잠금을 풀고 잠시 쉽니다.
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.05
+# 정기 점검 시 ANALYZE가 인덱스마다 살펴볼 최대 행 수 (PRAGMA analysis_limit)
+ANALYSIS_LIMIT = 400
+# 빈 페이지 비율이 이 값 이상이면 정기 점검 때 VACUUM으로 파일을 줄입니다.
+VACUUM_FREE_RATIO = 0.25
+
+# 페이지 수 계산용 COUNT(*) 결과 캐시 (키: 튜플, 값: (만료시각, 개수))
+COUNT_CACHE_TTL = 60
+_count_cache = {}
+
+def _get_cached_count(key):
+    entry = _count_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+def _set_cached_count(key, value: int):
+    _count_cache[key] = (time.monotonic() + COUNT_CACHE_TTL, value)
+
+def _adjust_cached_count(key, delta: int):
+    """캐시된 개수가 있으면 만료시각은 그대로 두고 증감분만 반영합니다."""
+    entry = _count_cache.get(key)
+    if entry and delta:
+        _count_cache[key] = (entry[0], max(0, entry[1] + delta))
+
+# /현재상황 스냅샷 캐시 (키: (survey_id, server_id), 값: (만료시각, 스냅샷))
+STATUS_CACHE_TTL = 5
+_status_cache = {}
+_status_inflight = {}
+_status_generation = {}
+
+# 서버별 공지 설정, 전역 설정, 봇 관리자 목록 캐시.
+# init_db에서 한 번에 읽어 두고, 이후에는 설정을 바꾸는 함수가 DB에 쓴 뒤 같은 값을 반영합니다(write-through).
+_server_settings = {}
+_global_settings = {}
+_bot_admins = set()
+_settings_loaded = False
+
+# 전문 검색(FTS5) 토크나이저. 한글은 조사가 붙어 있어 단어별 접두 검색으로 조회합니다.
+FTS_TOKENIZER = 'unicode61 remove_diacritics 2'
+# /검색 시 의견 색인에서 살펴볼 최대 일치 건수
+OPINION_SEARCH_LIMIT = 50
+
+# 제안/대기열/지난 설문 주제의 유사 중복 검사용 인덱스 (init_db에서 한 번 구성 후 쓰기마다 갱신)
+topic_index = TopicIndex()
+SIMILAR_SOURCE_LABELS = {'suggested': '건의 목록', 'queue': '대기열', 'survey': '지난 설문'}
+# /조회 자동완성용 종료된 설문 제목 인덱스 (키 입력마다 DB를 조회하지 않도록 메모리에서 검색)
+survey_title_index = SurveyTitleIndex()
+
+def invalidate_count_cache(survey_id: int = None):
+    """survey_id가 주어지면 해당 설문의 의견 개수만, 아니면 과거 설문 개수만 무효화합니다."""
+    if survey_id is None:
+        _count_cache.pop(('past_surveys',), None)
+        return
+    for key in [k for k in _count_cache if k[0] == 'opinions' and k[1] == survey_id]:
+        _count_cache.pop(key, None)
+
 async def init_db():
     async with aiosqlite.connect(DB_FILE) as db:
+        # WAL: 읽기와 쓰기가 서로 막지 않아 백업/VACUUM/여러 프로세스 접근 중에도 투표 기록이 밀리지 않음 (DB 파일에 영구 저장됨)
+        await db.execute('PRAGMA journal_mode=WAL')
         # 서버 정보 테이블
         await db.execute('''
             CREATE TABLE IF NOT EXISTS servers (
@@ -52,6 +143,12 @@ async def init_db():
             await db.execute('ALTER TABLE surveys ADD COLUMN image_url TEXT')
         except Exception:
             pass
+
+        # 1이면 투표/집계가 보관 DB로 옮겨졌거나 옮기는 중인 설문
+        try:
+            await db.execute('ALTER TABLE surveys ADD COLUMN archived INTEGER DEFAULT 0')
+        except Exception:
+            pass
         
         # 투표 기록 테이블
         # user_id는 중복투표 확인용, opinion은 300자 이내
@@ -100,6 +197,15 @@ async def init_db():
             )
         ''')
         
+        # 클러스터 모드의 리더 임대 (name별로 한 프로세스만 유효한 임대를 가짐, expires_at은 epoch 초)
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        
         # 주제 대기열 (Queue) 테이블
         await db.execute('''
             CREATE TABLE IF NOT EXISTS topic_queue (
@@ -110,10 +216,18 @@ async def init_db():
                 allow_short_answer INTEGER DEFAULT 0,
                 suggested_by INTEGER NOT NULL,
                 image_url TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                position INTEGER
             )
         ''')
         
+        try:
+            await db.execute('ALTER TABLE topic_queue ADD COLUMN position INTEGER')
+        except Exception:
+            pass
+        await db.execute('UPDATE topic_queue SET position = id * ? WHERE position IS NULL', (QUEUE_POSITION_GAP,))
+        await db.execute('CREATE INDEX IF NOT EXISTS idx_topic_queue_position ON topic_queue (position, id)')
+        
         # 일일 의견(박제) 투표 테이블
         await db.execute('''
             CREATE TABLE IF NOT EXISTS daily_opinion_votes (
@@ -159,12 +273,311 @@ async def init_db():
             )
         ''')
         
+        # 의견 페이지네이션(keyset) 조회용 인덱스
+        await db.execute('CREATE INDEX IF NOT EXISTS idx_votes_survey_id ON votes (survey_id, id)')
+        
+        # 투표 선택지 정규화 테이블 (한 투표에 여러 선택지를 고를 수 있음)
+        # option_idx는 surveys.options의 인덱스, 단답형 직접입력은 CUSTOM_OPTION_IDX + custom_text
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS vote_choices (
+                vote_id INTEGER NOT NULL,
+                survey_id INTEGER NOT NULL,
+                option_idx INTEGER NOT NULL,
+                custom_text TEXT
+            )
+        ''')
+        await db.execute('CREATE INDEX IF NOT EXISTS idx_vote_choices_survey ON vote_choices (survey_id, option_idx)')
+        await db.execute('CREATE INDEX IF NOT EXISTS idx_vote_choices_vote ON vote_choices (vote_id)')
+        # 변환은 한 번만 필요하므로 스키마 버전이 낮은 DB(업그레이드 직후, 옛 백업 복원)에서만 전체 투표를 훑음
+        async with db.execute('PRAGMA user_version') as cursor:
+            schema_version = (await cursor.fetchone())[0]
+        if schema_version < SCHEMA_VERSION:
+            await _migrate_vote_choices(db)
+            await db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        
+        # 진행 중인 투표의 특정 시점 집계 스냅샷 (투표/의견 복사 없이 집계값만 보관)
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS survey_snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                survey_id INTEGER NOT NULL,
+                taken_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                tallies_json TEXT NOT NULL,
+                total_votes INTEGER DEFAULT 0,
+                opinion_count INTEGER DEFAULT 0
+            )
+        ''')
+        await db.execute('CREATE INDEX IF NOT EXISTS idx_survey_snapshots_survey ON survey_snapshots (survey_id, id)')
+
+        # 지난 주제/의견 전문 검색 색인 (원본 테이블을 참조하는 external content FTS5, 트리거로 동기화)
+        try:
+            await _init_search_index(db)
+        except Exception as e:
+            logger.warning(f"FTS5 search index is unavailable: {e}")
+
         await db.commit()
-        logger.info("Database initialized successfully.")
+    await _init_archive_db()
+    await rebuild_topic_index()
+    await load_settings_cache()
+    logger.info("Database initialized successfully.")
+
+async def _init_archive_db():
+    """보관 DB의 테이블을 만듭니다. 의견 본문은 압축해 두고, 검색 색인은 본문 없이(contentless) 유지합니다."""
+    async with aiosqlite.connect(ARCHIVE_DB_FILE) as db:
+        await db.execute('PRAGMA journal_mode=WAL')
+        # opinion_z: _pack_opinion으로 압축한 의견 (의견이 없으면 NULL)
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS votes (
+                id INTEGER PRIMARY KEY,
+                survey_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                server_id INTEGER NOT NULL,
+                selected_option TEXT NOT NULL,
+                opinion_z BLOB,
+                updated_at TIMESTAMP,
+                is_daily_picked INTEGER DEFAULT 0
+            )
+        ''')
+        await db.execute('CREATE INDEX IF NOT EXISTS idx_votes_survey_id ON votes (survey_id, id)')
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS vote_choices (
+                vote_id INTEGER NOT NULL,
+                survey_id INTEGER NOT NULL,
+                option_idx INTEGER NOT NULL,
+                custom_text TEXT
+            )
+        ''')
+        await db.execute('CREATE INDEX IF NOT EXISTS idx_vote_choices_survey ON vote_choices (survey_id, option_idx)')
+        # 옮기기 직전에 계산해 둔 최종 집계 (보관된 설문의 개수/득표 조회는 이 행 하나만 읽음)
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS survey_results (
+                survey_id INTEGER PRIMARY KEY,
+                total_votes INTEGER DEFAULT 0,
+                opinion_count INTEGER DEFAULT 0,
+                tallies_json TEXT NOT NULL,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        try:
+            await db.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS opinions_fts
+                USING fts5(opinion, content='', tokenize='{FTS_TOKENIZER}')
+            ''')
+        except Exception as e:
+            logger.warning(f"FTS5 archive search index is unavailable: {e}")
+        await db.commit()
+
+async def _attach_archive(db):
+    await db.execute('ATTACH DATABASE ? AS archive', (ARCHIVE_DB_FILE,))
+
+async def _attach_if_archived(db, survey_id: int) -> bool:
+    """설문이 보관 DB로 옮겨졌(거나 옮기는 중이)면 보관 DB를 붙이고 True를 반환합니다.
+    옮기던 중 멈추면 같은 투표가 두 곳에 남을 수 있으므로, 호출 측은 현재 DB에 아직 있는 보관 행을 빼고 합쳐 읽습니다."""
+    async with db.execute('SELECT archived FROM surveys WHERE id = ?', (survey_id,)) as cursor:
+        row = await cursor.fetchone()
+    if not row or not row[0]:
+        return False
+    await _attach_archive(db)
+    return True
+
+def _pack_opinion(opinion: str):
+    """의견을 보관용으로 압축합니다. 짧아서 압축 이득이 없으면 원문 그대로 두고 첫 바이트로 구분합니다."""
+    if not opinion:
+        return None
+    raw = opinion.encode('utf-8')
+    packed = zlib.compress(raw, 9)
+    return b'z' + packed if len(packed) < len(raw) else b'r' + raw
+
+def _unpack_opinion(blob) -> str:
+    if not blob:
+        return None
+    blob = bytes(blob)
+    data = zlib.decompress(blob[1:]) if blob[:1] == b'z' else blob[1:]
+    return data.decode('utf-8')
+
+def _vote_from_archive_row(row) -> Vote:
+    """(Vote 컬럼..., opinion_z) 행에서 보관 DB의 압축된 의견을 풀어 Vote로 만듭니다. 현재 DB 행은 opinion_z가 NULL입니다."""
+    *columns, packed = row
+    if columns[5] is None:
+        columns[5] = _unpack_opinion(packed)
+    return Vote.from_row(columns)
+
+def _opinion_from_row(row) -> dict:
+    opinion = dict(row)
+    packed = opinion.pop('opinion_z', None)
+    if opinion['opinion'] is None:
+        opinion['opinion'] = _unpack_opinion(packed)
+    return opinion
+
+async def _init_search_index(db):
+    async with db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'surveys_fts'") as cursor:
+        is_new = await cursor.fetchone() is None
+
+    await db.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS surveys_fts
+        USING fts5(topic, content='surveys', content_rowid='id', tokenize='{FTS_TOKENIZER}')
+    ''')
+    await db.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS opinions_fts
+        USING fts5(opinion, content='votes', content_rowid='id', tokenize='{FTS_TOKENIZER}')
+    ''')
+    await db.executescript('''
+        CREATE TRIGGER IF NOT EXISTS surveys_fts_ai AFTER INSERT ON surveys BEGIN
+            INSERT INTO surveys_fts (rowid, topic) VALUES (new.id, new.topic);
+        END;
+        CREATE TRIGGER IF NOT EXISTS surveys_fts_ad AFTER DELETE ON surveys BEGIN
+            INSERT INTO surveys_fts (surveys_fts, rowid, topic) VALUES ('delete', old.id, old.topic);
+        END;
+        CREATE TRIGGER IF NOT EXISTS surveys_fts_au AFTER UPDATE OF topic ON surveys BEGIN
+            INSERT INTO surveys_fts (surveys_fts, rowid, topic) VALUES ('delete', old.id, old.topic);
+            INSERT INTO surveys_fts (rowid, topic) VALUES (new.id, new.topic);
+        END;
+        CREATE TRIGGER IF NOT EXISTS votes_fts_ai AFTER INSERT ON votes BEGIN
+            INSERT INTO opinions_fts (rowid, opinion) VALUES (new.id, new.opinion);
+        END;
+        CREATE TRIGGER IF NOT EXISTS votes_fts_ad AFTER DELETE ON votes BEGIN
+            INSERT INTO opinions_fts (opinions_fts, rowid, opinion) VALUES ('delete', old.id, old.opinion);
+        END;
+        CREATE TRIGGER IF NOT EXISTS votes_fts_au AFTER UPDATE OF opinion ON votes BEGIN
+            INSERT INTO opinions_fts (opinions_fts, rowid, opinion) VALUES ('delete', old.id, old.opinion);
+            INSERT INTO opinions_fts (rowid, opinion) VALUES (new.id, new.opinion);
+        END;
+    ''')
+
+    # 색인을 처음 만든 경우 기존 데이터를 한 번에 채움
+    if is_new:
+        await db.execute("INSERT INTO surveys_fts (surveys_fts) VALUES ('rebuild')")
+        await db.execute("INSERT INTO opinions_fts (opinions_fts) VALUES ('rebuild')")
+
+async def rebuild_topic_index():
+    """세 테이블의 주제 제목/선택지로 유사 주제 인덱스와 /조회 자동완성 인덱스를 처음부터 다시 구성합니다."""
+    topic_index.clear()
+    survey_title_index.clear()
+    async with aiosqlite.connect(DB_FILE) as db:
+        for source, table in (('suggested', 'suggested_topics'), ('queue', 'topic_queue'), ('survey', 'surveys')):
+            async with db.execute(f'SELECT id, topic, options FROM {table}') as cursor:
+                async for row in cursor:
+                    topic_index.add((source, row[0]), row[1], parse_options(row[2]))
+        async with db.execute('SELECT id, topic FROM surveys WHERE is_active = 0') as cursor:
+            async for row in cursor:
+                survey_title_index.add(row[0], row[1])
+    logger.info(f"Topic indexes built with {len(topic_index)} topics ({len(survey_title_index)} past surveys).")
+
+async def get_topic_index_fingerprint() -> tuple:
+    """메모리 인덱스의 원본 테이블들이 바뀌었는지 가늠하는 (행 수, 최대 ID) 묶음을 반환합니다.
+    클러스터 모드에서 다른 프로세스가 주제를 추가/삭제했거나 설문이 끝났는지 확인할 때 씁니다."""
+    async with aiosqlite.connect(DB_FILE) as db:
+        async with db.execute('''
+            SELECT
+                (SELECT COUNT(*) FROM suggested_topics), (SELECT MAX(id) FROM suggested_topics),
+                (SELECT COUNT(*) FROM topic_queue), (SELECT MAX(id) FROM topic_queue),
+                (SELECT COUNT(*) FROM surveys WHERE is_active = 0), (SELECT MAX(id) FROM surveys)
+        ''') as cursor:
+            return tuple(await cursor.fetchone())
+
+def search_past_survey_titles(text: str, limit: int = 25) -> list:
+    """종료된 설문을 ID 앞자리 또는 제목 일부로 찾아 [(설문 ID, 제목)]을 최신순으로 반환합니다."""
+    return survey_title_index.search(text, limit)
+
+def find_similar_topics(topic: str, options: list = None, exclude: tuple = None) -> list:
+    """제안/대기열/지난 설문 중 유사한 주제를 유사도 높은 순으로 반환합니다.
+    각 항목은 {'source': 'suggested'|'queue'|'survey', 'id', 'topic', 'similarity'} 형태입니다."""
+    return [
+        {'source': key[0], 'id': key[1], 'topic': title, 'similarity': similarity}
+        for key, title, similarity in topic_index.query(topic, options, exclude=exclude)
+    ]
+
+
+async def _migrate_vote_choices(db):
+    """vote_choices 행이 없는 기존 투표의 selected_option 텍스트를 선택지 인덱스로 변환합니다.
+    대상 투표를 VOTE_CHUNK_SIZE개씩 읽어 변환하므로 투표 수와 상관없이 한 묶음만 메모리에 올라갑니다."""
+    names_by_survey = {}
+    migrated = 0
+    async with db.execute('''
+        SELECT v.id, v.survey_id, v.selected_option, s.options
+        FROM votes v LEFT JOIN surveys s ON s.id = v.survey_id
+        WHERE NOT EXISTS (SELECT 1 FROM vote_choices c WHERE c.vote_id = v.id)
+    ''') as cursor:
+        while rows := await cursor.fetchmany(VOTE_CHUNK_SIZE):
+            choice_rows = []
+            for vote_id, survey_id, selected_option, options in rows:
+                if survey_id not in names_by_survey:
+                    try:
+                        names_by_survey[survey_id] = [opt.name for opt in parse_options(options)]
+                    except (TypeError, ValueError):
+                        names_by_survey[survey_id] = []
+                for option_idx, custom_text in parse_selected_option(selected_option, names_by_survey[survey_id]):
+                    choice_rows.append((vote_id, survey_id, option_idx, custom_text))
+            await db.executemany('INSERT INTO vote_choices (vote_id, survey_id, option_idx, custom_text) VALUES (?, ?, ?, ?)', choice_rows)
+            migrated += len(rows)
+    if migrated:
+        logger.info(f"Migrated {migrated} votes into vote_choices.")
 
 
 # --- Helper Functions ---
 
+def _options_json(options) -> str:
+    """선택지를 {'name', 'desc'} 형태로 통일해 options 컬럼에 저장할 JSON으로 만듭니다."""
+    return json.dumps(option_dicts(options), ensure_ascii=False)
+
+def parse_selected_option(selected_option: str, option_names: list) -> list:
+    """구버전 selected_option 텍스트("A" 또는 "A, 기타입력")를 (option_idx, custom_text) 목록으로 변환합니다."""
+    text = (selected_option or '').strip()
+    if text in option_names:
+        return [(option_names.index(text), None)]
+    choices = []
+    for part in [p.strip() for p in text.split(',') if p.strip()] or [text]:
+        if part in option_names:
+            choices.append((option_names.index(part), None))
+        else:
+            choices.append((CUSTOM_OPTION_IDX, part))
+    return choices
+
+def tallies_to_counts(options: list, tallies: list) -> dict:
+    """get_vote_tallies 결과를 {선택지 이름: 득표 수} 딕셔너리로 변환합니다. 득표가 없는 선택지도 0으로 포함됩니다."""
+    option_names = [opt.name for opt in parse_options(options)]
+    counts = {name: 0 for name in option_names}
+    for option_idx, custom_text, cnt in tallies:
+        if 0 <= option_idx < len(option_names):
+            name = option_names[option_idx]
+        else:
+            name = (custom_text or '기타').strip()
+        counts[name] = counts.get(name, 0) + cnt
+    return counts
+
+
+def _new_server_settings() -> dict:
+    # servers 테이블의 컬럼 기본값과 같게 유지
+    return {'announcement_channel_id': None, 'announcement_enabled': 1, 'current_survey_msg_id': None}
+
+async def load_settings_cache():
+    """servers, global_settings, bot_admins를 쿼리 하나로 읽어 설정 캐시를 다시 채웁니다.
+    init_db(복원 후 포함)에서 호출되며, 그 밖의 곳에서 DB를 직접 고쳤을 때도 이 함수로 맞출 수 있습니다."""
+    global _settings_loaded
+    async with aiosqlite.connect(DB_FILE) as db:
+        async with db.execute('''
+            SELECT 'server', guild_id, announcement_channel_id, announcement_enabled, current_survey_msg_id FROM servers
+            UNION ALL
+            SELECT 'global', key, value, NULL, NULL FROM global_settings
+            UNION ALL
+            SELECT 'admin', user_id, NULL, NULL, NULL FROM bot_admins
+        ''') as cursor:
+            rows = await cursor.fetchall()
+    _server_settings.clear()
+    _global_settings.clear()
+    _bot_admins.clear()
+    for kind, key, a, b, c in rows:
+        if kind == 'server':
+            _server_settings[key] = {'announcement_channel_id': a, 'announcement_enabled': b, 'current_survey_msg_id': c}
+        elif kind == 'global':
+            _global_settings[key] = a
+        else:
+            _bot_admins.add(key)
+    _settings_loaded = True
+
+async def _ensure_settings_loaded():
+    if not _settings_loaded:
+        await load_settings_cache()
+
 async def set_announcement_channel(guild_id: int, channel_id: int):
     async with aiosqlite.connect(DB_FILE) as db:
         await db.execute('''
@@ -173,12 +586,12 @@ async def set_announcement_channel(guild_id: int, channel_id: int):
             ON CONFLICT(guild_id) DO UPDATE SET announcement_channel_id=excluded.announcement_channel_id
         ''', (guild_id, channel_id))
         await db.commit()
+    _server_settings.setdefault(guild_id, _new_server_settings())['announcement_channel_id'] = channel_id
 
 async def get_announcement_channel(guild_id: int):
-    async with aiosqlite.connect(DB_FILE) as db:
-        async with db.execute('SELECT announcement_channel_id FROM servers WHERE guild_id = ?', (guild_id,)) as cursor:
-            row = await cursor.fetchone()
-            return row[0] if row else None
+    await _ensure_settings_loaded()
+    settings = _server_settings.get(guild_id)
+    return settings['announcement_channel_id'] if settings else None
 
 async def set_announcement_enabled(guild_id: int, enabled: int):
     async with aiosqlite.connect(DB_FILE) as db:
@@ -186,6 +599,10 @@ async def set_announcement_enabled(guild_id: int, enabled: int):
             UPDATE servers SET announcement_enabled = ? WHERE guild_id = ?
         ''', (enabled, guild_id))
         await db.commit()
+    # UPDATE만 하므로 행이 없던 서버는 캐시에도 만들지 않음
+    settings = _server_settings.get(guild_id)
+    if settings:
+        settings['announcement_enabled'] = enabled
 
 async def set_current_survey_msg_id(guild_id: int, message_id: int):
     async with aiosqlite.connect(DB_FILE) as db:
@@ -196,18 +613,19 @@ async def set_current_survey_msg_id(guild_id: int, message_id: int):
             UPDATE servers SET current_survey_msg_id = ? WHERE guild_id = ?
         ''', (message_id, guild_id))
         await db.commit()
+    settings = _server_settings.get(guild_id)
+    if settings:
+        settings['current_survey_msg_id'] = message_id
 
 async def get_current_survey_msg_id(guild_id: int):
-    async with aiosqlite.connect(DB_FILE) as db:
-        async with db.execute('SELECT current_survey_msg_id FROM servers WHERE guild_id = ?', (guild_id,)) as cursor:
-            row = await cursor.fetchone()
-            return row[0] if row else None
+    await _ensure_settings_loaded()
+    settings = _server_settings.get(guild_id)
+    return settings['current_survey_msg_id'] if settings else None
 
 async def get_global_setting(key: str, default: str = None) -> str:
-    async with aiosqlite.connect(DB_FILE) as db:
-        async with db.execute('SELECT value FROM global_settings WHERE key = ?', (key,)) as cursor:
-            row = await cursor.fetchone()
-            return row[0] if row else default
+    await _ensure_settings_loaded()
+    value = _global_settings.get(key)
+    return value if value is not None else default
 
 async def set_global_setting(key: str, value: str):
     async with aiosqlite.connect(DB_FILE) as db:
@@ -217,6 +635,37 @@ async def set_global_setting(key: str, value: str):
             ON CONFLICT(key) DO UPDATE SET value=excluded.value
         ''', (key, value))
         await db.commit()
+    # value 컬럼이 TEXT라 DB에는 문자열로 저장되므로 캐시도 같은 형태로 보관
+    _global_settings[key] = str(value) if value is not None else None
+
+async def acquire_lease(name: str, holder: str, ttl: float):
+    """name 임대를 holder 명의로 새로 얻거나 연장합니다. 성공하면 새 만료 시각(epoch 초)을,
+    다른 holder가 아직 만료되지 않은 임대를 쥐고 있으면 None을 반환합니다.
+    확인과 갱신이 UPSERT 한 문장이라 여러 프로세스가 동시에 시도해도 한 곳만 성공합니다."""
+    now = time.time()
+    async with aiosqlite.connect(DB_FILE) as db:
+        async with db.execute('''
+            INSERT INTO leases (name, holder, expires_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET holder=excluded.holder, expires_at=excluded.expires_at
+            WHERE leases.holder = excluded.holder OR leases.expires_at <= ?
+            RETURNING expires_at
+        ''', (name, holder, now + ttl, now)) as cursor:
+            row = await cursor.fetchone()
+        await db.commit()
+    return row[0] if row else None
+
+async def release_lease(name: str, holder: str):
+    """holder가 쥔 임대를 즉시 만료시켜 다른 프로세스가 다음 시도에서 바로 넘겨받게 합니다."""
+    async with aiosqlite.connect(DB_FILE) as db:
+        await db.execute('UPDATE leases SET expires_at = 0 WHERE name = ? AND holder = ?', (name, holder))
+        await db.commit()
+
+async def get_lease(name: str):
+    """(holder, 만료 시각) 또는 임대 기록이 없으면 None을 반환합니다."""
+    async with aiosqlite.connect(DB_FILE) as db:
+        async with db.execute('SELECT holder, expires_at FROM leases WHERE name = ?', (name,)) as cursor:
+            return await cursor.fetchone()
 
 async def get_daily_opinion_votes(opinion_id: str):
     async with aiosqlite.connect(DB_FILE) as db:
@@ -290,54 +739,80 @@ async def vote_daily_opinion(opinion_id: str, user_id: int, is_like: int) -> boo
         return True
 
 async def get_all_active_announcement_channels():
-    async with aiosqlite.connect(DB_FILE) as db:
-        async with db.execute('SELECT guild_id, announcement_channel_id FROM servers WHERE announcement_channel_id IS NOT NULL AND announcement_enabled = 1') as cursor:
-            return await cursor.fetchall()
+    await _ensure_settings_loaded()
+    return [
+        (guild_id, settings['announcement_channel_id'])
+        for guild_id, settings in sorted(_server_settings.items())
+        if settings['announcement_channel_id'] is not None and settings['announcement_enabled'] == 1
+    ]
 
-async def create_survey(topic: str, options: list, allow_short_answer: bool, image_url: str = None):
+async def create_survey(topic: str, options: list, allow_short_answer: bool, image_url: str = None, allow_multiple: bool = False):
     async with aiosqlite.connect(DB_FILE) as db:
         async with db.execute('''
-            INSERT INTO surveys (topic, options, allow_short_answer, image_url)
-            VALUES (?, ?, ?, ?)
-        ''', (topic, json.dumps(options, ensure_ascii=False), int(allow_short_answer), image_url)) as cursor:
+            INSERT INTO surveys (topic, options, allow_short_answer, image_url, allow_multiple)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (topic, _options_json(options), int(allow_short_answer), image_url, int(allow_multiple))) as cursor:
             survey_id = cursor.lastrowid
         await db.commit()
-        return survey_id
+    topic_index.add(('survey', survey_id), topic, options)
+    return survey_id
 
-async def get_active_survey():
+async def get_active_survey() -> Survey:
     async with aiosqlite.connect(DB_FILE) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute('SELECT * FROM surveys WHERE is_active = 1 ORDER BY id DESC LIMIT 1') as cursor:
-            row = await cursor.fetchone()
-            if row:
-                survey = dict(row)
-                survey['options'] = json.loads(survey['options'])
-                survey['allow_short_answer'] = bool(survey['allow_short_answer'])
-                return survey
-            return None
+        db.row_factory = row_factory(Survey)
+        async with db.execute(f'SELECT {Survey.COLUMNS} FROM surveys WHERE is_active = 1 ORDER BY id DESC LIMIT 1') as cursor:
+            return await cursor.fetchone()
+
+async def get_survey(survey_id: int) -> Survey:
+    async with aiosqlite.connect(DB_FILE) as db:
+        db.row_factory = row_factory(Survey)
+        async with db.execute(f'SELECT {Survey.COLUMNS} FROM surveys WHERE id = ?', (survey_id,)) as cursor:
+            return await cursor.fetchone()
 
 async def deactivate_survey(survey_id: int):
     async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute('UPDATE surveys SET is_active = 0, end_time = CURRENT_TIMESTAMP WHERE id = ?', (survey_id,))
+        async with db.execute('UPDATE surveys SET is_active = 0, end_time = CURRENT_TIMESTAMP WHERE id = ? RETURNING topic', (survey_id,)) as cursor:
+            row = await cursor.fetchone()
         await db.commit()
+    invalidate_count_cache()
+    if row:
+        survey_title_index.add(survey_id, row[0])
 
-async def save_vote(survey_id: int, user_id: int, server_id: int, selected_option: str, opinion: str):
+async def save_vote(survey_id: int, user_id: int, server_id: int, selected_option: str, opinion: str, choices: list):
+    """투표를 기록합니다. selected_option은 표시용 텍스트이고,
+    choices는 집계용 (option_idx, custom_text) 목록입니다.
+    진행 중이 아닌 설문이면 기록하지 않고 False를 반환합니다. (종료된 설문의 집계는 보관 시점에 고정되므로)"""
     async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute('''
+        # 확인과 기록을 한 문장으로 처리해, 팝업을 연 사이 설문이 교체되어도 종료된 설문에는 들어가지 않음
+        async with db.execute('''
             INSERT INTO votes (survey_id, user_id, server_id, selected_option, opinion, updated_at)
-            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            SELECT ?, ?, ?, ?, ?, CURRENT_TIMESTAMP
+            WHERE EXISTS (SELECT 1 FROM surveys WHERE id = ? AND is_active = 1)
             ON CONFLICT(survey_id, user_id) DO UPDATE SET 
                 selected_option=excluded.selected_option, 
                 opinion=excluded.opinion,
                 server_id=excluded.server_id,
                 updated_at=CURRENT_TIMESTAMP
-        ''', (survey_id, user_id, server_id, selected_option, opinion))
+            RETURNING id
+        ''', (survey_id, user_id, server_id, selected_option, opinion, survey_id)) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return False
+        vote_id = row[0]
+        await db.execute('DELETE FROM vote_choices WHERE vote_id = ?', (vote_id,))
+        await db.executemany(
+            'INSERT INTO vote_choices (vote_id, survey_id, option_idx, custom_text) VALUES (?, ?, ?, ?)',
+            [(vote_id, survey_id, option_idx, custom_text) for option_idx, custom_text in choices]
+        )
         await db.commit()
+    invalidate_count_cache(survey_id)
+    invalidate_status_cache(survey_id)
+    return True
 
-async def get_user_vote(survey_id: int, user_id: int):
+async def get_user_vote(survey_id: int, user_id: int) -> Vote:
     async with aiosqlite.connect(DB_FILE) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute('SELECT * FROM votes WHERE survey_id = ? AND user_id = ?', (survey_id, user_id)) as cursor:
+        db.row_factory = row_factory(Vote)
+        async with db.execute(f'SELECT {Vote.COLUMNS} FROM votes WHERE survey_id = ? AND user_id = ?', (survey_id, user_id)) as cursor:
             return await cursor.fetchone()
 
 async def has_user_voted(survey_id: int, user_id: int) -> bool:
@@ -346,11 +821,167 @@ async def has_user_voted(survey_id: int, user_id: int) -> bool:
             row = await cursor.fetchone()
             return row is not None
 
-async def get_votes_for_survey(survey_id: int):
+async def iter_votes_for_survey(survey_id: int, chunk_size: int = VOTE_CHUNK_SIZE):
+    """설문의 투표를 id 순으로 최대 chunk_size개씩 묶어 list[Vote]로 내보내는 비동기 제너레이터입니다.
+
+    마지막으로 읽은 id 다음부터 다시 조회(keyset)하므로 참여 인원과 상관없이 한 묶음만 메모리에 올라가고,
+    묶음 사이에는 트랜잭션을 잡지 않아 투표 저장이나 보관 작업을 막지 않습니다.
+    """
+    last_id = 0
+    archived = False
+    async with aiosqlite.connect(DB_FILE) as db:
+        while True:
+            # 순회 도중 보관 작업이 시작될 수 있으므로 아직 보관 전이면 묶음마다 다시 확인
+            if not archived:
+                archived = await _attach_if_archived(db, survey_id)
+            if archived:
+                query = f'''
+                    SELECT {Vote.COLUMNS}, NULL AS opinion_z FROM votes WHERE survey_id = ? AND id > ?
+                    UNION ALL
+                    SELECT id, survey_id, user_id, server_id, selected_option, NULL, updated_at, is_daily_picked, opinion_z
+                    FROM archive.votes a WHERE survey_id = ? AND id > ?
+                        AND NOT EXISTS (SELECT 1 FROM votes h WHERE h.id = a.id)
+                    ORDER BY id LIMIT ?
+                '''
+                params = (survey_id, last_id, survey_id, last_id, chunk_size)
+            else:
+                query = f'SELECT {Vote.COLUMNS}, NULL FROM votes WHERE survey_id = ? AND id > ? ORDER BY id LIMIT ?'
+                params = (survey_id, last_id, chunk_size)
+            async with db.execute(query, params) as cursor:
+                chunk = [_vote_from_archive_row(r) for r in await cursor.fetchall()]
+            if not chunk:
+                return
+            last_id = chunk[-1].id
+            yield chunk
+            if len(chunk) < chunk_size:
+                return
+
+async def count_opinions(survey_id: int, server_id: int = 0) -> int:
+    """의견이 작성된 투표 수를 반환합니다. server_id가 0이면 전체 서버 기준입니다."""
+    key = ('opinions', survey_id, server_id)
+    cached = _get_cached_count(key)
+    if cached is not None:
+        return cached
+    query = "SELECT COUNT(*) FROM votes WHERE survey_id = ? AND opinion IS NOT NULL AND opinion != ''"
+    cold_query = ('SELECT COUNT(*) FROM archive.votes a WHERE survey_id = ? AND opinion_z IS NOT NULL'
+                  ' AND NOT EXISTS (SELECT 1 FROM votes h WHERE h.id = a.id)')
+    params = [survey_id]
+    if server_id:
+        query += ' AND server_id = ?'
+        cold_query += ' AND server_id = ?'
+        params.append(server_id)
+    async with aiosqlite.connect(DB_FILE) as db:
+        if await _attach_if_archived(db, survey_id):
+            query = f'SELECT ({query}) + ({cold_query})'
+            params = params * 2
+        async with db.execute(query, params) as cursor:
+            row = await cursor.fetchone()
+    _set_cached_count(key, row[0])
+    return row[0]
+
+async def get_opinions_page(survey_id: int, server_id: int = 0, before_id: int = None, after_id: int = None, limit: int = 5):
+    """의견 목록을 id 내림차순 keyset 방식으로 한 페이지만 가져옵니다.
+    before_id가 주어지면 다음 페이지, after_id가 주어지면 이전 페이지를 조회합니다."""
+    filters = ''
+    params = []
+    if server_id:
+        filters += ' AND server_id = ?'
+        params.append(server_id)
+    order = 'DESC'
+    if after_id is not None:
+        filters += ' AND id > ?'
+        params.append(after_id)
+        order = 'ASC'
+    elif before_id is not None:
+        filters += ' AND id < ?'
+        params.append(before_id)
+    query = f"SELECT id, selected_option, opinion FROM votes WHERE survey_id = ? AND opinion IS NOT NULL AND opinion != ''{filters} ORDER BY id {order} LIMIT ?"
+    params = [survey_id, *params, limit]
     async with aiosqlite.connect(DB_FILE) as db:
         db.row_factory = aiosqlite.Row
-        async with db.execute('SELECT * FROM votes WHERE survey_id = ? ORDER BY updated_at DESC', (survey_id,)) as cursor:
-            return await cursor.fetchall()
+        if await _attach_if_archived(db, survey_id):
+            # 두 저장소에서 각각 한 페이지씩만 읽어 합친 뒤 다시 자름
+            query = f'''
+                SELECT * FROM (SELECT id, selected_option, opinion, NULL AS opinion_z FROM votes
+                    WHERE survey_id = ? AND opinion IS NOT NULL AND opinion != ''{filters} ORDER BY id {order} LIMIT ?)
+                UNION ALL
+                SELECT * FROM (SELECT id, selected_option, NULL, opinion_z FROM archive.votes a
+                    WHERE survey_id = ? AND opinion_z IS NOT NULL{filters}
+                        AND NOT EXISTS (SELECT 1 FROM votes h WHERE h.id = a.id)
+                    ORDER BY id {order} LIMIT ?)
+                ORDER BY id {order} LIMIT ?
+            '''
+            params = params * 2 + [limit]
+        async with db.execute(query, params) as cursor:
+            rows = [_opinion_from_row(r) for r in await cursor.fetchall()]
+    if after_id is not None:
+        rows.reverse()
+    return rows
+
+async def get_vote_tallies(survey_id: int) -> list:
+    """선택지 인덱스별 득표 수를 [(option_idx, custom_text, count)] 형태로 집계합니다."""
+    async with aiosqlite.connect(DB_FILE) as db:
+        if await _attach_if_archived(db, survey_id):
+            async with db.execute('SELECT tallies_json FROM archive.survey_results WHERE survey_id = ?', (survey_id,)) as cursor:
+                row = await cursor.fetchone()
+            if row:
+                return [tuple(t) for t in json.loads(row[0] or '[]')]
+        async with db.execute('''
+            SELECT option_idx, custom_text, COUNT(*) FROM vote_choices
+            WHERE survey_id = ? GROUP BY option_idx, custom_text
+        ''', (survey_id,)) as cursor:
+            return [tuple(row) for row in await cursor.fetchall()]
+
+async def count_votes(survey_id: int) -> int:
+    async with aiosqlite.connect(DB_FILE) as db:
+        if await _attach_if_archived(db, survey_id):
+            async with db.execute('SELECT total_votes FROM archive.survey_results WHERE survey_id = ?', (survey_id,)) as cursor:
+                row = await cursor.fetchone()
+            if row:
+                return row[0]
+        async with db.execute('SELECT COUNT(*) FROM votes WHERE survey_id = ?', (survey_id,)) as cursor:
+            return (await cursor.fetchone())[0]
+
+def invalidate_status_cache(survey_id: int = None):
+    """투표가 기록되면 해당 설문의 현황 스냅샷과 진행 중인 재계산을 버립니다. survey_id가 없으면 모든 설문이 대상입니다."""
+    if survey_id is None:
+        for survey_id in {k[0] for k in _status_cache} | {k[0] for k in _status_inflight} | set(_status_generation):
+            invalidate_status_cache(survey_id)
+        return
+    _status_generation[survey_id] = _status_generation.get(survey_id, 0) + 1
+    for key in [k for k in _status_cache if k[0] == survey_id]:
+        _status_cache.pop(key, None)
+    for key in [k for k in _status_inflight if k[0] == survey_id]:
+        _status_inflight.pop(key, None)
+
+async def _build_survey_status(survey_id: int, server_id: int) -> dict:
+    generation = _status_generation.get(survey_id, 0)
+    snapshot = {
+        'total_votes': await count_votes(survey_id),
+        'tallies': await get_vote_tallies(survey_id),
+        'opinions': await get_opinions_page(survey_id, server_id),
+        'opinion_total': await count_opinions(survey_id, server_id)
+    }
+    # 재계산 도중 새 투표가 들어왔다면 캐시에 남기지 않습니다.
+    if _status_generation.get(survey_id, 0) == generation:
+        _status_cache[(survey_id, server_id)] = (time.monotonic() + STATUS_CACHE_TTL, snapshot)
+    return snapshot
+
+async def get_survey_status(survey_id: int, server_id: int = 0) -> dict:
+    """득표 수, 총 참여 인원, 첫 페이지 의견을 담은 현황 스냅샷을 반환합니다.
+    몇 초간 캐시되며, 동시에 들어온 요청은 하나의 재계산 작업을 공유합니다(single-flight)."""
+    key = (survey_id, server_id)
+    entry = _status_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+
+    task = _status_inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_build_survey_status(survey_id, server_id))
+        _status_inflight[key] = task
+        task.add_done_callback(lambda t: _status_inflight.pop(key, None) if _status_inflight.get(key) is t else None)
+    # 한 요청이 취소되어도 공유 중인 재계산은 계속되도록 shield 처리
+    return await asyncio.shield(task)
 
 async def has_pending_suggestion(user_id: int) -> bool:
     async with aiosqlite.connect(DB_FILE) as db:
@@ -358,201 +989,647 @@ async def has_pending_suggestion(user_id: int) -> bool:
             row = await cursor.fetchone()
             return bool(row)
 
-async def suggest_topic(topic: str, options: list, allow_short_answer: bool, user_id: int, image_url: str = None):
+async def suggest_topic(topic: str, options: list, allow_short_answer: bool, user_id: int, image_url: str = None, allow_multiple: bool = False):
     async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute('''
-            INSERT INTO suggested_topics (topic, options, allow_short_answer, suggested_by, image_url)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (topic, json.dumps(options, ensure_ascii=False), int(allow_short_answer), user_id, image_url))
+        cursor = await db.execute('''
+            INSERT INTO suggested_topics (topic, options, allow_short_answer, suggested_by, image_url, allow_multiple)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (topic, _options_json(options), int(allow_short_answer), user_id, image_url, int(allow_multiple)))
         await db.commit()
+    _adjust_cached_count(('suggested_topics',), 1)
+    topic_index.add(('suggested', cursor.lastrowid), topic, options)
 
-async def pop_random_suggested_topic():
-    async with aiosqlite.connect(DB_FILE) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute('SELECT * FROM suggested_topics ORDER BY RANDOM() LIMIT 1') as cursor:
+async def _pick_random_suggested_id(db, prefer_older: bool = False):
+    """id 범위(MIN~MAX)에서 무작위 id를 골라 인덱스 탐색만으로 주제 하나를 선택합니다.
+
+    삭제로 비어 있는 id가 나오면 몇 번 다시 뽑고, 그래도 실패하면 남은 행 수 안에서 순번을 뽑아
+    OFFSET으로 찾습니다. (빈 id 다음 행을 쓰면 빈 구간 뒤의 제안이 더 자주 뽑히므로 쓰지 않음)
+    prefer_older가 참이면 오래된(작은 id) 제안일수록 뽑힐 확률이 높아집니다.
+    """
+    async with db.execute('SELECT MIN(id), MAX(id), COUNT(*) FROM suggested_topics') as cursor:
+        low, high, count = await cursor.fetchone()
+    if low is None:
+        return None
+
+    def draw(size: int) -> int:
+        u = random.random()
+        if prefer_older:
+            u *= u
+        return int(u * size)
+
+    for _ in range(RANDOM_POP_ATTEMPTS):
+        async with db.execute('SELECT id FROM suggested_topics WHERE id = ?', (low + draw(high - low + 1),)) as cursor:
             row = await cursor.fetchone()
             if row:
-                await db.execute('DELETE FROM suggested_topics WHERE id = ?', (row['id'],))
-                await db.commit()
-                topic_data = dict(row)
-                topic_data['options'] = json.loads(topic_data['options'])
-                topic_data['allow_short_answer'] = bool(topic_data['allow_short_answer'])
-                return topic_data
+                return row[0]
+
+    async with db.execute('SELECT id FROM suggested_topics ORDER BY id LIMIT 1 OFFSET ?', (draw(count),)) as cursor:
+        return (await cursor.fetchone())[0]
+
+async def pop_random_suggested_topic(prefer_older: bool = False) -> QueuedTopic:
+    async with aiosqlite.connect(DB_FILE) as db:
+        # 선택과 삭제 사이에 다른 작업이 끼어들지 않도록 하나의 쓰기 트랜잭션으로 처리
+        await db.execute('BEGIN IMMEDIATE')
+        topic_id = await _pick_random_suggested_id(db, prefer_older)
+        if topic_id is None:
+            await db.rollback()
+            return None
+        db.row_factory = row_factory(QueuedTopic)
+        async with db.execute(f'DELETE FROM suggested_topics WHERE id = ? RETURNING {QueuedTopic.COLUMNS}, NULL', (topic_id,)) as cursor:
+            topic = await cursor.fetchone()
+        await db.commit()
+        if not topic:
             return None
+        _adjust_cached_count(('suggested_topics',), -1)
+        topic_index.remove(('suggested', topic_id))
+        return topic
 
-async def get_past_surveys(limit=5):
+async def count_past_surveys() -> int:
+    key = ('past_surveys',)
+    cached = _get_cached_count(key)
+    if cached is not None:
+        return cached
     async with aiosqlite.connect(DB_FILE) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute('SELECT * FROM surveys WHERE is_active = 0 ORDER BY end_time DESC LIMIT ?', (limit,)) as cursor:
-            return await cursor.fetchall()
+        async with db.execute('SELECT COUNT(*) FROM surveys WHERE is_active = 0') as cursor:
+            row = await cursor.fetchone()
+    _set_cached_count(key, row[0])
+    return row[0]
+
+async def get_past_surveys_page(before_id: int = None, after_id: int = None, limit: int = 5) -> list:
+    """종료된 설문 목록을 id 내림차순 keyset 방식으로 한 페이지만 가져옵니다."""
+    query = f'SELECT {Survey.COLUMNS} FROM surveys WHERE is_active = 0'
+    params = []
+    if after_id is not None:
+        query += ' AND id > ? ORDER BY id ASC LIMIT ?'
+        params += [after_id, limit]
+    elif before_id is not None:
+        query += ' AND id < ? ORDER BY id DESC LIMIT ?'
+        params += [before_id, limit]
+    else:
+        query += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit)
+    async with aiosqlite.connect(DB_FILE) as db:
+        db.row_factory = row_factory(Survey)
+        async with db.execute(query, params) as cursor:
+            rows = await cursor.fetchall()
+    if after_id is not None:
+        rows.reverse()
+    return rows
 
 async def create_survey_snapshot(survey_id: int):
-    """현재 진행 중인 투표를 종료하지 않고 통계 보존용 비활성 복사본을 생성합니다."""
+    """현재 진행 중인 투표를 종료하지 않고, 지금 시점의 집계만 한 번의 INSERT로 survey_snapshots에 보관합니다.
+    생성된 스냅샷 ID를 반환합니다."""
     async with aiosqlite.connect(DB_FILE) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)) as cursor:
-            row = await cursor.fetchone()
-            if not row: return None
-            
         async with db.execute('''
-            INSERT INTO surveys (topic, options, allow_short_answer, image_url, start_time, end_time, is_active)
-            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, 0)
-        ''', (row['topic'], row['options'], row['allow_short_answer'], row['image_url'], row['start_time'])) as cursor:
-            new_id = cursor.lastrowid
-            
-        async with db.execute('SELECT * FROM votes WHERE survey_id = ?', (survey_id,)) as cursor:
-            votes = await cursor.fetchall()
-            
-        for v in votes:
-            await db.execute('''
-                INSERT INTO votes (survey_id, user_id, server_id, selected_option, opinion, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (new_id, v['user_id'], v['server_id'], v['selected_option'], v['opinion'], v['updated_at']))
-            
+            INSERT INTO survey_snapshots (survey_id, tallies_json, total_votes, opinion_count)
+            SELECT s.id,
+                (SELECT json_group_array(json_array(option_idx, custom_text, cnt)) FROM (
+                    SELECT option_idx, custom_text, COUNT(*) AS cnt FROM vote_choices
+                    WHERE survey_id = s.id GROUP BY option_idx, custom_text
+                )),
+                (SELECT COUNT(*) FROM votes WHERE survey_id = s.id),
+                (SELECT COUNT(*) FROM votes WHERE survey_id = s.id AND opinion IS NOT NULL AND opinion != '')
+            FROM surveys s WHERE s.id = ?
+            RETURNING id
+        ''', (survey_id,)) as cursor:
+            row = await cursor.fetchone()
         await db.commit()
-        return new_id
+        return row[0] if row else None
+
+def _snapshot_from_row(row) -> dict:
+    snapshot = dict(row)
+    snapshot['tallies'] = [tuple(t) for t in json.loads(snapshot.pop('tallies_json') or '[]')]
+    return snapshot
+
+async def get_survey_snapshot(snapshot_id: int):
+    async with aiosqlite.connect(DB_FILE) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute('SELECT * FROM survey_snapshots WHERE id = ?', (snapshot_id,)) as cursor:
+            row = await cursor.fetchone()
+            return _snapshot_from_row(row) if row else None
+
+async def get_survey_snapshots(survey_id: int = None, limit: int = 10):
+    """최근 스냅샷 목록을 반환합니다. survey_id가 주어지면 해당 설문의 스냅샷만 조회합니다."""
+    query = 'SELECT sn.*, s.topic FROM survey_snapshots sn LEFT JOIN surveys s ON s.id = sn.survey_id'
+    params = []
+    if survey_id is not None:
+        query += ' WHERE sn.survey_id = ?'
+        params.append(survey_id)
+    query += ' ORDER BY sn.id DESC LIMIT ?'
+    params.append(limit)
+    async with aiosqlite.connect(DB_FILE) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(query, params) as cursor:
+            return [_snapshot_from_row(r) for r in await cursor.fetchall()]
 
 async def delete_survey(survey_id: int):
-    """특정 설문과 연관된 모든 투표 데이터를 삭제합니다."""
+    """특정 설문과 연관된 모든 투표 데이터를 (보관 DB에 옮겨진 것까지) 삭제합니다."""
     async with aiosqlite.connect(DB_FILE) as db:
+        if await _attach_if_archived(db, survey_id):
+            # 본문 없는 색인은 지울 때 원래 본문이 필요하므로 압축을 풀어 넘김
+            async with db.execute('SELECT id, opinion_z FROM archive.votes WHERE survey_id = ? AND opinion_z IS NOT NULL', (survey_id,)) as cursor:
+                opinions = [(r[0], _unpack_opinion(r[1])) for r in await cursor.fetchall()]
+            await db.executemany("INSERT INTO archive.opinions_fts (opinions_fts, rowid, opinion) VALUES ('delete', ?, ?)", opinions)
+            await db.execute('DELETE FROM archive.vote_choices WHERE survey_id = ?', (survey_id,))
+            await db.execute('DELETE FROM archive.votes WHERE survey_id = ?', (survey_id,))
+            await db.execute('DELETE FROM archive.survey_results WHERE survey_id = ?', (survey_id,))
+        await db.execute('DELETE FROM vote_choices WHERE survey_id = ?', (survey_id,))
+        await db.execute('DELETE FROM survey_snapshots WHERE survey_id = ?', (survey_id,))
         await db.execute('DELETE FROM votes WHERE survey_id = ?', (survey_id,))
         await db.execute('DELETE FROM surveys WHERE id = ?', (survey_id,))
         await db.commit()
+    invalidate_count_cache()
+    invalidate_count_cache(survey_id)
+    invalidate_status_cache(survey_id)
+    topic_index.remove(('survey', survey_id))
+    survey_title_index.remove(survey_id)
+
+# 투표가 한 건도 없는 종료된 설문 (anti-join, 투표가 보관 DB로 옮겨진 설문은 제외)
+_EMPTY_SURVEYS_QUERY = '''
+    SELECT s.id FROM surveys s
+    WHERE s.is_active = 0 AND s.archived = 0 AND NOT EXISTS (SELECT 1 FROM votes v WHERE v.survey_id = s.id)
+'''
+
+async def purge_empty_surveys(dry_run: bool = False):
+    """투표가 0건인 과거 설문과 그 스냅샷을 한 트랜잭션으로 삭제합니다.
+    (삭제된 설문 ID 목록, 삭제된 스냅샷 ID 목록)을 반환하며, dry_run이면 대상만 조회합니다."""
+    async with aiosqlite.connect(DB_FILE) as db:
+        if dry_run:
+            async with db.execute(_EMPTY_SURVEYS_QUERY) as cursor:
+                survey_ids = [r[0] for r in await cursor.fetchall()]
+            async with db.execute(f'SELECT id FROM survey_snapshots WHERE survey_id IN ({_EMPTY_SURVEYS_QUERY})') as cursor:
+                snapshot_ids = [r[0] for r in await cursor.fetchall()]
+            return survey_ids, snapshot_ids
+
+        await db.execute('BEGIN IMMEDIATE')
+        async with db.execute(f'DELETE FROM survey_snapshots WHERE survey_id IN ({_EMPTY_SURVEYS_QUERY}) RETURNING id') as cursor:
+            snapshot_ids = [r[0] for r in await cursor.fetchall()]
+        async with db.execute(f'DELETE FROM surveys WHERE id IN ({_EMPTY_SURVEYS_QUERY}) RETURNING id') as cursor:
+            survey_ids = [r[0] for r in await cursor.fetchall()]
+        await db.commit()
+    invalidate_count_cache()
+    for survey_id in survey_ids:
+        topic_index.remove(('survey', survey_id))
+        survey_title_index.remove(survey_id)
+    return survey_ids, snapshot_ids
+
+async def archive_closed_survey_batch(batch_size: int = ARCHIVE_BATCH_SIZE):
+    """종료된 설문 하나의 투표를 최대 batch_size개만 보관 DB로 옮깁니다.
+    첫 배치에서 최종 집계를 survey_results에 남기고 archived로 표시하므로, 옮기는 도중에도 조회 결과는 같습니다.
+    (설문 ID, 옮긴 투표 수, 완료 여부)를 반환하며 옮길 설문이 없으면 None을 반환합니다."""
+    # WAL에서는 붙인 DB끼리 한 번에 커밋되지 않고 main부터 차례로 커밋되므로, 보관 DB를 main으로 열고
+    # 현재 DB를 hot으로 붙임. 중간에 멈춰도 복사본이 먼저 남아 투표가 사라지지 않고 중복만 생기며,
+    # 중복은 읽는 쪽이 걸러 내고 다음 실행이 같은 배치를 다시 옮기며 정리함
+    async with aiosqlite.connect(ARCHIVE_DB_FILE) as db:
+        await db.execute('ATTACH DATABASE ? AS hot', (DB_FILE,))
+        await db.execute('BEGIN IMMEDIATE')
+        async with db.execute('''
+            SELECT s.id FROM hot.surveys s
+            WHERE s.is_active = 0 AND EXISTS (SELECT 1 FROM hot.votes v WHERE v.survey_id = s.id)
+            ORDER BY s.id LIMIT 1
+        ''') as cursor:
+            row = await cursor.fetchone()
+        if not row:
+            await db.rollback()
+            return None
+        survey_id = row[0]
+
+        await db.execute('''
+            INSERT OR REPLACE INTO survey_results (survey_id, total_votes, opinion_count, tallies_json)
+            SELECT s.id,
+                (SELECT COUNT(*) FROM hot.votes WHERE survey_id = s.id),
+                (SELECT COUNT(*) FROM hot.votes WHERE survey_id = s.id AND opinion IS NOT NULL AND opinion != ''),
+                (SELECT json_group_array(json_array(option_idx, custom_text, cnt)) FROM (
+                    SELECT option_idx, custom_text, COUNT(*) AS cnt FROM hot.vote_choices
+                    WHERE survey_id = s.id GROUP BY option_idx, custom_text
+                ))
+            FROM hot.surveys s WHERE s.id = ? AND s.archived = 0
+        ''', (survey_id,))
+        await db.execute('UPDATE hot.surveys SET archived = 1 WHERE id = ?', (survey_id,))
+
+        async with db.execute('''
+            SELECT id, survey_id, user_id, server_id, selected_option, opinion, updated_at, is_daily_picked
+            FROM hot.votes WHERE survey_id = ? ORDER BY id LIMIT ?
+        ''', (survey_id, batch_size)) as cursor:
+            rows = await cursor.fetchall()
+        first_id, last_id = rows[0][0], rows[-1][0]
+
+        # 지난번에 복사만 되고 멈춘 배치라면 이전 복사본의 색인/선택지를 먼저 지워 다시 넣어도 중복되지 않게 함
+        async with db.execute('''
+            SELECT id, opinion_z FROM votes
+            WHERE survey_id = ? AND id BETWEEN ? AND ? AND opinion_z IS NOT NULL
+        ''', (survey_id, first_id, last_id)) as cursor:
+            stale = [(r[0], _unpack_opinion(r[1])) for r in await cursor.fetchall()]
+        await db.executemany("INSERT INTO opinions_fts (opinions_fts, rowid, opinion) VALUES ('delete', ?, ?)", stale)
+        await db.execute('''
+            DELETE FROM vote_choices WHERE survey_id = ? AND vote_id BETWEEN ? AND ?
+        ''', (survey_id, first_id, last_id))
+
+        await db.executemany('''
+            INSERT OR REPLACE INTO votes
+                (id, survey_id, user_id, server_id, selected_option, opinion_z, updated_at, is_daily_picked)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(*r[:5], _pack_opinion(r[5]), r[6], r[7]) for r in rows])
+        await db.executemany(
+            'INSERT INTO opinions_fts (rowid, opinion) VALUES (?, ?)',
+            [(r[0], r[5]) for r in rows if r[5]]
+        )
+        await db.execute('''
+            INSERT INTO vote_choices (vote_id, survey_id, option_idx, custom_text)
+            SELECT c.vote_id, c.survey_id, c.option_idx, c.custom_text
+            FROM hot.vote_choices c JOIN hot.votes v ON v.id = c.vote_id
+            WHERE v.survey_id = ? AND v.id <= ?
+        ''', (survey_id, last_id))
+
+        # 현재 DB의 의견 색인은 votes 삭제 트리거가 함께 정리
+        await db.execute('''
+            DELETE FROM hot.vote_choices
+            WHERE vote_id IN (SELECT id FROM hot.votes WHERE survey_id = ? AND id <= ?)
+        ''', (survey_id, last_id))
+        await db.execute('DELETE FROM hot.votes WHERE survey_id = ? AND id <= ?', (survey_id, last_id))
+        async with db.execute('SELECT EXISTS (SELECT 1 FROM hot.votes WHERE survey_id = ?)', (survey_id,)) as cursor:
+            remaining = (await cursor.fetchone())[0]
+        await db.commit()
+    return survey_id, len(rows), not remaining
+
+def _fts_query(keyword: str) -> str:
+    """사용자 입력을 FTS5 문법 오류 없이 '모든 단어를 포함(접두 일치)'하는 쿼리로 바꿉니다."""
+    return ' '.join(f'"{term}"*' for term in re.findall(r'\w+', keyword))
+
+def _make_snippet(text: str, keyword: str, width: int = 12) -> str:
+    """본문이 없는 보관 색인은 snippet()을 쓸 수 없으므로, 풀어낸 의견에서 같은 모양의 발췌문을 만듭니다."""
+    terms = [re.escape(t) for t in re.findall(r'\w+', keyword)]
+    pattern = re.compile(r'\b(?:' + '|'.join(terms) + r')\w*', re.IGNORECASE)
+    words = text.split()
+    first = next((i for i, w in enumerate(words) if pattern.search(w)), 0)
+    start = max(0, min(first - width // 2, len(words) - width))
+    excerpt = ' '.join(words[start:start + width])
+    excerpt = pattern.sub(lambda m: f'**{m.group(0)}**', excerpt)
+    return ('…' if start > 0 else '') + excerpt + ('…' if start + width < len(words) else '')
+
+async def search_surveys(keyword: str, limit: int = 10) -> list:
+    """종료된 설문을 주제 제목과 익명 의견 본문에서 검색합니다.
+    제목 일치를 먼저, 그 다음 의견만 일치한 설문을 각각 관련도(bm25) 순으로 반환합니다."""
+    query = _fts_query(keyword)
+    if not query:
+        return []
+
+    results = {}
+    async with aiosqlite.connect(DB_FILE) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute('''
+            SELECT s.id, s.end_time, highlight(surveys_fts, 0, '**', '**') AS topic, surveys_fts.rank AS score
+            FROM surveys_fts JOIN surveys s ON s.id = surveys_fts.rowid
+            WHERE surveys_fts MATCH ? AND s.is_active = 0
+            ORDER BY surveys_fts.rank
+            LIMIT ?
+        ''', (query, limit)) as cursor:
+            async for row in cursor:
+                results[row['id']] = {
+                    'id': row['id'], 'topic': row['topic'], 'end_time': row['end_time'],
+                    'topic_match': True, 'score': row['score'], 'snippet': None, 'opinion_hits': 0
+                }
+
+        async with db.execute('''
+            SELECT v.survey_id, s.topic, s.end_time, opinions_fts.rank AS score,
+                   snippet(opinions_fts, 0, '**', '**', '…', 12) AS snippet
+            FROM opinions_fts
+            JOIN votes v ON v.id = opinions_fts.rowid
+            JOIN surveys s ON s.id = v.survey_id
+            WHERE opinions_fts MATCH ? AND s.is_active = 0
+            ORDER BY opinions_fts.rank
+            LIMIT ?
+        ''', (query, OPINION_SEARCH_LIMIT)) as cursor:
+            opinion_hits = [dict(r) for r in await cursor.fetchall()]
+
+        # 보관 DB로 옮겨진 의견은 압축을 풀어 발췌문을 직접 만듦
+        await _attach_archive(db)
+        async with db.execute('''
+            SELECT v.survey_id, s.topic, s.end_time, f.rank AS score, v.opinion_z
+            FROM archive.opinions_fts f
+            JOIN archive.votes v ON v.id = f.rowid
+            JOIN surveys s ON s.id = v.survey_id
+            WHERE f.opinions_fts MATCH ? AND NOT EXISTS (SELECT 1 FROM votes h WHERE h.id = v.id)
+            ORDER BY f.rank
+            LIMIT ?
+        ''', (query, OPINION_SEARCH_LIMIT)) as cursor:
+            async for row in cursor:
+                hit = dict(row)
+                hit['snippet'] = _make_snippet(_unpack_opinion(hit.pop('opinion_z')), keyword)
+                opinion_hits.append(hit)
+
+    opinion_hits.sort(key=lambda h: h['score'])
+    for hit in opinion_hits[:OPINION_SEARCH_LIMIT]:
+        result = results.get(hit['survey_id'])
+        if result is None:
+            result = results[hit['survey_id']] = {
+                'id': hit['survey_id'], 'topic': hit['topic'], 'end_time': hit['end_time'],
+                'topic_match': False, 'score': hit['score'], 'snippet': None, 'opinion_hits': 0
+            }
+        # 관련도 순으로 읽으므로 설문별 첫 의견이 가장 잘 맞는 의견
+        if result['snippet'] is None:
+            result['snippet'] = hit['snippet']
+        result['opinion_hits'] += 1
+
+    ranked = sorted(results.values(), key=lambda r: (not r['topic_match'], r['score']))
+    return ranked[:limit]
+
+async def maintain_search_index(command: str = 'optimize'):
+    """검색 색인에 FTS5 유지보수 명령('optimize': 세그먼트 병합, 'rebuild': 원본 테이블에서 재구성)을 실행합니다.
+    보관 DB의 색인은 본문이 없으므로 재구성 시 압축된 의견을 풀어 다시 넣습니다."""
+    if command not in ('optimize', 'rebuild'):
+        raise ValueError(f"Unknown search index command: {command}")
+    async with aiosqlite.connect(DB_FILE) as db:
+        await db.execute(f"INSERT INTO surveys_fts (surveys_fts) VALUES ('{command}')")
+        await db.execute(f"INSERT INTO opinions_fts (opinions_fts) VALUES ('{command}')")
+        await _attach_archive(db)
+        if command == 'optimize':
+            await db.execute("INSERT INTO archive.opinions_fts (opinions_fts) VALUES ('optimize')")
+        else:
+            await db.execute("INSERT INTO archive.opinions_fts (opinions_fts) VALUES ('delete-all')")
+            async with db.execute('SELECT id, opinion_z FROM archive.votes WHERE opinion_z IS NOT NULL') as cursor:
+                while rows := await cursor.fetchmany(ARCHIVE_BATCH_SIZE):
+                    await db.executemany(
+                        'INSERT INTO archive.opinions_fts (rowid, opinion) VALUES (?, ?)',
+                        [(r[0], _unpack_opinion(r[1])) for r in rows]
+                    )
+        await db.commit()
+
+# --- Backup / Maintenance Functions ---
+async def backup_database(dest_dir: str) -> int:
+    """현재 DB와 보관 DB를 dest_dir 폴더에 온라인 백업하고 백업 파일들의 전체 크기를 반환합니다.
+    backup API가 BACKUP_PAGES_PER_STEP 페이지마다 잠금을 놓아 주므로 백업 중에도 투표 기록이 오래 막히지 않습니다."""
+    os.makedirs(dest_dir, exist_ok=True)
+    total_bytes = 0
+    for db_file in (DB_FILE, ARCHIVE_DB_FILE):
+        dest = os.path.join(dest_dir, os.path.basename(db_file))
+        # 끝까지 복사된 파일만 백업 이름으로 바꿔, 중간에 멈춘 백업이 복원 대상이 되지 않게 함
+        partial = dest + '.partial'
+        async with aiosqlite.connect(db_file) as src, aiosqlite.connect(partial) as dst:
+            await src.backup(dst, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP)
+        os.replace(partial, dest)
+        total_bytes += os.path.getsize(dest)
+    return total_bytes
+
+async def restore_database(src_dir: str):
+    """백업 폴더의 DB 파일로 현재 DB와 보관 DB를 덮어쓴 뒤 스키마, 캐시, 메모리 인덱스를 다시 맞춥니다.
+    복원은 한 단계로 복사해 중간 상태가 보이지 않게 하며, 두 파일 중 하나라도 없거나 손상된 백업이면
+    아무것도 바꾸지 않고 ValueError를 냅니다. (한쪽만 덮어쓰면 현재 DB와 보관 DB의 투표가 어긋남)"""
+    sources = []
+    for db_file in (DB_FILE, ARCHIVE_DB_FILE):
+        source = os.path.join(src_dir, os.path.basename(db_file))
+        if not os.path.exists(source):
+            raise ValueError(f"{src_dir}에 {os.path.basename(db_file)} 파일이 없어 불완전한 백업입니다.")
+        async with aiosqlite.connect(source) as src:
+            async with src.execute('PRAGMA quick_check') as cursor:
+                result = (await cursor.fetchone())[0]
+        if result != 'ok':
+            raise ValueError(f"{source} 무결성 검사 실패: {result}")
+        sources.append((source, db_file))
+
+    for source, db_file in sources:
+        async with aiosqlite.connect(source) as src, aiosqlite.connect(db_file) as dst:
+            await src.backup(dst, pages=-1)
+    _count_cache.clear()
+    invalidate_status_cache()
+    await init_db()
+
+async def checkpoint_databases() -> dict:
+    """종료 직전에 두 DB의 WAL 내용을 본 파일에 반영하고 WAL 파일을 비웁니다.
+    DB 파일 이름별로 다른 연결이 읽고 있어 끝까지 반영하지 못했으면 True를 담아 반환합니다."""
+    busy = {}
+    for db_file in (DB_FILE, ARCHIVE_DB_FILE):
+        if not os.path.exists(db_file):
+            continue
+        async with aiosqlite.connect(db_file) as db:
+            # 결과: (막힘 여부, WAL 프레임 수, 반영한 프레임 수)
+            async with db.execute('PRAGMA wal_checkpoint(TRUNCATE)') as cursor:
+                busy[os.path.basename(db_file)] = bool((await cursor.fetchone())[0])
+    return busy
+
+async def run_db_maintenance() -> dict:
+    """두 DB에 ANALYZE, WAL 체크포인트를 실행하고 빈 페이지가 많으면 VACUUM 합니다.
+    DB 파일 이름별로 {'pages', 'free_pages', 'vacuumed'}를 반환합니다."""
+    report = {}
+    for db_file in (DB_FILE, ARCHIVE_DB_FILE):
+        async with aiosqlite.connect(db_file) as db:
+            # PRAGMA optimize는 같은 연결이 사용한 테이블만 살피므로, 매번 새로 여는 연결에서는
+            # analysis_limit로 비용을 제한한 ANALYZE를 직접 실행
+            await db.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+            await db.execute('ANALYZE')
+            await db.commit()
+            # 그동안 쌓인 WAL 내용을 본 파일에 반영하고 WAL 파일을 비움
+            await db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            async with db.execute('PRAGMA page_count') as cursor:
+                page_count = (await cursor.fetchone())[0]
+            async with db.execute('PRAGMA freelist_count') as cursor:
+                free_pages = (await cursor.fetchone())[0]
+            vacuumed = page_count > 0 and free_pages / page_count >= VACUUM_FREE_RATIO
+            if vacuumed:
+                await db.execute('VACUUM')
+        report[os.path.basename(db_file)] = {'pages': page_count, 'free_pages': free_pages, 'vacuumed': vacuumed}
+    return report
 
 # --- Bot Admin Functions ---
 async def add_bot_admin(user_id: int):
     async with aiosqlite.connect(DB_FILE) as db:
         await db.execute('INSERT OR IGNORE INTO bot_admins (user_id) VALUES (?)', (user_id,))
         await db.commit()
+    _bot_admins.add(user_id)
 
 async def remove_bot_admin(user_id: int):
     async with aiosqlite.connect(DB_FILE) as db:
         await db.execute('DELETE FROM bot_admins WHERE user_id = ?', (user_id,))
         await db.commit()
+    _bot_admins.discard(user_id)
 
 async def is_bot_admin(user_id: int, master_id: int) -> bool:
     if user_id == master_id:
         return True
-    async with aiosqlite.connect(DB_FILE) as db:
-        async with db.execute('SELECT 1 FROM bot_admins WHERE user_id = ?', (user_id,)) as cursor:
-            row = await cursor.fetchone()
-            return bool(row)
+    await _ensure_settings_loaded()
+    return user_id in _bot_admins
 
 async def get_all_bot_admins():
+    await _ensure_settings_loaded()
+    return [str(user_id) for user_id in sorted(_bot_admins)]
+
+# 건의 목록에는 position 컬럼이 없으므로 NULL을 붙여 QueuedTopic과 같은 모양으로 읽음
+_SUGGESTED_COLUMNS = f'{QueuedTopic.COLUMNS}, NULL'
+_QUEUED_COLUMNS = f'{QueuedTopic.COLUMNS}, position'
+
+async def count_suggested_topics() -> int:
+    key = ('suggested_topics',)
+    cached = _get_cached_count(key)
+    if cached is not None:
+        return cached
     async with aiosqlite.connect(DB_FILE) as db:
-        async with db.execute('SELECT user_id FROM bot_admins') as cursor:
-            rows = await cursor.fetchall()
-            return [str(row[0]) for row in rows]
+        async with db.execute('SELECT COUNT(*) FROM suggested_topics') as cursor:
+            count = (await cursor.fetchone())[0]
+    _set_cached_count(key, count)
+    return count
 
-async def get_all_suggested_topics():
+async def get_suggested_topic_near(after_id: int = None, before_id: int = None) -> QueuedTopic:
+    """id 순서 기준으로 after_id 바로 다음(또는 before_id 바로 이전) 주제 하나만 가져옵니다.
+    둘 다 없으면 가장 첫 주제를 반환합니다."""
+    if before_id is not None:
+        query, params = f'SELECT {_SUGGESTED_COLUMNS} FROM suggested_topics WHERE id < ? ORDER BY id DESC LIMIT 1', (before_id,)
+    else:
+        query, params = f'SELECT {_SUGGESTED_COLUMNS} FROM suggested_topics WHERE id > ? ORDER BY id ASC LIMIT 1', (after_id if after_id is not None else -1,)
     async with aiosqlite.connect(DB_FILE) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute('SELECT * FROM suggested_topics ORDER BY id ASC') as cursor:
-            rows = await cursor.fetchall()
-            topics = []
-            for row in rows:
-                t = dict(row)
-                t['options'] = json.loads(t['options'])
-                t['allow_short_answer'] = bool(t['allow_short_answer'])
-                topics.append(t)
-            return topics
+        db.row_factory = row_factory(QueuedTopic)
+        async with db.execute(query, params) as cursor:
+            return await cursor.fetchone()
 
-async def update_suggested_topic(topic_id: int, topic: str, options: list, allow_short_answer: bool, image_url: str = None):
+async def update_suggested_topic(topic_id: int, topic: str, options: list, allow_short_answer: bool, image_url: str = None, allow_multiple: bool = False):
     async with aiosqlite.connect(DB_FILE) as db:
         await db.execute('''
             UPDATE suggested_topics 
-            SET topic = ?, options = ?, allow_short_answer = ?, image_url = ?
+            SET topic = ?, options = ?, allow_short_answer = ?, image_url = ?, allow_multiple = ?
             WHERE id = ?
-        ''', (topic, json.dumps(options, ensure_ascii=False), int(allow_short_answer), image_url, topic_id))
+        ''', (topic, _options_json(options), int(allow_short_answer), image_url, int(allow_multiple), topic_id))
         await db.commit()
+    topic_index.add(('suggested', topic_id), topic, options)
 
 async def delete_suggested_topic(topic_id: int):
     async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute('DELETE FROM suggested_topics WHERE id = ?', (topic_id,))
+        cursor = await db.execute('DELETE FROM suggested_topics WHERE id = ?', (topic_id,))
         await db.commit()
+    _adjust_cached_count(('suggested_topics',), -cursor.rowcount)
+    topic_index.remove(('suggested', topic_id))
 
 # --- Topic Queue Functions ---
 
 async def add_to_queue(topic: dict):
+    """주제 dict(AI 생성 결과, QueuedTopic.to_topic_data() 등)를 대기열 맨 뒤에 넣습니다."""
+    options_json = _options_json(topic.get('options'))
     async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute('''
-            INSERT INTO topic_queue (topic, options, allow_short_answer, suggested_by, image_url)
-            VALUES (?, ?, ?, ?, ?)
+        cursor = await db.execute('''
+            INSERT INTO topic_queue (topic, options, allow_short_answer, suggested_by, image_url, allow_multiple, position)
+            VALUES (?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(position), 0) + ? FROM topic_queue))
         ''', (
-            topic.get('topic'), 
-            json.dumps(topic.get('options', []), ensure_ascii=False) if isinstance(topic.get('options'), list) else topic.get('options', '[]'), 
+            topic.get('topic'),
+            options_json,
             int(topic.get('allow_short_answer', 0)), 
             topic.get('suggested_by', 0), 
-            topic.get('image_url')
+            topic.get('image_url'),
+            int(topic.get('allow_multiple', 0)),
+            QUEUE_POSITION_GAP
         ))
         await db.commit()
+    _adjust_cached_count(('topic_queue',), 1)
+    topic_index.add(('queue', cursor.lastrowid), topic.get('topic'), topic.get('options'))
 
-async def get_next_queued_topic():
+async def get_next_queued_topic() -> QueuedTopic:
     async with aiosqlite.connect(DB_FILE) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute('SELECT * FROM topic_queue ORDER BY id ASC LIMIT 1') as cursor:
-            row = await cursor.fetchone()
-            if row:
-                topic_data = dict(row)
-                topic_data['options'] = json.loads(topic_data['options'])
-                topic_data['allow_short_answer'] = bool(topic_data['allow_short_answer'])
-                # 가져오면 큐에서 삭제
-                await db.execute('DELETE FROM topic_queue WHERE id = ?', (row['id'],))
-                await db.commit()
-                return topic_data
-        return None
+        db.row_factory = row_factory(QueuedTopic)
+        # 가장 앞 순서의 주제를 한 문장으로 꺼내면서 큐에서 삭제
+        async with db.execute(f'''
+            DELETE FROM topic_queue
+            WHERE id = (SELECT id FROM topic_queue ORDER BY position ASC, id ASC LIMIT 1)
+            RETURNING {_QUEUED_COLUMNS}
+        ''') as cursor:
+            topic = await cursor.fetchone()
+        await db.commit()
+        if topic:
+            _adjust_cached_count(('topic_queue',), -1)
+            topic_index.remove(('queue', topic.id))
+        return topic
 
-async def get_all_queued_topics():
+async def count_queued_topics() -> int:
+    key = ('topic_queue',)
+    cached = _get_cached_count(key)
+    if cached is not None:
+        return cached
     async with aiosqlite.connect(DB_FILE) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute('SELECT * FROM topic_queue ORDER BY id ASC') as cursor:
-            rows = await cursor.fetchall()
-            topics = []
-            for row in rows:
-                t = dict(row)
-                t['options'] = json.loads(t['options'])
-                t['allow_short_answer'] = bool(t['allow_short_answer'])
-                topics.append(t)
-            return topics
+        async with db.execute('SELECT COUNT(*) FROM topic_queue') as cursor:
+            count = (await cursor.fetchone())[0]
+    _set_cached_count(key, count)
+    return count
+
+async def get_queued_topic_near(after: tuple = None, before: tuple = None) -> QueuedTopic:
+    """(position, id) 순서 기준으로 after 바로 다음(또는 before 바로 이전) 대기열 주제 하나만 가져옵니다.
+    둘 다 없으면 가장 앞 순서의 주제를 반환합니다."""
+    if before is not None:
+        query, params = f'SELECT {_QUEUED_COLUMNS} FROM topic_queue WHERE (position, id) < (?, ?) ORDER BY position DESC, id DESC LIMIT 1', tuple(before)
+    elif after is not None:
+        query, params = f'SELECT {_QUEUED_COLUMNS} FROM topic_queue WHERE (position, id) > (?, ?) ORDER BY position ASC, id ASC LIMIT 1', tuple(after)
+    else:
+        query, params = f'SELECT {_QUEUED_COLUMNS} FROM topic_queue ORDER BY position ASC, id ASC LIMIT 1', ()
+    async with aiosqlite.connect(DB_FILE) as db:
+        db.row_factory = row_factory(QueuedTopic)
+        async with db.execute(query, params) as cursor:
+            return await cursor.fetchone()
 
-async def update_queued_topic(topic_id: int, topic: str, options: list, allow_short_answer: bool, image_url: str = None):
+async def update_queued_topic(topic_id: int, topic: str, options: list, allow_short_answer: bool, image_url: str = None, allow_multiple: bool = False):
     async with aiosqlite.connect(DB_FILE) as db:
         await db.execute('''
             UPDATE topic_queue 
-            SET topic=?, options=?, allow_short_answer=?, image_url=?
+            SET topic=?, options=?, allow_short_answer=?, image_url=?, allow_multiple=?
             WHERE id=?
-        ''', (topic, json.dumps(options, ensure_ascii=False), int(allow_short_answer), image_url, topic_id))
+        ''', (topic, _options_json(options), int(allow_short_answer), image_url, int(allow_multiple), topic_id))
         await db.commit()
+    topic_index.add(('queue', topic_id), topic, options)
 
 async def delete_queued_topic(topic_id: int):
     async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute('DELETE FROM topic_queue WHERE id = ?', (topic_id,))
+        cursor = await db.execute('DELETE FROM topic_queue WHERE id = ?', (topic_id,))
         await db.commit()
+    _adjust_cached_count(('topic_queue',), -cursor.rowcount)
+    topic_index.remove(('queue', topic_id))
 
-async def swap_queue_items(id1: int, id2: int):
+async def _renumber_queue_positions(db):
+    await db.execute('''
+        UPDATE topic_queue SET position = ranked.rn * ?
+        FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY position ASC, id ASC) AS rn FROM topic_queue) AS ranked
+        WHERE topic_queue.id = ranked.id
+    ''', (QUEUE_POSITION_GAP,))
+
+async def move_queue_item(topic_id: int, new_index: int):
+    """대기열 주제를 new_index(0부터 시작) 순서로 옮기고 새 position 값을 반환합니다.
+    앞뒤 주제의 position 중간값을 넣어 옮길 주제 한 행만 갱신하고, 간격이 없을 때만 전체 번호를 다시 매깁니다.
+    그 사이 대기열에서 빠진 주제라면 아무것도 바꾸지 않고 None을 반환합니다."""
+    new_index = max(0, new_index)
     async with aiosqlite.connect(DB_FILE) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute('SELECT * FROM topic_queue WHERE id IN (?, ?)', (id1, id2)) as cursor:
-            rows = await cursor.fetchall()
-            
-        if len(rows) == 2:
-            r1, r2 = rows[0], rows[1]
-            if r1['id'] == id2:
-                r1, r2 = r2, r1
-                
-            await db.execute('''
-                UPDATE topic_queue 
-                SET topic=?, options=?, allow_short_answer=?, suggested_by=?, image_url=?, created_at=?
-                WHERE id=?
-            ''', (r2['topic'], r2['options'], r2['allow_short_answer'], r2['suggested_by'], r2['image_url'], r2['created_at'], id1))
-            
-            await db.execute('''
-                UPDATE topic_queue 
-                SET topic=?, options=?, allow_short_answer=?, suggested_by=?, image_url=?, created_at=?
-                WHERE id=?
-            ''', (r1['topic'], r1['options'], r1['allow_short_answer'], r1['suggested_by'], r1['image_url'], r1['created_at'], id2))
-            
-            await db.commit()
+        await db.execute('BEGIN IMMEDIATE')
+        async with db.execute('SELECT 1 FROM topic_queue WHERE id = ?', (topic_id,)) as cursor:
+            if await cursor.fetchone() is None:
+                await db.rollback()
+                return None
+        async with db.execute('SELECT COUNT(*) FROM topic_queue WHERE id != ?', (topic_id,)) as cursor:
+            new_index = min(new_index, (await cursor.fetchone())[0])
+        # 다시 번호를 매기면 간격이 QUEUE_POSITION_GAP이 되므로 두 번째 시도에서는 반드시 자리가 정해짐
+        position = None
+        for _ in range(2):
+            # 옮길 주제를 제외했을 때 new_index 자리의 앞/뒤 이웃
+            if new_index == 0:
+                query, params = 'SELECT position FROM topic_queue WHERE id != ? ORDER BY position ASC, id ASC LIMIT 1', (topic_id,)
+            else:
+                query, params = 'SELECT position FROM topic_queue WHERE id != ? ORDER BY position ASC, id ASC LIMIT 2 OFFSET ?', (topic_id, new_index - 1)
+            async with db.execute(query, params) as cursor:
+                neighbors = [r[0] for r in await cursor.fetchall()]
+
+            if new_index == 0:
+                before, after = None, (neighbors[0] if neighbors else None)
+            else:
+                before = neighbors[0] if neighbors else None
+                after = neighbors[1] if len(neighbors) > 1 else None
+
+            if before is None and after is None:
+                position = QUEUE_POSITION_GAP
+            elif before is None:
+                position = after - QUEUE_POSITION_GAP
+            elif after is None:
+                position = before + QUEUE_POSITION_GAP
+            elif after - before >= 2:
+                position = (before + after) // 2
+            else:
+                await _renumber_queue_positions(db)
+                continue
+
+            await db.execute('UPDATE topic_queue SET position = ? WHERE id = ?', (position, topic_id))
+            break
+        await db.commit()
+        return position
 
 async def return_queue_to_suggested(topic_id: int):
     async with aiosqlite.connect(DB_FILE) as db:
@@ -561,21 +1638,24 @@ async def return_queue_to_suggested(topic_id: int):
             row = await cursor.fetchone()
         if row:
             # Add to suggested_topics
-            await db.execute('''
-                INSERT INTO suggested_topics (topic, options, allow_short_answer, suggested_by, image_url)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (row['topic'], row['options'], row['allow_short_answer'], row['suggested_by'], row['image_url']))
+            cursor = await db.execute('''
+                INSERT INTO suggested_topics (topic, options, allow_short_answer, allow_multiple, suggested_by, image_url)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (row['topic'], row['options'], row['allow_short_answer'], row['allow_multiple'], row['suggested_by'], row['image_url']))
             
             # Delete from queue
             await db.execute('DELETE FROM topic_queue WHERE id = ?', (topic_id,))
             await db.commit()
+            _adjust_cached_count(('suggested_topics',), 1)
+            _adjust_cached_count(('topic_queue',), -1)
+            topic_index.remove(('queue', topic_id))
+            topic_index.add(('suggested', cursor.lastrowid), row['topic'], parse_options(row['options']))
 
-async def get_recent_votes_for_opinion(survey_id: int, hours: int = 24):
+async def get_recent_votes_for_opinion(survey_id: int, hours: int = 24) -> list:
     async with aiosqlite.connect(DB_FILE) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute(f"SELECT id, selected_option, opinion FROM votes WHERE survey_id = ? AND opinion IS NOT NULL AND opinion != '' AND is_daily_picked = 0 AND updated_at >= datetime('now', '-{hours} hours')", (survey_id,)) as cursor:
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+        db.row_factory = row_factory(Vote)
+        async with db.execute(f"SELECT {Vote.COLUMNS} FROM votes WHERE survey_id = ? AND opinion IS NOT NULL AND opinion != '' AND is_daily_picked = 0 AND updated_at >= datetime('now', '-{hours} hours')", (survey_id,)) as cursor:
+            return await cursor.fetchall()
 
 async def mark_opinion_as_picked(vote_id: int):
     async with aiosqlite.connect(DB_FILE) as db:
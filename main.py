@@ -1,42 +1,137 @@
 import discord
 from discord.ext import commands
+import argparse
+import asyncio
+import hashlib
+import json
 import os
+import signal
+import sys
+import time
 from dotenv import load_dotenv
 import logging
-from database import init_db
+from database import checkpoint_databases, get_global_setting, init_db, set_global_setting
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
 logger = logging.getLogger('discord')
 
+parser = argparse.ArgumentParser(description="레전드 갈드컵 디스코드 봇")
+parser.add_argument('--force-sync', action='store_true', help="명령어 트리가 바뀌지 않았어도 슬래시 명령어를 다시 동기화합니다.")
+ARGS = parser.parse_args()
+
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
 if not TOKEN or TOKEN == "your_discord_bot_token_here":
     logger.error("Please set a valid DISCORD_TOKEN in the .env file.")
     exit(1)
 
+# 게이트웨이 샤드 수. 비워 두면 디스코드가 권장하는 수만큼 자동으로 나눕니다.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+
+def parse_shard_ids(value: str):
+    """'0-3' 같은 범위나 '0,2,4' 같은 목록(섞어 써도 됨)을 샤드 번호 리스트로 바꿉니다. 비어 있으면 None."""
+    if not value or not value.strip():
+        return None
+    shard_ids = set()
+    for part in value.split(','):
+        part = part.strip()
+        if '-' in part:
+            start, end = part.split('-', 1)
+            shard_ids.update(range(int(start), int(end) + 1))
+        elif part:
+            shard_ids.add(int(part))
+    return sorted(shard_ids)
+
+# 클러스터 모드: 여러 프로세스가 샤드를 나눠 맡고 같은 DB를 씁니다.
+# CLUSTER_ID를 정하면 리더 임대를 쥔 프로세스 하나만 설문 순환/일일 송출을 실행합니다.
+CLUSTER_ID = os.getenv("CLUSTER_ID") or None
+SHARD_IDS = parse_shard_ids(os.getenv("SHARD_IDS"))
+if SHARD_IDS is not None and SHARD_COUNT is None:
+    logger.error("SHARD_IDS requires SHARD_COUNT (the total shard count across all processes).")
+    exit(1)
+if SHARD_IDS is not None and SHARD_IDS[-1] >= SHARD_COUNT:
+    logger.error(f"SHARD_IDS {SHARD_IDS} is out of range for SHARD_COUNT={SHARD_COUNT}.")
+    exit(1)
+# stop_bot.sh/restart_bot.sh가 이 프로세스만 멈추도록 PID를 적어 두는 파일 (같은 호스트의 클러스터끼리 겹치지 않게 분리)
+PID_FILE = f"bot-{CLUSTER_ID}.pid" if CLUSTER_ID else "bot.pid"
+
+# 저메모리 모드: 서버 채널과 상호작용(슬래시 명령어/버튼)만 받고 멤버 목록과 메시지 캐시를 두지 않습니다.
+# 길드 메시지 본문을 받지 않으므로 ! 관리자 명령어는 봇과의 DM에서만 동작합니다.
+LOW_FOOTPRINT = os.getenv("LOW_FOOTPRINT", "").strip().lower() in ("1", "true", "yes", "on")
+
 # 인텐트 설정
-intents = discord.Intents.default()
-intents.message_content = True
-intents.guilds = True
-intents.members = True
+if LOW_FOOTPRINT:
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.dm_messages = True
+else:
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.guilds = True
+    intents.members = True
+
+def cache_options() -> dict:
+    """저메모리 모드에서 메시지 캐시, 멤버 캐시, 접속 시 멤버 목록 요청(chunking)을 끄는 Bot 인자를 반환합니다."""
+    if not LOW_FOOTPRINT:
+        return {}
+    return {
+        'max_messages': None,
+        'member_cache_flags': discord.MemberCacheFlags.none(),
+        'chunk_guilds_at_startup': False,
+    }
+
+def current_rss_bytes() -> int:
+    """현재 프로세스의 RSS(상주 메모리)를 바이트로 반환합니다. /proc이 없으면 최대 RSS로 대신합니다."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        # Linux는 KiB, macOS는 바이트 단위
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+# SIGTERM을 받은 뒤 진행 중인 송출/쓰기를 기다리는 최대 시간(초). stop_bot.sh는 이보다 길게 기다린 뒤 강제 종료합니다.
+SHUTDOWN_TIMEOUT = 20
+
+# 마지막으로 동기화한 명령어 트리의 해시를 저장하는 global_settings 키
+COMMAND_TREE_HASH_KEY = 'command_tree_hash'
+
+def command_tree_hash(tree: discord.app_commands.CommandTree, application_id: int) -> str:
+    """디스코드에 올라가는 형태로 직렬화한 명령어 트리의 SHA-256 해시를 반환합니다.
+    다른 애플리케이션(토큰)으로 바꿔 실행하면 다시 동기화되도록 애플리케이션 ID도 함께 넣습니다."""
+    payload = sorted(
+        (cmd.to_dict(tree) for cmd in tree.get_commands()),
+        key=lambda c: (c.get('type', 1), c['name'])
+    )
+    data = json.dumps({'application_id': application_id, 'commands': payload}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
 
-class LegendGaldCupBot(commands.Bot):
+class LegendGaldCupBot(commands.AutoShardedBot):
     def __init__(self):
-        super().__init__(command_prefix="!", intents=intents)
+        super().__init__(
+            command_prefix="!", intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS,
+            **cache_options()
+        )
+        self.cluster_id = CLUSTER_ID
+        self.shutdown_task = None
 
     async def setup_hook(self):
+        started = time.perf_counter()
         # 데이터베이스 초기화
         await init_db()
         
         # Cogs 로드
         cogs = [
+            'cogs.cluster',
             'cogs.general',
             'cogs.admin',
             'cogs.survey',
             'cogs.events',
             'cogs.master',
-            'cogs.botadmin'
+            'cogs.botadmin',
+            'cogs.maintenance'
         ]
         
         for cog in cogs:
@@ -46,16 +141,108 @@ class LegendGaldCupBot(commands.Bot):
             except Exception as e:
                 logger.error(f"Failed to load cog {cog}: {e}")
         
-        # 슬래시 명령어 동기화
+        await self.sync_commands_if_changed(force=ARGS.force_sync)
+        logger.info(f"Setup finished in {time.perf_counter() - started:.2f}s.")
+
+    def request_shutdown(self, reason: str) -> asyncio.Task:
+        """안전 종료를 시작하고 그 작업을 반환합니다. 시그널과 !업데이트가 겹쳐 여러 번 불려도 한 번만 실행됩니다."""
+        if self.shutdown_task is None:
+            self.shutdown_task = asyncio.create_task(self._graceful_shutdown(reason))
+        return self.shutdown_task
+
+    async def _graceful_shutdown(self, reason: str):
+        started = time.perf_counter()
+        logger.info(f"Graceful shutdown requested ({reason}), draining...")
+        # 1. 각 코그가 새 스케줄러 작업을 막고 진행 중인 송출/백업/파일 정리를 마무리 (게이트웨이와 HTTP는 아직 열려 있음)
+        drains = [cog.drain() for cog in self.cogs.values() if hasattr(cog, 'drain')]
+        try:
+            results = await asyncio.wait_for(asyncio.gather(*drains, return_exceptions=True), SHUTDOWN_TIMEOUT)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.warning(f"Error while draining: {result}")
+        except asyncio.TimeoutError:
+            logger.warning(f"Drain did not finish within {SHUTDOWN_TIMEOUT}s, closing anyway.")
+        # 2. 코그 언로드(루프 취소, 리더 임대 반납)와 게이트웨이/HTTP 종료
+        await self.close()
+        # 3. 마지막 쓰기까지 끝난 뒤 WAL을 본 DB 파일에 반영 (클러스터 모드에서 다른 프로세스가 읽고 있으면 일부만 반영됨)
+        try:
+            busy = await checkpoint_databases()
+            for name in (name for name, is_busy in busy.items() if is_busy):
+                logger.warning(f"WAL checkpoint of {name} was blocked by another connection.")
+        except Exception as e:
+            logger.warning(f"WAL checkpoint failed during shutdown: {e}")
+        logger.info(f"Shutdown complete in {time.perf_counter() - started:.1f}s.")
+
+    async def sync_commands_if_changed(self, force: bool = False) -> bool:
+        """슬래시 명령어 트리가 마지막 동기화 이후 바뀌었을 때만 디스코드에 올립니다. 동기화했으면 True를 반환합니다.
+        전역 동기화는 호출 제한이 빡빡하므로 시작할 때와 !업데이트의 코그 리로드 후에 이 함수를 거칩니다."""
+        tree_hash = command_tree_hash(self.tree, self.application_id)
+        if not force and await get_global_setting(COMMAND_TREE_HASH_KEY) == tree_hash:
+            logger.info("Slash command tree unchanged, skipped sync.")
+            return False
         await self.tree.sync()
-        logger.info("Slash commands synced successfully.")
+        await set_global_setting(COMMAND_TREE_HASH_KEY, tree_hash)
+        logger.info(f"Slash commands synced successfully{' (forced)' if force else ''}.")
+        return True
 
 bot = LegendGaldCupBot()
 
 @bot.event
 async def on_ready():
-    logger.info(f"Logged in as {bot.user} (ID: {bot.user.id})")
+    shard_scope = f"shards {bot.shard_ids}" if bot.shard_ids is not None else "all shards"
+    logger.info(f"Logged in as {bot.user} (ID: {bot.user.id}) with {bot.shard_count} shard(s), running {shard_scope}")
+    for shard_id, latency in bot.latencies:
+        logger.info(f"Shard {shard_id}: {len([g for g in bot.guilds if g.shard_id == shard_id])} guilds, latency {latency * 1000:.0f}ms")
+    cached_members = sum(len(g.members) for g in bot.guilds)
+    logger.info(
+        f"Memory: RSS {current_rss_bytes() / 1024 / 1024:.1f} MiB, {len(bot.guilds)} guilds, "
+        f"{cached_members} cached members, {len(bot.cached_messages)} cached messages"
+        + (" (low-footprint mode)" if LOW_FOOTPRINT else "")
+    )
     await bot.change_presence(activity=discord.Game(name="갈드컵 진행 중"))
 
+@bot.event
+async def on_shard_ready(shard_id: int):
+    logger.info(f"Shard {shard_id} is ready.")
+
+@bot.event
+async def on_shard_disconnect(shard_id: int):
+    logger.warning(f"Shard {shard_id} disconnected.")
+
+@bot.event
+async def on_shard_resumed(shard_id: int):
+    logger.info(f"Shard {shard_id} resumed.")
+
+async def run_bot():
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, bot.request_shutdown, sig.name)
+        except (NotImplementedError, RuntimeError):
+            # Windows 이벤트 루프는 시그널 핸들러를 지원하지 않음 (Ctrl+C는 KeyboardInterrupt로 바로 종료)
+            pass
+    with open(PID_FILE, 'w') as f:
+        f.write(str(os.getpid()))
+    try:
+        async with bot:
+            await bot.start(TOKEN)
+        # start()는 close() 직후 돌아오므로, 진행 중인 종료 절차(WAL 체크포인트)가 끝날 때까지 기다림
+        if bot.shutdown_task:
+            await bot.shutdown_task
+    finally:
+        remove_pid_file()
+
+def remove_pid_file():
+    """재기동으로 새 프로세스가 이미 덮어쓴 PID 파일은 지우지 않습니다."""
+    try:
+        with open(PID_FILE) as f:
+            if f.read().strip() == str(os.getpid()):
+                os.remove(PID_FILE)
+    except OSError:
+        pass
+
 if __name__ == "__main__":
-    bot.run(TOKEN)
+    try:
+        asyncio.run(run_bot())
+    except KeyboardInterrupt:
+        pass
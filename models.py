@@ -0,0 +1,136 @@
+import json
+from dataclasses import dataclass
+from typing import ClassVar, Optional
+
+
+@dataclass(frozen=True, slots=True)
+class Option:
+    """설문/주제의 선택지 하나. 예전 데이터의 문자열 선택지도 desc가 빈 Option으로 읽습니다."""
+    name: str
+    desc: str = ''
+
+    @classmethod
+    def parse(cls, raw) -> 'Option':
+        if isinstance(raw, Option):
+            return raw
+        if isinstance(raw, dict):
+            return cls(str(raw.get('name', '')), raw.get('desc') or '')
+        return cls(str(raw))
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'desc': self.desc}
+
+
+def parse_options(options) -> tuple:
+    """options 컬럼의 JSON 문자열이나 dict/문자열/Option 목록을 Option 튜플로 바꿉니다."""
+    if isinstance(options, str):
+        options = json.loads(options or '[]')
+    return tuple(Option.parse(opt) for opt in options or ())
+
+
+def option_dicts(options) -> list:
+    """JSON 저장이나 AI 프롬프트, 주제 빌더처럼 dict 목록을 받는 곳에 넘길 형태로 바꿉니다."""
+    return [opt.to_dict() for opt in parse_options(options)]
+
+
+def row_factory(model):
+    """aiosqlite 연결의 row_factory로 쓰는 함수를 만듭니다. 커서가 준 튜플을 바로 model.from_row에 넘깁니다."""
+    from_row = model.from_row
+
+    def factory(cursor, row):
+        return from_row(row)
+    return factory
+
+
+@dataclass(frozen=True, slots=True)
+class Survey:
+    # SELECT 시 이 순서대로 컬럼을 나열합니다 (ALTER로 추가된 컬럼 때문에 SELECT * 순서는 DB마다 다름)
+    COLUMNS: ClassVar[str] = 'id, topic, options, allow_multiple, allow_short_answer, image_url, is_active, start_time, end_time, archived'
+
+    id: int
+    topic: str
+    options: tuple
+    allow_multiple: bool
+    allow_short_answer: bool
+    image_url: Optional[str]
+    is_active: bool
+    start_time: Optional[str]
+    end_time: Optional[str]
+    archived: bool = False
+
+    @classmethod
+    def from_row(cls, row) -> 'Survey':
+        id, topic, options, allow_multiple, allow_short_answer, image_url, is_active, start_time, end_time, archived = row
+        return cls(
+            id, topic, parse_options(options), bool(allow_multiple), bool(allow_short_answer),
+            image_url, bool(is_active), start_time, end_time, bool(archived)
+        )
+
+    @property
+    def option_names(self) -> list:
+        return [opt.name for opt in self.options]
+
+    def to_topic_data(self) -> dict:
+        """공지 송출처럼 주제 dict를 받는 흐름에 넘길 형태로 바꿉니다."""
+        return {
+            'id': self.id,
+            'topic': self.topic,
+            'options': option_dicts(self.options),
+            'allow_short_answer': self.allow_short_answer,
+            'allow_multiple': self.allow_multiple,
+            'image_url': self.image_url,
+            'start_time': self.start_time,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class Vote:
+    COLUMNS: ClassVar[str] = 'id, survey_id, user_id, server_id, selected_option, opinion, updated_at, is_daily_picked'
+
+    id: int
+    survey_id: int
+    user_id: int
+    server_id: int
+    selected_option: str
+    opinion: Optional[str]
+    updated_at: Optional[str]
+    is_daily_picked: int = 0
+
+    @classmethod
+    def from_row(cls, row) -> 'Vote':
+        return cls(*row)
+
+
+@dataclass(frozen=True, slots=True)
+class QueuedTopic:
+    """건의 목록(suggested_topics)과 대기열(topic_queue)의 주제. 건의 목록의 주제는 position이 None입니다."""
+    COLUMNS: ClassVar[str] = 'id, topic, options, allow_multiple, allow_short_answer, suggested_by, image_url, created_at'
+
+    id: int
+    topic: str
+    options: tuple
+    allow_multiple: bool
+    allow_short_answer: bool
+    suggested_by: int
+    image_url: Optional[str]
+    created_at: Optional[str]
+    position: Optional[int] = None
+
+    @classmethod
+    def from_row(cls, row) -> 'QueuedTopic':
+        id, topic, options, allow_multiple, allow_short_answer, suggested_by, image_url, created_at, position = row
+        return cls(
+            id, topic, parse_options(options), bool(allow_multiple), bool(allow_short_answer),
+            suggested_by, image_url, created_at, position
+        )
+
+    def to_topic_data(self) -> dict:
+        """add_to_queue나 강제 송출처럼 주제 dict를 받는 흐름에 넘길 형태로 바꿉니다."""
+        return {
+            'topic': self.topic,
+            'options': option_dicts(self.options),
+            'allow_short_answer': self.allow_short_answer,
+            'allow_multiple': self.allow_multiple,
+            'suggested_by': self.suggested_by,
+            'image_url': self.image_url,
+        }
@@ -1,12 +1,16 @@
 #!/bin/bash
 # restart_bot.sh - Script to quickly restart the Legend GaldCup Bot
+# 추가 인자(예: ./restart_bot.sh --force-sync)는 main.py로 그대로 넘깁니다.
+# 클러스터 모드에서는 CLUSTER_ID가 같은 프로세스만 다시 띄우며, 환경 변수(CLUSTER_ID, SHARD_IDS)는 새 프로세스에 그대로 이어집니다.
+
+LOG_FILE="bot${CLUSTER_ID:+-$CLUSTER_ID}.log"
 
 echo "Restarting Legend GaldCup Bot..."
 
 # 1. Stop the bot securely
 ./stop_bot.sh
 
-# 2. Wait a moment to ensure ports and locks are freed
+# 2. stop_bot.sh waits until the old process has drained and exited; pause briefly for locks to be freed
 sleep 2
 
 # 3. Start the bot again without installing dependencies (assuming they are already installed)
@@ -20,9 +24,9 @@ echo "Checking and installing any new dependencies..."
 pip install -r requirements.txt
 
 echo "Starting the bot in the background..."
-nohup python3 main.py > bot.log 2>&1 &
+nohup python3 main.py "$@" > "$LOG_FILE" 2>&1 &
 echo "=========================================="
 echo "✅ Bot has been restarted!"
 echo "New Process ID (PID): $!"
-echo "tail -f bot.log to view output."
+echo "tail -f $LOG_FILE to view output."
 echo "=========================================="
@@ -1,5 +1,9 @@
 #!/bin/bash
 # start_bot.sh - Linux setup & run script for Legend GaldCup Bot
+# 추가 인자(예: ./start_bot.sh --force-sync)는 main.py로 그대로 넘깁니다.
+# 한 호스트에서 클러스터 여러 개를 띄울 때는 프로세스마다 환경 변수로 지정합니다. (예: CLUSTER_ID=a SHARD_IDS=0-3 ./start_bot.sh)
+
+LOG_FILE="bot${CLUSTER_ID:+-$CLUSTER_ID}.log"
 
 echo "Starting Legend GaldCup Environment Setup..."
 
@@ -67,9 +71,9 @@ fi
 
 # 5. Run the bot in the background using nohup
 echo "Starting the bot in the background..."
-nohup python3 main.py > bot.log 2>&1 &
+nohup python3 main.py "$@" > "$LOG_FILE" 2>&1 &
 echo "=========================================="
 echo "✅ Bot is now running in the background!"
 echo "Process ID (PID): $!"
-echo "You can view the live console output by typing: tail -f bot.log"
+echo "You can view the live console output by typing: tail -f $LOG_FILE"
 echo "=========================================="
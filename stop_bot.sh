@@ -1,15 +1,49 @@
 #!/bin/bash
 # stop_bot.sh - Script to stop the running Legend GaldCup Bot
+# 클러스터 모드에서는 CLUSTER_ID가 같은 프로세스 하나만 멈춥니다. (예: CLUSTER_ID=a ./stop_bot.sh)
+# 이 호스트의 모든 봇 프로세스를 멈추려면 ./stop_bot.sh --all
 
 echo "Stopping Legend GaldCup Bot..."
 
-# Find the PID of the python3 process running main.py
-PID=$(pgrep -f "python3 main.py")
+# main.py가 시작할 때 자기 PID를 적어 두는 파일 (main.py의 PID_FILE과 같은 이름)
+if [ "$1" == "--all" ]; then
+    PID_FILES=$(ls bot.pid bot-*.pid 2>/dev/null)
+else
+    PID_FILES="bot${CLUSTER_ID:+-$CLUSTER_ID}.pid"
+fi
+
+PIDS=""
+for PID_FILE in $PID_FILES; do
+    [ -f "$PID_FILE" ] || continue
+    PID=$(cat "$PID_FILE")
+    # 비정상 종료로 남은 파일의 PID가 다른 프로그램에 재사용되었을 수 있으므로 main.py인지 확인
+    if ps -p "$PID" -o args= 2>/dev/null | grep -q "main.py"; then
+        PIDS="$PIDS $PID"
+    fi
+done
+
+# PID 파일을 쓰기 전 버전으로 띄운 단일 프로세스 (클러스터 프로세스가 있으면 다른 클러스터까지 멈추므로 쓰지 않음)
+if [ -z "$PIDS" ] && [ -z "$CLUSTER_ID" ] && [ "$1" != "--all" ] && ! ls bot-*.pid > /dev/null 2>&1; then
+    PIDS=$(pgrep -f "python3 main.py")
+fi
 
-if [ -z "$PID" ]; then
-    echo "No running bot process found. (python3 main.py)"
+if [ -z "$PIDS" ]; then
+    echo "No running bot process found. (${PID_FILES:-bot.pid})"
 else
-    echo "Found bot process with PID: $PID"
-    kill $PID
+    echo "Found bot process with PID:$PIDS"
+    # SIGTERM을 받으면 봇이 진행 중인 송출/DB 쓰기를 마무리하고 스스로 종료함 (main.py의 SHUTDOWN_TIMEOUT)
+    kill $PIDS
+    for i in $(seq 1 30); do
+        ALIVE=""
+        for PID in $PIDS; do
+            kill -0 "$PID" 2>/dev/null && ALIVE="$ALIVE $PID"
+        done
+        [ -z "$ALIVE" ] && break
+        sleep 1
+    done
+    if [ -n "$ALIVE" ]; then
+        echo "Bot did not exit within 30 seconds, forcing it to stop."
+        kill -9 $ALIVE
+    fi
     echo "Bot stopped successfully."
 fi
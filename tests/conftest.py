@@ -0,0 +1,20 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """임시 폴더의 빈 DB와 보관 DB로 초기화한 database 모듈을 돌려줍니다."""
+    monkeypatch.setattr(database, 'DB_FILE', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(database, 'ARCHIVE_DB_FILE', str(tmp_path / 'archive.db'))
+    database._count_cache.clear()
+    database.invalidate_status_cache()
+    asyncio.run(database.init_db())
+    return database
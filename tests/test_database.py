@@ -0,0 +1,267 @@
+import asyncio
+import os
+import time
+
+import aiosqlite
+import pytest
+
+
+async def _scalar(db_file, query, params=()):
+    async with aiosqlite.connect(db_file) as conn:
+        async with conn.execute(query, params) as cursor:
+            return (await cursor.fetchone())[0]
+
+
+async def _survey_with_votes(db, votes: int):
+    """votes명이 투표한(홀수 번째만 의견 작성) 진행 중인 설문을 만듭니다."""
+    survey_id = await db.create_survey('짜장면 vs 짬뽕', ['짜장면', '짬뽕'], True)
+    for user_id in range(votes):
+        opinion = f'짬뽕 국물이 최고 {user_id}' if user_id % 2 else None
+        assert await db.save_vote(survey_id, user_id, 1, '짬뽕', opinion, [(user_id % 2, None)])
+    return survey_id
+
+
+async def _closed_survey(db, votes: int):
+    survey_id = await _survey_with_votes(db, votes)
+    await db.deactivate_survey(survey_id)
+    return survey_id
+
+
+async def _survey_view(db, survey_id):
+    db._count_cache.clear()
+    chunks = [chunk async for chunk in db.iter_votes_for_survey(survey_id, chunk_size=2)]
+    return {
+        'votes': await db.count_votes(survey_id),
+        'tallies': sorted(await db.get_vote_tallies(survey_id)),
+        'opinions': await db.count_opinions(survey_id),
+        'iterated': sorted(v.id for chunk in chunks for v in chunk),
+        'page': await db.get_opinions_page(survey_id, limit=10),
+    }
+
+
+# --- 보관 DB 이동 ---
+
+def test_archive_moves_votes_in_batches_without_changing_results(db):
+    async def main():
+        survey_id = await _closed_survey(db, 7)
+        before = await _survey_view(db, survey_id)
+
+        results = []
+        while (result := await db.archive_closed_survey_batch(batch_size=3)) is not None:
+            results.append(result)
+            assert await _survey_view(db, survey_id) == before
+
+        assert results == [(survey_id, 3, False), (survey_id, 3, False), (survey_id, 1, True)]
+        assert await _scalar(db.DB_FILE, 'SELECT COUNT(*) FROM votes') == 0
+        assert await _scalar(db.ARCHIVE_DB_FILE, 'SELECT COUNT(*) FROM votes') == 7
+        assert await _scalar(db.ARCHIVE_DB_FILE, 'SELECT COUNT(*) FROM vote_choices') == 7
+    asyncio.run(main())
+
+
+def test_closed_survey_rejects_late_votes_before_and_after_archiving(db):
+    async def main():
+        survey_id = await _closed_survey(db, 1)
+        before = await _survey_view(db, survey_id)
+        # 종료 후 남아 있던 투표 버튼/팝업으로 들어온 기존 투표자 수정과 새 투표자
+        assert not await db.save_vote(survey_id, 0, 1, '짜장면', '늦은 의견', [(0, None)])
+        assert not await db.save_vote(survey_id, 5, 1, '짜장면', '늦은 의견', [(0, None)])
+        assert await _survey_view(db, survey_id) == before
+
+        while await db.archive_closed_survey_batch():
+            pass
+        assert not await db.save_vote(survey_id, 0, 1, '짜장면', '늦은 의견', [(0, None)])
+        assert not await db.save_vote(survey_id, 5, 1, '짜장면', '늦은 의견', [(0, None)])
+        assert await _survey_view(db, survey_id) == before
+        assert await _scalar(db.DB_FILE, 'SELECT COUNT(*) FROM votes') == 0
+    asyncio.run(main())
+
+
+def test_archive_batch_interrupted_before_hot_commit_is_recovered(db):
+    async def main():
+        survey_id = await _closed_survey(db, 5)
+        before = await _survey_view(db, survey_id)
+        snapshot = db.DB_FILE + '.snapshot'
+        async with aiosqlite.connect(db.DB_FILE) as conn:
+            await conn.execute('VACUUM INTO ?', (snapshot,))
+
+        # 보관 DB 커밋 뒤 현재 DB 커밋 전에 멈춘 상황: 같은 투표가 두 DB에 모두 남음
+        await db.archive_closed_survey_batch(batch_size=3)
+        os.replace(snapshot, db.DB_FILE)
+        assert await _survey_view(db, survey_id) == before
+
+        while await db.archive_closed_survey_batch(batch_size=3):
+            assert await _survey_view(db, survey_id) == before
+        assert await _scalar(db.ARCHIVE_DB_FILE, 'SELECT COUNT(*) FROM votes') == 5
+        assert await _scalar(db.ARCHIVE_DB_FILE, 'SELECT COUNT(*) FROM vote_choices') == 5
+        assert await _scalar(db.ARCHIVE_DB_FILE, "SELECT COUNT(*) FROM opinions_fts WHERE opinions_fts MATCH '국물*'") == 2
+    asyncio.run(main())
+
+
+def test_archive_returns_none_without_closed_surveys(db):
+    async def main():
+        await db.create_survey('진행 중', ['a', 'b'], False)
+        assert await db.archive_closed_survey_batch() is None
+    asyncio.run(main())
+
+
+# --- 구버전 투표 변환 ---
+
+def test_migrate_vote_choices_is_idempotent(db, monkeypatch):
+    monkeypatch.setattr(db, 'VOTE_CHUNK_SIZE', 1)
+
+    async def main():
+        survey_id = await db.create_survey('산 vs 바다', ['산', '바다'], True)
+        async with aiosqlite.connect(db.DB_FILE) as conn:
+            await conn.executemany(
+                'INSERT INTO votes (survey_id, user_id, server_id, selected_option) VALUES (?, ?, 1, ?)',
+                [(survey_id, 1, '바다'), (survey_id, 2, '산, 계곡')]
+            )
+            await conn.commit()
+            for _ in range(2):
+                await db._migrate_vote_choices(conn)
+                await conn.commit()
+        assert sorted(await db.get_vote_tallies(survey_id)) == [(-1, '계곡', 1), (0, None, 1), (1, None, 1)]
+    asyncio.run(main())
+
+
+def test_migrate_vote_choices_runs_only_below_schema_version(db):
+    async def main():
+        survey_id = await db.create_survey('산 vs 바다', ['산', '바다'], True)
+        assert await _scalar(db.DB_FILE, 'PRAGMA user_version') == db.SCHEMA_VERSION
+        async with aiosqlite.connect(db.DB_FILE) as conn:
+            await conn.execute("INSERT INTO votes (survey_id, user_id, server_id, selected_option) VALUES (?, 1, 1, '바다')", (survey_id,))
+            await conn.commit()
+
+        await db.init_db()
+        assert await db.get_vote_tallies(survey_id) == []
+
+        # 옛 백업을 복원한 경우처럼 버전이 낮으면 다시 변환
+        async with aiosqlite.connect(db.DB_FILE) as conn:
+            await conn.execute('PRAGMA user_version = 0')
+        await db.init_db()
+        assert await db.get_vote_tallies(survey_id) == [(1, None, 1)]
+        assert await _scalar(db.DB_FILE, 'PRAGMA user_version') == db.SCHEMA_VERSION
+    asyncio.run(main())
+
+
+# --- 대기열 순서 ---
+
+async def _queue_order(db):
+    async with aiosqlite.connect(db.DB_FILE) as conn:
+        async with conn.execute('SELECT topic FROM topic_queue ORDER BY position, id') as cursor:
+            return [r[0] for r in await cursor.fetchall()]
+
+
+async def _queue_ids(db):
+    async with aiosqlite.connect(db.DB_FILE) as conn:
+        async with conn.execute('SELECT topic, id FROM topic_queue') as cursor:
+            return dict(await cursor.fetchall())
+
+
+def test_move_queue_item_reorders_and_renumbers(db):
+    async def main():
+        for topic in 'abcd':
+            await db.add_to_queue({'topic': topic, 'options': ['x', 'y']})
+        ids = await _queue_ids(db)
+
+        await db.move_queue_item(ids['d'], 0)
+        assert await _queue_order(db) == ['d', 'a', 'b', 'c']
+        await db.move_queue_item(ids['a'], 99)
+        assert await _queue_order(db) == ['d', 'b', 'c', 'a']
+
+        # 같은 자리에 번갈아 넣어 간격이 다 떨어지면 전체 번호를 다시 매김
+        for _ in range(12):
+            await db.move_queue_item(ids['a'], 1)
+            await db.move_queue_item(ids['b'], 1)
+        assert await _queue_order(db) == ['d', 'b', 'a', 'c']
+        assert (await db.get_next_queued_topic()).topic == 'd'
+    asyncio.run(main())
+
+
+def test_move_queue_item_missing_topic_returns_none(db):
+    async def main():
+        await db.add_to_queue({'topic': 'a', 'options': ['x', 'y']})
+        assert await db.move_queue_item(12345, 0) is None
+        assert await _queue_order(db) == ['a']
+    asyncio.run(main())
+
+
+# --- 스케줄러 임대 ---
+
+def test_lease_acquire_renew_and_takeover(db):
+    async def main():
+        first = await db.acquire_lease('scheduler', 'p1', 30)
+        assert first is not None
+        assert await db.acquire_lease('scheduler', 'p2', 30) is None
+
+        renewed = await db.acquire_lease('scheduler', 'p1', 60)
+        assert renewed > first
+        assert (await db.get_lease('scheduler'))[0] == 'p1'
+
+        # 만료된 임대는 다른 프로세스가 넘겨받음
+        await db.acquire_lease('scheduler', 'p1', -1)
+        assert await db.acquire_lease('scheduler', 'p2', 30) > time.time()
+        assert (await db.get_lease('scheduler'))[0] == 'p2'
+
+        await db.release_lease('scheduler', 'p2')
+        assert await db.acquire_lease('scheduler', 'p1', 30) is not None
+    asyncio.run(main())
+
+
+def test_lease_concurrent_acquire_has_single_winner(db):
+    async def main():
+        results = await asyncio.gather(*(db.acquire_lease('scheduler', f'p{i}', 30) for i in range(5)))
+        assert sum(r is not None for r in results) == 1
+    asyncio.run(main())
+
+
+# --- 검색 ---
+
+def test_search_finds_titles_and_opinions_in_both_databases(db):
+    async def main():
+        archived_id = await _closed_survey(db, 3)
+        while await db.archive_closed_survey_batch():
+            pass
+        hot_id = await db.create_survey('부먹 vs 찍먹', ['부먹', '찍먹'], True)
+        await db.save_vote(hot_id, 1, 1, '찍먹', '바삭한 국물 없는 탕수육', [(1, None)])
+        await db.deactivate_survey(hot_id)
+
+        by_title = await db.search_surveys('짬뽕')
+        assert by_title[0]['id'] == archived_id and by_title[0]['topic_match']
+
+        by_opinion = {r['id']: r for r in await db.search_surveys('국물')}
+        assert set(by_opinion) == {archived_id, hot_id}
+        assert by_opinion[archived_id]['opinion_hits'] == 1
+        assert '**국물이**' in by_opinion[archived_id]['snippet']
+        assert await db.search_surveys('!!!') == []
+    asyncio.run(main())
+
+
+# --- 백업/복원 ---
+
+def test_restore_database_round_trip_clears_caches(db, tmp_path):
+    async def main():
+        survey_id = await _survey_with_votes(db, 3)
+        await db.backup_database(str(tmp_path / 'backup'))
+        assert await db.save_vote(survey_id, 99, 1, '짜장면', None, [(0, None)])
+        await db.get_survey_status(survey_id)
+        assert db._status_cache
+
+        await db.restore_database(str(tmp_path / 'backup'))
+        assert not db._status_cache and not db._status_inflight
+        assert (await db.get_survey_status(survey_id))['total_votes'] == 3
+    asyncio.run(main())
+
+
+def test_restore_database_rejects_incomplete_backup(db, tmp_path):
+    async def main():
+        survey_id = await _survey_with_votes(db, 3)
+        backup_dir = tmp_path / 'backup'
+        await db.backup_database(str(backup_dir))
+        os.remove(backup_dir / 'archive.db')
+        assert await db.save_vote(survey_id, 99, 1, '짜장면', None, [(0, None)])
+
+        with pytest.raises(ValueError):
+            await db.restore_database(str(backup_dir))
+        assert await db.count_votes(survey_id) == 4
+    asyncio.run(main())
@@ -0,0 +1,162 @@
+import bisect
+import random
+import re
+import zlib
+
+from models import parse_options
+
+# 글자 n-gram 크기. 한글은 음절 하나에 정보가 많아 2글자 단위가 잘 맞습니다.
+SHINGLE_SIZE = 2
+# MinHash 서명 길이 = BANDS * ROWS_PER_BAND. 16x4 구성은 유사도 약 0.5부터 후보로 잡힙니다.
+BANDS = 16
+ROWS_PER_BAND = 4
+# 추정 유사도(Jaccard)가 이 값 이상이면 중복 주제로 간주합니다.
+DUPLICATE_THRESHOLD = 0.6
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_NON_WORD = re.compile(r'[^0-9a-z가-힣]+')
+
+# 재시작해도 같은 서명이 나오도록 고정 시드로 해시 계수를 만듭니다.
+_rng = random.Random(0x6A1D)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(BANDS * ROWS_PER_BAND)
+]
+
+
+def _option_names(options) -> list:
+    return [opt.name for opt in parse_options(options or ())]
+
+
+def shingles(topic: str, options=None) -> set:
+    """주제 제목과 선택지 이름을 정규화(소문자, 공백/기호 제거)한 뒤 글자 n-gram 집합으로 만듭니다."""
+    text = ' '.join([topic or ''] + _option_names(options)).lower()
+    text = _NON_WORD.sub('', text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set: set) -> tuple:
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in shingle_set]
+    if not hashes:
+        return ()
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+class TopicIndex:
+    """제안/대기열/지난 설문 주제의 MinHash 서명을 LSH 버킷에 보관하는 메모리 인덱스입니다.
+
+    키는 ('suggested', id), ('queue', id), ('survey', id) 형태이며
+    추가/삭제 시 해당 키의 버킷만 갱신합니다.
+    """
+
+    def __init__(self):
+        self._signatures = {}
+        self._titles = {}
+        self._buckets = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def clear(self):
+        self._signatures.clear()
+        self._titles.clear()
+        self._buckets.clear()
+
+    def _bands(self, signature: tuple):
+        for band in range(BANDS):
+            start = band * ROWS_PER_BAND
+            yield (band, signature[start:start + ROWS_PER_BAND])
+
+    def add(self, key: tuple, topic: str, options=None):
+        self.remove(key)
+        signature = minhash(shingles(topic, options))
+        if not signature:
+            return
+        self._signatures[key] = signature
+        self._titles[key] = topic
+        for band_key in self._bands(signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: tuple):
+        signature = self._signatures.pop(key, None)
+        self._titles.pop(key, None)
+        if signature is None:
+            return
+        for band_key in self._bands(signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def query(self, topic: str, options=None, threshold: float = DUPLICATE_THRESHOLD, exclude=None) -> list:
+        """유사도가 threshold 이상인 주제를 [(키, 제목, 유사도)] 형태로 유사도 높은 순으로 반환합니다."""
+        signature = minhash(shingles(topic, options))
+        if not signature:
+            return []
+        candidates = set()
+        for band_key in self._bands(signature):
+            candidates |= self._buckets.get(band_key, set())
+        candidates.discard(exclude)
+
+        matches = []
+        for key in candidates:
+            other = self._signatures[key]
+            similarity = sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+            if similarity >= threshold:
+                matches.append((key, self._titles[key], similarity))
+        matches.sort(key=lambda m: m[2], reverse=True)
+        return matches
+
+
+class SurveyTitleIndex:
+    """종료된 설문의 (ID, 제목)을 메모리에 보관하는 /조회 자동완성용 인덱스입니다.
+
+    제목은 정규화해 두고, 입력이 숫자면 ID 앞자리로, 아니면 제목 부분 문자열로 최신 회차부터 찾습니다.
+    """
+
+    def __init__(self):
+        self._ids = []
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def clear(self):
+        self._ids.clear()
+        self._entries.clear()
+
+    def add(self, survey_id: int, topic: str):
+        if survey_id not in self._entries:
+            bisect.insort(self._ids, survey_id)
+        self._entries[survey_id] = (topic, _NON_WORD.sub('', (topic or '').lower()))
+
+    def remove(self, survey_id: int):
+        if self._entries.pop(survey_id, None) is None:
+            return
+        del self._ids[bisect.bisect_left(self._ids, survey_id)]
+
+    def search(self, text: str, limit: int = 25) -> list:
+        """[(설문 ID, 제목)]을 최신 회차 순으로 최대 limit개 반환합니다."""
+        text = (text or '').strip()
+        needle = _NON_WORD.sub('', text.lower())
+        id_prefix = text if text.isdigit() else None
+
+        results = []
+        for survey_id in reversed(self._ids):
+            topic, normalized = self._entries[survey_id]
+            if id_prefix is not None:
+                matched = str(survey_id).startswith(id_prefix) or id_prefix in normalized
+            else:
+                matched = needle in normalized
+            if matched:
+                results.append((survey_id, topic))
+                if len(results) >= limit:
+                    break
+        return results